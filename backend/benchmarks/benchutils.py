@@ -0,0 +1,71 @@
+# -*- coding: UTF-8
+# benchutils
+# **********
+#
+# Small helpers shared by the benchmark scripts contained in this directory
+import json
+import os
+import sys
+import time
+import urllib2
+
+this_directory = os.path.dirname(__file__)
+root = os.path.abspath(os.path.join(this_directory, '..'))
+sys.path.insert(0, root)
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+
+    samples = sorted(samples)
+    k = int(round((len(samples) - 1) * p / 100.0))
+    return samples[k]
+
+
+def report(label, samples, unit='ms'):
+    print "%-32s n=%-6d p50=%8.2f%s p90=%8.2f%s p99=%8.2f%s max=%8.2f%s" % \
+          (label, len(samples),
+           percentile(samples, 50), unit,
+           percentile(samples, 90), unit,
+           percentile(samples, 99), unit,
+           max(samples) if samples else 0.0, unit)
+
+
+def timeit(function, *args, **kwargs):
+    start = time.time()
+    function(*args, **kwargs)
+    return (time.time() - start) * 1000.0
+
+
+class Client(object):
+    def __init__(self, base_url, session_id=None):
+        self.base_url = base_url.rstrip('/')
+        self.session_id = session_id
+
+    def request(self, method, path, body=None, headers=None):
+        data = json.dumps(body) if body is not None else None
+        req = urllib2.Request(self.base_url + path, data)
+        req.get_method = lambda: method
+
+        if self.session_id is not None:
+            req.add_header('X-Session', self.session_id)
+
+        for k, v in (headers or {}).iteritems():
+            req.add_header(k, v)
+
+        try:
+            response = urllib2.urlopen(req)
+        except urllib2.HTTPError as e:
+            response = e
+
+        return response.getcode(), response.read()
+
+    def login(self, username, password):
+        code, body = self.request('POST', '/authentication',
+                                  {'username': username, 'password': password})
+        if code != 200:
+            raise Exception("Login failed for user %s (HTTP %d)" % (username, code))
+
+        self.session_id = json.loads(body)['session_id']
+        return self.session_id
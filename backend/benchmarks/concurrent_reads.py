@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Measures the latency of /public, /receiver/tips and /authentication while
+# an admin keeps running long read queries (/admin/overview/*).
+#
+# Usage:
+#   concurrent_reads.py -u http://127.0.0.1:8082 -a admin:pass -r receiver:pass
+#
+# Run it once against a node without the patch and once with it to compare
+# the p99 latencies.
+import threading
+import time
+from optparse import OptionParser
+
+from benchutils import Client, report, timeit
+
+
+def long_reader(base_url, credentials, stop):
+    client = Client(base_url)
+    client.login(*credentials)
+    while not stop.is_set():
+        client.request('GET', '/admin/overview/tips')
+        client.request('GET', '/admin/overview/files')
+
+
+def sampler(label, function, samples, stop):
+    while not stop.is_set():
+        samples[label].append(timeit(function))
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-u", "--url", dest="url", default="http://127.0.0.1:8082")
+    parser.add_option("-a", "--admin", dest="admin", default="admin:globaleaks")
+    parser.add_option("-r", "--receiver", dest="receiver", default="receiver:globaleaks")
+    parser.add_option("-l", "--long-readers", type="int", dest="long_readers", default=2)
+    parser.add_option("-c", "--concurrency", type="int", dest="concurrency", default=4)
+    parser.add_option("-d", "--duration", type="int", dest="duration", default=30)
+    options, _ = parser.parse_args()
+
+    admin = tuple(options.admin.split(':', 1))
+    receiver = tuple(options.receiver.split(':', 1))
+
+    anon = Client(options.url)
+    rcv = Client(options.url)
+    rcv.login(*receiver)
+
+    targets = {
+        '/public': lambda: anon.request('GET', '/public'),
+        '/receiver/tips': lambda: rcv.request('GET', '/receiver/tips'),
+        '/authentication': lambda: Client(options.url).login(*receiver)
+    }
+
+    samples = {k: [] for k in targets}
+    stop = threading.Event()
+
+    threads = [threading.Thread(target=long_reader, args=(options.url, admin, stop))
+               for _ in range(options.long_readers)]
+
+    for label, function in targets.iteritems():
+        threads += [threading.Thread(target=sampler, args=(label, function, samples, stop))
+                    for _ in range(options.concurrency)]
+
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    time.sleep(options.duration)
+    stop.set()
+
+    for t in threads:
+        t.join()
+
+    for label in sorted(samples):
+        report(label, samples[label])
+
+
+if __name__ == '__main__':
+    main()
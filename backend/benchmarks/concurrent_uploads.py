@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Measures peak memory and throughput of concurrent large multipart uploads
+# received by GLHTTPConnection, feeding the bodies interleaved in chunks of
+# 64KB as they would arrive from the sockets.
+#
+# With --legacy the bodies are parsed as a whole by cyclone after having been
+# received and the file is then written to a second encrypted temporary file.
+#
+# Usage:
+#   concurrent_uploads.py [-c 8] [-s 30] [--legacy]
+#
+# Run it once per mode: the peak memory is the one of the whole process.
+import os
+import resource
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+
+import benchutils
+
+from cyclone.httpserver import HTTPConnection
+from cyclone.web import Application
+from twisted.test import proto_helpers
+
+from globaleaks.handlers.base import GLHTTPConnection
+from globaleaks.security import GLSecureTemporaryFile
+from globaleaks.settings import GLSettings
+
+BOUNDARY = 'benchmarkboundary'
+CHUNK_SIZE = 64 * 1024
+
+
+def setup(working_path):
+    GLSettings.working_path = working_path
+    GLSettings.ramdisk_path = os.path.join(working_path, 'ramdisk')
+    GLSettings.eval_paths()
+    GLSettings.create_directories()
+    GLSettings.memory_copy.maximum_filesize = 1024
+
+
+def store_upload(request):
+    """
+    The work done on the uploaded file up to get_file_upload()
+    """
+    upload = request.files['file'][0]
+    if isinstance(upload['body'], str):
+        f = GLSecureTemporaryFile(GLSettings.tmp_upload_path)
+        f.write(upload['body'])
+    else:
+        f = upload['body']
+
+    f.close()
+
+
+def make_connection(connection_class, requests):
+    connection = connection_class()
+    connection.factory = Application([])
+    connection.makeConnection(proto_helpers.StringTransport())
+    connection.request_callback = requests.append
+    return connection
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-c", "--concurrency", type="int", dest="concurrency", default=8)
+    parser.add_option("-s", "--size", type="int", dest="size", default=30, help="upload size in MB")
+    parser.add_option("--legacy", action="store_true", dest="legacy", default=False)
+    options, _ = parser.parse_args()
+
+    working_path = tempfile.mkdtemp()
+
+    try:
+        setup(working_path)
+
+        content = os.urandom(1024 * 1024) * options.size
+        body = '--%s\r\nContent-Disposition: form-data; name="file"; filename="file.bin"\r\n' \
+               'Content-Type: application/octet-stream\r\n\r\n%s\r\n--%s--\r\n' % (BOUNDARY, content, BOUNDARY)
+        del content
+
+        headers = 'POST /wbtip/upload HTTP/1.1\r\n' \
+                  'Content-Type: multipart/form-data; boundary=%s\r\n' \
+                  'Content-Length: %d\r\n\r\n' % (BOUNDARY, len(body))
+
+        requests = []
+        connection_class = HTTPConnection if options.legacy else GLHTTPConnection
+        connections = [make_connection(connection_class, requests) for _ in range(options.concurrency)]
+
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.time()
+
+        for connection in connections:
+            connection.dataReceived(headers)
+
+        for i in range(0, len(body), CHUNK_SIZE):
+            for connection in connections:
+                connection.dataReceived(body[i:i + CHUNK_SIZE])
+
+        for request in requests:
+            store_upload(request)
+
+        elapsed = time.time() - start
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        print "%s: %d uploads of %dMB in %.2f seconds (%.2f MB/s), peak memory growth %.2f MB" % \
+              ('legacy' if options.legacy else 'streaming',
+               len(requests), options.size, elapsed,
+               len(requests) * options.size / elapsed,
+               (peak - baseline) / 1024.0)
+    finally:
+        shutil.rmtree(working_path)
+
+
+if __name__ == '__main__':
+    main()
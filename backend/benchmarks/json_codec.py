@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Micro-benchmark of the encoding and decoding of a payload shaped like the
+# /public resource, comparing cyclone.escape (previously used to write the
+# responses) with the backends of globaleaks.utils.jsoncodec available.
+#
+# Usage:
+#   json_codec.py [-n 100] [-c 20]
+import time
+from optparse import OptionParser
+
+import benchutils
+
+from cyclone import escape
+
+from globaleaks.utils import jsoncodec
+
+LANGUAGES = [u'en', u'it', u'de', u'fr', u'es', u'ar', u'ru', u'zh_CN', u'pt_BR', u'nl']
+
+
+def localized(text):
+    return dict((lang, u'%s (%s) \xe8中' % (text, lang)) for lang in LANGUAGES)
+
+
+def field(i):
+    return {
+        'id': u'f3b1ca3a-a6cd-4bf5-a9a5-4e2fa7a3a8%02d' % i,
+        'label': localized(u'Field label %d' % i),
+        'description': localized(u'Field description %d' % i),
+        'hint': localized(u'Field hint %d' % i),
+        'type': u'selectbox',
+        'required': True,
+        'preview': False,
+        'x': 0,
+        'y': i,
+        'attrs': {'min_len': {'type': u'int', 'value': 0}},
+        'options': [{'id': u'option%d' % j, 'label': localized(u'Option %d' % j), 'score_points': j}
+                    for j in range(5)],
+        'children': []
+    }
+
+
+def public_payload(contexts):
+    return {
+        'node': dict(('text%d' % i, localized(u'Node text %d' % i)) for i in range(40)),
+        'contexts': [{
+            'id': u'f3b1ca3a-a6cd-4bf5-a9a5-4e2fa7a3a8%02d' % c,
+            'name': localized(u'Context %d' % c),
+            'description': localized(u'Context description %d' % c),
+            'presentation_order': c,
+            'receivers': [u'f3b1ca3a-a6cd-4bf5-a9a5-4e2fa7a3a8%02d' % r for r in range(5)],
+            'questionnaire': [{'label': localized(u'Step %d' % s),
+                               'children': [field(f) for f in range(10)]}
+                              for s in range(3)]
+        } for c in range(contexts)],
+        'receivers': []
+    }
+
+
+def measure(function, value, number):
+    start = time.time()
+
+    for _ in range(number):
+        function(value)
+
+    return (time.time() - start) * 1000.0 / number
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-n", "--number", type="int", dest="number", default=100)
+    parser.add_option("-c", "--contexts", type="int", dest="contexts", default=20)
+    options, _ = parser.parse_args()
+
+    payload = public_payload(options.contexts)
+    text = escape.json_encode(payload)
+
+    print "payload of %d bytes" % len(text)
+
+    print "%-8s encode %8.2fms decode %8.2fms" % \
+          ('cyclone',
+           measure(escape.json_encode, payload, options.number),
+           measure(escape.json_decode, text, options.number))
+
+    for backend in sorted(jsoncodec.backends):
+        jsoncodec.set_backend(backend)
+
+        print "%-8s encode %8.2fms decode %8.2fms" % \
+              (backend,
+               measure(jsoncodec.encode, payload, options.number),
+               measure(jsoncodec.loads, text, options.number))
+
+
+if __name__ == '__main__':
+    main()
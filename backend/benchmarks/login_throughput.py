@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Measures the throughput of concurrent logins (users and whistleblowers)
+# and the latency of /public while the logins are running.
+#
+# The credentials must be valid as failed logins are delayed on purpose
+# (see authentication.random_login_delay); the delay introduced by the
+# side channels guard (--side-channels-guard) is included in the latency
+# of the logins and may be lowered to stress the hashing of the passwords.
+#
+# Usage:
+#   login_throughput.py -u http://127.0.0.1:8082 -r receiver:pass [-w receipt]
+#
+# Run it once against a node without the patch and once with it to compare
+# the logins per second and the p99 latency of /public.
+import threading
+import time
+from optparse import OptionParser
+
+from benchutils import Client, report, timeit
+
+
+def login_worker(base_url, path, body, samples, stop):
+    while not stop.is_set():
+        start = time.time()
+        code, _ = Client(base_url).request('POST', path, body)
+        if code == 200:
+            samples.append((time.time() - start) * 1000.0)
+
+
+def public_sampler(base_url, samples, stop):
+    client = Client(base_url)
+    while not stop.is_set():
+        samples.append(timeit(client.request, 'GET', '/public'))
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-u", "--url", dest="url", default="http://127.0.0.1:8082")
+    parser.add_option("-r", "--receiver", dest="receiver", default="receiver:globaleaks")
+    parser.add_option("-w", "--receipt", dest="receipt", default=None)
+    parser.add_option("-c", "--concurrency", type="int", dest="concurrency", default=8)
+    parser.add_option("-p", "--public-concurrency", type="int", dest="public_concurrency", default=2)
+    parser.add_option("-d", "--duration", type="int", dest="duration", default=30)
+    options, _ = parser.parse_args()
+
+    username, password = options.receiver.split(':', 1)
+
+    logins = [('/authentication', {'username': username, 'password': password})]
+    if options.receipt is not None:
+        logins.append(('/receiptauth', {'receipt': options.receipt}))
+
+    samples = dict((path, []) for path, _ in logins)
+    samples['/public'] = []
+
+    stop = threading.Event()
+
+    threads = [threading.Thread(target=public_sampler, args=(options.url, samples['/public'], stop))
+               for _ in range(options.public_concurrency)]
+
+    for i in range(options.concurrency):
+        path, body = logins[i % len(logins)]
+        threads.append(threading.Thread(target=login_worker,
+                                        args=(options.url, path, body, samples[path], stop)))
+
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    time.sleep(options.duration)
+    stop.set()
+
+    for t in threads:
+        t.join()
+
+    for label in sorted(samples):
+        report(label, samples[label])
+
+    for path, _ in logins:
+        print "%-32s %.2f logins/s" % (path, len(samples[path]) / float(options.duration))
+
+
+if __name__ == '__main__':
+    main()
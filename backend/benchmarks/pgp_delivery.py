@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Measures the time needed by the delivery to encrypt an uploaded (AES
+# encrypted) file for many receivers with a PGP key:
+#   - sequential: the AES file is decrypted for each receiver and the
+#     copies are encrypted in sequence (as the delivery job used to do);
+#   - concurrent: the AES file is decrypted for each receiver and the
+#     copies are encrypted concurrently on a thread pool;
+#   - fanout: the AES file is decrypted once and its plaintext is streamed
+#     to the encryptions of all the receivers (delivery_sched.fsops_fanout_ifile).
+#
+# Usage:
+#   pgp_delivery.py [-r 10] [-s 52428800] [-t <number of CPUs>]
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from optparse import OptionParser
+
+from twisted.python.threadpool import ThreadPool
+
+import benchutils
+
+from globaleaks.jobs.delivery_sched import fsops_fanout_ifile, fsops_pgp_encrypt
+from globaleaks.security import GLSecureFile, GLSecureTemporaryFile
+from globaleaks.settings import GLSettings
+
+KEY_PATH = os.path.join(benchutils.root, 'globaleaks', 'tests', 'keys', 'VALID_PGP_KEY1_PUB')
+KEY_FINGERPRINT = u'ECAF2235E78E71CD95365843C7B190543CAA7585'
+
+
+def encrypt(ifile_path, receiver):
+    with GLSecureFile(ifile_path) as f:
+        return fsops_pgp_encrypt(f, receiver)
+
+
+def sequential(ifile_path, size, rfiles):
+    for rfileinfo in rfiles:
+        encrypt(ifile_path, rfileinfo['receiver'])
+
+
+def concurrent(threadpool, ifile_path, size, rfiles):
+    done = threading.Semaphore(0)
+
+    for rfileinfo in rfiles:
+        threadpool.callInThreadWithCallback(lambda success, result: done.release(),
+                                            encrypt, ifile_path, rfileinfo['receiver'])
+
+    for _ in rfiles:
+        done.acquire()
+
+
+def fanout(ifile_path, size, rfiles):
+    fsops_fanout_ifile(ifile_path, size, None, rfiles)
+
+
+def measure(label, function, *args):
+    start = time.time()
+    function(*args)
+    print "%-12s %8.2fs" % (label, time.time() - start)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-r", "--receivers", type="int", dest="receivers", default=10)
+    parser.add_option("-s", "--size", type="int", dest="size", default=50 * 1024 * 1024)
+    parser.add_option("-t", "--threads", type="int", dest="threads", default=multiprocessing.cpu_count())
+    options, _ = parser.parse_args()
+
+    working_path = tempfile.mkdtemp()
+
+    threadpool = ThreadPool(1, options.threads)
+    threadpool.start()
+
+    try:
+        GLSettings.ramdisk_path = working_path
+        GLSettings.submission_path = working_path
+        GLSettings.pgproot = os.path.join(working_path, 'gnupg')
+        os.makedirs(GLSettings.pgproot)
+
+        with open(KEY_PATH) as f:
+            key = unicode(f.read())
+
+        aes_file = GLSecureTemporaryFile(working_path)
+        for _ in range(options.size / (1024 * 1024)):
+            aes_file.write(os.urandom(1024 * 1024))
+        aes_file.write(os.urandom(options.size % (1024 * 1024)))
+        aes_file.avoid_delete()
+        aes_file.close()
+
+        receiver = {
+            'name': u'receiver',
+            'pgp_key_public': key,
+            'pgp_key_fingerprint': KEY_FINGERPRINT
+        }
+
+        rfiles = [{'receiver': receiver, 'path': aes_file.filepath} for _ in range(options.receivers)]
+
+        print "%d receivers, %d bytes, %d threads" % (options.receivers, options.size, options.threads)
+
+        measure('sequential', sequential, aes_file.filepath, options.size, rfiles)
+        measure('concurrent', concurrent, threadpool, aes_file.filepath, options.size, rfiles)
+        measure('fanout', fanout, aes_file.filepath, options.size, rfiles)
+    finally:
+        threadpool.stop()
+        shutil.rmtree(working_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Measures the encryptions per minute of the notifications (text messages)
+# and of the deliveries (files) for a receiver with a PGP key, comparing
+# a new GnuPG home per operation (GLBPGP, previously used by the delivery
+# and the notification) with the long lived keyring (GLPGPKeyring).
+#
+# Usage:
+#   pgp_encryption.py [-n 50] [-s 1048576]
+import os
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+
+import benchutils
+
+from globaleaks.security import GLBPGP, GLPGPKeyringClass
+from globaleaks.settings import GLSettings
+
+KEY_PATH = os.path.join(benchutils.root, 'globaleaks', 'tests', 'keys', 'VALID_PGP_KEY1_PUB')
+KEY_FINGERPRINT = u'ECAF2235E78E71CD95365843C7B190543CAA7585'
+
+
+def legacy_encrypt_message(key, plaintext):
+    gpob = GLBPGP()
+
+    try:
+        gpob.load_key(key)
+        return gpob.encrypt_message(KEY_FINGERPRINT, plaintext)
+    finally:
+        gpob.destroy_environment()
+
+
+def legacy_encrypt_file(key, input_path, output_path):
+    gpob = GLBPGP()
+
+    try:
+        gpob.load_key(key)
+        with open(input_path, 'rb') as f:
+            return gpob.encrypt_file(KEY_FINGERPRINT, f, output_path)
+    finally:
+        gpob.destroy_environment()
+
+
+def keyring_encrypt_file(keyring, key, input_path, output_path):
+    with open(input_path, 'rb') as f:
+        return keyring.encrypt_file(key, KEY_FINGERPRINT, f, output_path)
+
+
+def measure(label, function, number):
+    start = time.time()
+
+    for _ in range(number):
+        function()
+
+    elapsed = time.time() - start
+
+    print "%-24s %8.2fms/op %10.1f ops/minute" % (label, elapsed * 1000.0 / number, number * 60.0 / elapsed)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-n", "--number", type="int", dest="number", default=50)
+    parser.add_option("-s", "--size", type="int", dest="size", default=1024 * 1024)
+    options, _ = parser.parse_args()
+
+    working_path = tempfile.mkdtemp()
+
+    try:
+        GLSettings.ramdisk_path = working_path
+        GLSettings.pgproot = os.path.join(working_path, 'gnupg')
+        os.makedirs(GLSettings.pgproot)
+
+        with open(KEY_PATH) as f:
+            key = unicode(f.read())
+
+        input_path = os.path.join(working_path, 'plaintext')
+        output_path = os.path.join(working_path, 'encrypted')
+
+        with open(input_path, 'wb') as f:
+            f.write(os.urandom(options.size))
+
+        message = u'Notification body\n' * 50
+
+        keyring = GLPGPKeyringClass()
+
+        measure('notification (legacy)', lambda: legacy_encrypt_message(key, message), options.number)
+        measure('notification (keyring)', lambda: keyring.encrypt_message(key, KEY_FINGERPRINT, message), options.number)
+
+        measure('delivery (legacy)', lambda: legacy_encrypt_file(key, input_path, output_path), options.number)
+        measure('delivery (keyring)', lambda: keyring_encrypt_file(keyring, key, input_path, output_path), options.number)
+    finally:
+        shutil.rmtree(working_path)
+
+
+if __name__ == '__main__':
+    main()
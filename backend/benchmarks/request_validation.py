@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Micro-benchmark of the validation of the requests comparing the templates
+# interpreted by BaseHandler.validate_jmessage with the validators compiled
+# by globaleaks.rest.validator.
+#
+# Usage:
+#   request_validation.py [-n 10000]
+import copy
+import time
+from optparse import OptionParser
+
+import benchutils
+
+from globaleaks.handlers.base import BaseHandler
+from globaleaks.rest import requests
+from globaleaks.rest.validator import get_validator
+
+UUID = u'f3b1ca3a-a6cd-4bf5-a9a5-4e2fa7a3a8c2'
+
+
+def sample_value(template):
+    if template in (int, requests.SkipSpecificValidation):
+        return 1
+    elif template == bool:
+        return True
+    elif template == unicode:
+        return u'antani'
+    elif template == dict:
+        return {u'antani': u'antani'}
+    elif template == list:
+        return []
+    elif isinstance(template, dict):
+        return dict((key, sample_value(value)) for key, value in template.iteritems())
+    elif isinstance(template, list):
+        return [sample_value(template[0]) for _ in range(5)]
+    elif template == requests.uuid_regexp or template == requests.uuid_regexp_or_empty:
+        return UUID
+    elif template == requests.landing_page_regexp:
+        return u'homepage'
+    elif template == requests.context_selector_type_regexp:
+        return u'list'
+    elif template == requests.https_url_regexp or template == requests.https_url_regexp_or_empty:
+        return u'https://www.globaleaks.org'
+    elif template == requests.email_regexp or template == requests.email_regexp_or_empty:
+        return u'antani@globaleaks.org'
+
+    return u''
+
+
+def measure(function, messages):
+    start = time.time()
+
+    for message in messages:
+        function(message)
+
+    return (time.time() - start) * 1000000.0 / len(messages)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-n", "--number", type="int", dest="number", default=10000)
+    options, _ = parser.parse_args()
+
+    for name in ['SubmissionDesc', 'AdminContextDesc', 'AdminNodeDesc']:
+        template = getattr(requests, name)
+        message = sample_value(template)
+
+        # the messages are copied in advance because the validation strips the unknown keys
+        interpreted = measure(lambda m: BaseHandler.validate_jmessage(m, template),
+                              [copy.deepcopy(message) for _ in range(options.number)])
+
+        validator = get_validator(template)
+        compiled = measure(validator, [copy.deepcopy(message) for _ in range(options.number)])
+
+        print "%-20s interpreted %8.2fus compiled %8.2fus speedup %.1fx" % \
+              (name, interpreted, compiled, interpreted / compiled)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8
+#
+# Micro-benchmark of the number of short transactions per second executed
+# with and without the per thread store pool of globaleaks.orm.
+#
+# Usage:
+#   transactions.py [-n 5000]
+import os
+import shutil
+import tempfile
+import time
+from optparse import OptionParser
+
+import benchutils
+
+from storm.twisted.testing import FakeThreadPool
+
+from globaleaks import DATABASE_VERSION, models
+from globaleaks.orm import transact_sync, store_pool
+from globaleaks.settings import GLSettings
+
+
+@transact_sync
+def read_transaction(store):
+    return store.find(models.User).count()
+
+
+@transact_sync
+def write_transaction(store):
+    counter = models.Counter({'key': u'benchmark'})
+    store.add(counter)
+    store.flush()
+    store.remove(counter)
+
+
+def setup(working_path):
+    GLSettings.working_path = working_path
+    GLSettings.ramdisk_path = os.path.join(working_path, 'ramdisk')
+    GLSettings.eval_paths()
+    GLSettings.create_directories()
+    GLSettings.orm_tp = FakeThreadPool()
+
+    shutil.copy(os.path.join(benchutils.root, 'globaleaks', 'tests', 'db', 'empty',
+                             'glbackend-%d.db' % DATABASE_VERSION),
+                GLSettings.db_file_path)
+
+
+def run(label, function, n):
+    start = time.time()
+    for _ in xrange(n):
+        function()
+    elapsed = time.time() - start
+
+    print "%-32s %8d tx in %6.2fs: %10.1f tx/s" % (label, n, elapsed, n / elapsed)
+
+
+def main():
+    parser = OptionParser()
+    parser.add_option("-n", "--transactions", type="int", dest="n", default=5000)
+    options, _ = parser.parse_args()
+
+    working_path = tempfile.mkdtemp()
+
+    try:
+        setup(working_path)
+
+        max_age = GLSettings.orm_connection_max_age
+
+        for label, age in [('without pool', 0), ('with pool', max_age)]:
+            GLSettings.orm_connection_max_age = age
+            store_pool.clear()
+
+            run('read (%s)' % label, read_transaction, options.n)
+            run('write (%s)' % label, write_transaction, options.n)
+    finally:
+        shutil.rmtree(working_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,7 @@ from globaleaks.handlers.admin.user import db_get_admin_users
 from globaleaks.orm import transact
 from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
+from globaleaks.utils.signals import job_signals, NOTIFICATION
 from globaleaks.utils.singleton import Singleton
 from globaleaks.utils.templating import Templating
 from globaleaks.utils.utility import log, datetime_now, is_expired, bytes_to_pretty_str
@@ -260,6 +261,8 @@ class AlarmClass(object):
         self.last_alarm_email = datetime_now()
         yield _generate_admin_alert_mail(alert)
 
+        job_signals.emit(NOTIFICATION)
+
     def check_disk_anomalies(self, free_workdir_bytes, total_workdir_bytes, free_ramdisk_bytes, total_ramdisk_bytes):
         """
         Here in Alarm is written the threshold to say if we're in disk alarm
@@ -328,7 +331,7 @@ class AlarmClass(object):
                 "False" if old_accept_submissions else "True"))
 
             # Invalidate the cache of node avoiding accesses to the db from here
-            GLApiCache.invalidate()
+            GLApiCache.invalidate_dependencies(['node'])
 
 # Alarm is a singleton class exported once
 Alarm = AlarmClass()
@@ -36,3 +36,7 @@ api_factory = api.get_api_factory()
 for ip in GLSettings.bind_addresses:
     GLBackendAPI = internet.TCPServer(GLSettings.bind_port, api_factory, interface=ip)
     GLBackendAPI.setServiceParent(application)
+
+if GLSettings.metrics_port is not None:
+    GLMetricsAPI = internet.TCPServer(GLSettings.metrics_port, api.get_metrics_factory(), interface='127.0.0.1')
+    GLMetricsAPI.setServiceParent(application)
@@ -8,6 +8,7 @@ import traceback
 from cyclone.util import ObjectDict
 from twisted.internet.defer import succeed, inlineCallbacks
 from storm import exceptions
+from storm.databases.sqlite import sqlite
 
 from globaleaks import models, __version__, DATABASE_VERSION
 from globaleaks.db.appdata import db_update_appdata, db_fix_fields_attrs
@@ -31,8 +32,31 @@ def db_create_tables(store):
                 log.err(exc)
 
 
+def db_set_auto_vacuum(db_file_path):
+    """
+    Enable the FULL auto_vacuum of the database.
+
+    The setting is stored in the database header and it can be changed only
+    before the first table is created or by rebuilding the database with
+    VACUUM; the connections of the ORM switch the database to WAL mode and
+    write the header, so this is done here, outside of any transaction.
+    """
+    raw_connection = sqlite.connect(db_file_path, isolation_level=None)
+    try:
+        raw_connection.execute("PRAGMA auto_vacuum = FULL")
+        raw_connection.execute("VACUUM")
+    finally:
+        raw_connection.close()
+
+
+def init_db(use_single_lang=False):
+    db_set_auto_vacuum(GLSettings.db_file_path)
+
+    return _init_db(use_single_lang)
+
+
 @transact
-def init_db(store, use_single_lang=False):
+def _init_db(store, use_single_lang=False):
     db_create_tables(store)
     appdata_dict = db_update_appdata(store)
 
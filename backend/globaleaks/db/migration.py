@@ -9,6 +9,7 @@ from storm.store import Store
 
 from globaleaks import models, DATABASE_VERSION, FIRST_DATABASE_VERSION_SUPPORTED, LANGUAGES_SUPPORTED_CODES, security
 from globaleaks.models import l10n, config
+from globaleaks.orm import db_checkpoint
 from globaleaks.settings import GLSettings
 
 from globaleaks.db.migrations.update_16 import Receiver_v_15, Notification_v_15
@@ -145,6 +146,9 @@ def perform_schema_migration(version):
 
     shutil.rmtree(tmpdir, True)
     os.mkdir(tmpdir)
+
+    # the transactions still in the write-ahead log would not be copied
+    db_checkpoint(orig_db_file)
     shutil.copy2(orig_db_file, tmpdir)
 
     new_db_file = None
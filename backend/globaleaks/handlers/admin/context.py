@@ -11,7 +11,7 @@ from globaleaks.orm import transact
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.handlers.admin.step import db_create_step
 from globaleaks.handlers.admin.questionnaire import db_get_default_questionnaire_id
-from globaleaks.handlers.public import serialize_step
+from globaleaks.handlers.public import db_prefetch_questionnaires, serialize_step
 from globaleaks.rest import errors, requests
 from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
@@ -100,7 +100,9 @@ def db_get_context_steps(store, context_id, language):
         log.err("Requested invalid context")
         raise errors.ContextIdNotFound
 
-    return [serialize_step(store, s, language) for s in context.questionnaire.steps]
+    graph = db_prefetch_questionnaires(store, questionnaire_ids=[context.questionnaire_id])
+
+    return [serialize_step(store, s, language, graph) for s in graph.steps.get(context.questionnaire_id, [])]
 
 
 @transact
@@ -264,7 +266,7 @@ class ContextsCollection(BaseHandler):
 
         response = yield create_context(request, self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['context'])
 
         self.set_status(201) # Created
         self.write(response)
@@ -304,7 +306,7 @@ class ContextInstance(BaseHandler):
                                         requests.AdminContextDesc)
 
         response = yield update_context(context_id, request, self.request.language)
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['context'])
 
         self.set_status(202) # Updated
         self.write(response)
@@ -321,4 +323,4 @@ class ContextInstance(BaseHandler):
         Errors: InvalidInputFormat, ContextIdNotFound
         """
         yield delete_context(context_id)
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['context'])
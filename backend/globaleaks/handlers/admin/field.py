@@ -13,7 +13,7 @@ from twisted.internet.defer import inlineCallbacks
 from globaleaks import models
 from globaleaks.orm import transact
 from globaleaks.handlers.base import BaseHandler
-from globaleaks.handlers.public import serialize_field
+from globaleaks.handlers.public import db_prefetch_questionnaires, serialize_field
 from globaleaks.rest import errors, requests
 from globaleaks.rest.apicache import GLApiCache
 from globaleaks.utils.structures import fill_localized_keys
@@ -305,14 +305,21 @@ def get_fieldtemplate_list(store, language, request_type=None):
     """
     language = language if request_type != 'export' else None
 
+    fields = list(store.find(models.Field, And(models.Field.instance == u'template',
+                                               models.Field.fieldgroup_id == None)))
+
+    graph = db_prefetch_questionnaires(store, field_ids=[f.id for f in fields])
+
     ret = []
-    for f in store.find(models.Field, And(models.Field.instance == u'template',
-                                          models.Field.fieldgroup_id == None)):
-        ret.append(serialize_field(store, f, language))
+    for f in fields:
+        ret.append(serialize_field(store, f, language, graph))
 
     return ret
 
 
+GLApiCache.register('fieldtemplates', ['field'])
+
+
 class FieldTemplatesCollection(BaseHandler):
     @BaseHandler.transport_security_check('admin')
     @BaseHandler.authenticated('admin')
@@ -385,7 +392,7 @@ class FieldTemplateInstance(BaseHandler):
                                       self.request.language,
                                       self.request.request_type)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['field'])
 
         self.set_status(202) # Updated
         self.write(response)
@@ -402,7 +409,7 @@ class FieldTemplateInstance(BaseHandler):
         """
         yield delete_field(field_id)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['field'])
 
 
 class FieldCollection(BaseHandler):
@@ -429,7 +436,7 @@ class FieldCollection(BaseHandler):
                                       self.request.language,
                                       self.request.request_type)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['field'])
 
         self.set_status(201)
         self.write(response)
@@ -458,7 +465,7 @@ class FieldInstance(BaseHandler):
                                    self.request.language,
                                    self.request.request_type)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['field'])
 
         self.write(response)
 
@@ -483,7 +490,7 @@ class FieldInstance(BaseHandler):
                                       self.request.language,
                                       self.request.request_type)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['field'])
 
         self.set_status(202) # Updated
         self.write(response)
@@ -501,4 +508,4 @@ class FieldInstance(BaseHandler):
         """
         yield delete_field(field_id)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['field'])
@@ -10,13 +10,13 @@
 
 from __future__ import with_statement
 
-import json
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks import models
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.orm import transact
 from globaleaks.rest.apicache import GLApiCache
+from globaleaks.utils import jsoncodec
 
 
 @transact
@@ -56,11 +56,11 @@ class AdminL10NHandler(BaseHandler):
     @BaseHandler.authenticated('admin')
     @inlineCallbacks
     def put(self, lang):
-        request = json.loads(self.request.body)
+        request = jsoncodec.loads(self.request.body)
 
         yield update_custom_texts(lang, request)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['l10n'], lang)
 
         self.set_status(202)  # Updated
 
@@ -70,4 +70,4 @@ class AdminL10NHandler(BaseHandler):
     def delete(self, lang):
         yield delete_custom_texts(lang)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['l10n'], lang)
@@ -61,7 +61,7 @@ class ModelImgInstance(BaseHandler):
         finally:
             uploaded_file['body'].close()
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['file'])
 
         self.set_status(201)
 
@@ -71,4 +71,4 @@ class ModelImgInstance(BaseHandler):
     def delete(self, obj_key, obj_id):
         yield del_model_img(model_map[obj_key], obj_id)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['file'])
@@ -10,7 +10,7 @@ from globaleaks.models.properties import iso_strf_time
 from globaleaks.orm import transact
 from globaleaks.rest import requests
 from globaleaks.settings import GLSettings
-from globaleaks.security import parse_pgp_key
+from globaleaks.security import parse_pgp_key, GLPGPKeyring
 from globaleaks.utils.mailutils import sendmail
 from globaleaks.utils.sets import disjoint_union
 from globaleaks.utils.utility import log
@@ -31,6 +31,10 @@ def parse_pgp_options(notif, request):
     if not remove_key and pgp_key_public != '':
         k = parse_pgp_key(pgp_key_public)
 
+    old_fingerprint = notif.get_val('exception_email_pgp_key_fingerprint')
+    if k is None or k['fingerprint'] != old_fingerprint:
+        GLPGPKeyring.remove_key(old_fingerprint)
+
     if k is not None:
         notif.set_val('exception_email_pgp_key_public', k['public'])
         notif.set_val('exception_email_pgp_key_fingerprint', k['fingerprint'])
@@ -8,12 +8,13 @@ from twisted.internet.defer import inlineCallbacks
 
 from globaleaks import models
 from globaleaks.handlers.base import BaseHandler
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transact_ro
+from globaleaks.utils import admission
 from globaleaks.utils.structures import Rosetta
 from globaleaks.utils.utility import datetime_to_ISO8601
 
 
-@transact
+@transact_ro
 def collect_tip_overview(store, language):
     tip_description_list = []
 
@@ -35,7 +36,7 @@ def collect_tip_overview(store, language):
     return tip_description_list
 
 
-@transact
+@transact_ro
 def collect_files_overview(store):
     file_description_list = []
 
@@ -68,6 +69,7 @@ class Tips(BaseHandler):
     /admin/overview/tips
     Dump the list of the active tips with various information
     """
+    admission_priority = admission.LOW
 
     @BaseHandler.transport_security_check('admin')
     @BaseHandler.authenticated('admin')
@@ -90,6 +92,7 @@ class Files(BaseHandler):
     Return the list of the files in InternalFile, ReceiverFile
     and the files in
     """
+    admission_priority = admission.LOW
 
     @BaseHandler.transport_security_check('admin')
     @BaseHandler.authenticated('admin')
@@ -10,7 +10,7 @@ from twisted.internet.defer import inlineCallbacks
 from globaleaks import models
 from globaleaks.handlers.admin.step import db_create_step
 from globaleaks.handlers.base import BaseHandler
-from globaleaks.handlers.public import serialize_step, serialize_questionnaire
+from globaleaks.handlers.public import db_prefetch_questionnaires, serialize_step, serialize_questionnaire
 from globaleaks.orm import transact
 from globaleaks.rest import errors, requests
 from globaleaks.rest.apicache import GLApiCache
@@ -27,8 +27,12 @@ def get_questionnaire_list(store, language):
     :param language: the language in which to localize data.
     :return: a dictionary representing the serialization of the questionnaires.
     """
-    return [serialize_questionnaire(store, questionnaire, language)
-        for questionnaire in store.find(models.Questionnaire)]
+    questionnaires = list(store.find(models.Questionnaire))
+
+    graph = db_prefetch_questionnaires(store, questionnaire_ids=[q.id for q in questionnaires])
+
+    return [serialize_questionnaire(store, questionnaire, language, graph)
+        for questionnaire in questionnaires]
 
 
 @transact
@@ -61,7 +65,9 @@ def db_get_questionnaire_steps(store, questionnaire_id, language):
         log.err("Requested invalid questionnaire")
         raise errors.QuestionnaireIdNotFound
 
-    return [serialize_step(store, s, language) for s in questionnaire.steps]
+    graph = db_prefetch_questionnaires(store, questionnaire_ids=[questionnaire.id])
+
+    return [serialize_step(store, s, language, graph) for s in graph.steps.get(questionnaire.id, [])]
 
 
 @transact
@@ -166,6 +172,9 @@ def delete_questionnaire(store, questionnaire_id):
     store.remove(questionnaire)
 
 
+GLApiCache.register('questionnaires', ['questionnaire', 'step', 'field'])
+
+
 class QuestionnairesCollection(BaseHandler):
     @BaseHandler.transport_security_check('admin')
     @BaseHandler.authenticated('admin')
@@ -200,7 +209,7 @@ class QuestionnairesCollection(BaseHandler):
 
         response = yield create_questionnaire(request, self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['questionnaire'])
 
         self.set_status(201)
         self.write(response)
@@ -241,7 +250,7 @@ class QuestionnaireInstance(BaseHandler):
 
         response = yield update_questionnaire(questionnaire_id, request, self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['questionnaire'])
 
         self.set_status(202)
         self.write(response)
@@ -258,4 +267,4 @@ class QuestionnaireInstance(BaseHandler):
         Errors: InvalidInputFormat, QuestionnaireIdNotFound
         """
         yield delete_questionnaire(questionnaire_id)
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['questionnaire'])
@@ -10,10 +10,12 @@ import operator
 from storm.expr import Desc, And
 from twisted.internet.defer import inlineCallbacks
 
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transact_ro, transaction_stats
 from globaleaks.event import EventTrackQueue, events_monitored
 from globaleaks.handlers.base import BaseHandler
+from globaleaks.handlers.submission import archived_schema_cache
 from globaleaks.models import Stats, Anomalies
+from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
 from globaleaks.utils.utility import datetime_to_ISO8601, datetime_now, \
     utc_past_date, iso_to_gregorian, log
@@ -30,7 +32,7 @@ def weekmap_to_heatmap(week_map):
 
     return retlist
 
-@transact
+@transact_ro
 def get_stats(store, week_delta):
     """
     :param week_delta: commonly is 0, mean that you're taking this
@@ -128,7 +130,7 @@ def delete_weekstats_history(store):
     log.info("Week statistics removal completed.")
 
 
-@transact
+@transact_ro
 def get_anomaly_history(store, limit):
     anomalies = store.find(Anomalies).order_by(Desc(Anomalies.date))[:limit]
 
@@ -238,3 +240,45 @@ class RecentEventsCollection(BaseHandler):
             self.write(templist)
         else:  # kind == 'summary':
             self.write(self.get_summary(templist))
+
+
+class CacheStatsCollection(BaseHandler):
+    """
+    This handler returns the usage statistics of the in memory caches:
+    entries, memory, hits, misses and evictions of the API cache
+    (also per resource) and of the archived questionnaire schemas.
+    """
+    @BaseHandler.transport_security_check("admin")
+    @BaseHandler.authenticated("admin")
+    def get(self):
+        self.write({
+            'api': GLApiCache.stats(),
+            'archived_schemas': archived_schema_cache.stats()
+        })
+
+    @BaseHandler.transport_security_check("admin")
+    @BaseHandler.authenticated("admin")
+    def delete(self):
+        log.info("Received cache statistics reset command")
+        GLApiCache.reset_stats()
+        archived_schema_cache.reset_stats()
+        self.write({})
+
+
+class TransactionStatsCollection(BaseHandler):
+    """
+    This handler returns the latency stats of the transactions of each
+    function: time waited in the queue of the thread pool and for the
+    transact_lock, execution and commit times.
+    """
+    @BaseHandler.transport_security_check("admin")
+    @BaseHandler.authenticated("admin")
+    def get(self):
+        self.write(transaction_stats.stats())
+
+    @BaseHandler.transport_security_check("admin")
+    @BaseHandler.authenticated("admin")
+    def delete(self):
+        log.info("Received transaction statistics reset command")
+        transaction_stats.reset()
+        self.write({})
@@ -134,7 +134,7 @@ class StepCollection(BaseHandler):
 
         response = yield create_step(request, self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['step'])
 
         self.set_status(201)
         self.write(response)
@@ -182,7 +182,7 @@ class StepInstance(BaseHandler):
 
         response = yield update_step(step_id, request, self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['step'])
 
         self.set_status(202) # Updated
         self.write(response)
@@ -201,4 +201,4 @@ class StepInstance(BaseHandler):
         """
         yield delete_step(step_id)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['step'])
@@ -182,6 +182,8 @@ def delete_user(store, user_id):
     if not user.deletable:
         raise errors.UserNotDeletable
 
+    security.GLPGPKeyring.remove_key(user.pgp_key_fingerprint)
+
     store.remove(user)
 
 
@@ -232,7 +234,7 @@ class UsersCollection(BaseHandler):
         elif request['role'] == 'admin':
             response = yield create_admin_user(request, self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['user'])
 
         self.set_status(201) # Created
         self.write(response)
@@ -269,7 +271,7 @@ class UserInstance(BaseHandler):
         request = self.validate_message(self.request.body, requests.AdminUserDesc)
 
         response = yield admin_update_user(user_id, request, self.request.language)
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['user'])
 
         self.set_status(201)
         self.write(response)
@@ -288,4 +290,4 @@ class UserInstance(BaseHandler):
         """
         yield delete_user(user_id)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['user'])
@@ -5,16 +5,17 @@
 #
 # Files collection handlers and utils
 
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, returnValue
 from storm.expr import And
 
 from globaleaks import security
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transact_ro
 from globaleaks.models import User
 from globaleaks.settings import GLSettings
 from globaleaks.models import WhistleblowerTip
 from globaleaks.handlers.base import BaseHandler, GLSessions, GLSession
 from globaleaks.rest import errors, requests
+from globaleaks.utils import admission
 from globaleaks.utils.utility import datetime_now, deferred_sleep, log, randint
 
 
@@ -48,11 +49,7 @@ def random_login_delay():
 
 
 @transact
-def login_whistleblower(store, receipt, using_tor2web):
-    """
-    login_whistleblower returns the WhistleblowerTip.id
-    """
-    hashed_receipt = security.hash_password(receipt, GLSettings.memory_copy.private.receipt_salt)
+def db_login_whistleblower(store, hashed_receipt, using_tor2web):
     wbtip = store.find(WhistleblowerTip,
                        WhistleblowerTip.receipt_hash == unicode(hashed_receipt)).one()
 
@@ -72,15 +69,40 @@ def login_whistleblower(store, receipt, using_tor2web):
     return wbtip.id
 
 
-@transact
-def login(store, username, password, using_tor2web):
+@inlineCallbacks
+def login_whistleblower(receipt, using_tor2web):
     """
-    login returns a tuple (user_id, state, pcn)
+    login_whistleblower returns the WhistleblowerTip.id
+
+    The receipt is hashed outside of the transaction (see security.deferred_hash_password)
+    """
+    hashed_receipt = yield security.deferred_hash_password(receipt, GLSettings.memory_copy.private.receipt_salt)
+
+    wbtip_id = yield db_login_whistleblower(hashed_receipt, using_tor2web)
+
+    returnValue(wbtip_id)
+
+
+@transact_ro
+def get_user_credentials(store, username):
+    """
+    get_user_credentials returns a tuple (user_id, salt, password) or None
     """
     user = store.find(User, And(User.username == username,
                                 User.state != u'disabled')).one()
 
-    if not user or not security.check_password(password,  user.salt, user.password):
+    if user:
+        return user.id, user.salt, user.password
+
+
+@transact
+def db_login(store, user_id, password_hash, using_tor2web):
+    user = store.find(User, And(User.id == user_id,
+                                User.state != u'disabled')).one()
+
+    # the user may have been disabled or its password changed
+    # after the check of the credentials
+    if not user or user.password != password_hash:
         log.debug("Login: Invalid credentials")
         GLSettings.failed_login_attempts += 1
         raise errors.InvalidAuthentication
@@ -96,11 +118,35 @@ def login(store, username, password, using_tor2web):
     return user.id, user.state, user.role, user.password_change_needed
 
 
+@inlineCallbacks
+def login(username, password, using_tor2web):
+    """
+    login returns a tuple (user_id, state, role, pcn)
+
+    The password is checked outside of the transactions (see security.deferred_check_password)
+    """
+    credentials = yield get_user_credentials(username)
+
+    if credentials is not None:
+        user_id, salt, password_hash = credentials
+        valid = yield security.deferred_check_password(password, salt, password_hash)
+
+    if credentials is None or not valid:
+        log.debug("Login: Invalid credentials")
+        GLSettings.failed_login_attempts += 1
+        raise errors.InvalidAuthentication
+
+    ret = yield db_login(user_id, password_hash, using_tor2web)
+
+    returnValue(ret)
+
+
 class AuthenticationHandler(BaseHandler):
     """
     Login handler for admins and recipents and custodians
     """
     handler_exec_time_threshold = 60
+    admission_priority = admission.HIGH
 
     @BaseHandler.authenticated('*')
     def get(self):
@@ -6,14 +6,14 @@ our needs.
 
 import base64
 import collections
-import json
+import email.utils
 import mimetypes
 import os
 import re
 import sys
 import time
 from StringIO import StringIO
-from twisted.internet import fdesc, reactor
+from twisted.internet import fdesc, reactor, threads
 from twisted.internet.defer import inlineCallbacks
 from twisted.python.failure import Failure
 
@@ -23,10 +23,17 @@ from cyclone.httpserver import HTTPConnection, HTTPRequest, _BadRequestException
 from cyclone.web import RequestHandler, HTTPError, HTTPAuthenticationRequired, RedirectHandler
 from globaleaks.event import track_handler
 from globaleaks.rest import errors, requests
+from globaleaks.rest.validator import get_validator
 from globaleaks.security import GLSecureTemporaryFile, directory_traversal_check, generateRandomKey
 from globaleaks.settings import GLSettings
+from globaleaks.utils import admission, jsoncodec
+from globaleaks.utils.admission import admission_control
 from globaleaks.utils.mailutils import mail_exception_handler, send_exception_email
+from globaleaks.utils.multipart import MultipartParser
+from globaleaks.utils.sqltracer import QueryStats, call_with_query_stats
+from globaleaks.utils.staticfiles import static_file_index
 from globaleaks.utils.tempdict import TempDict
+from globaleaks.utils.timingstats import timing_stats
 from globaleaks.utils.utility import log, datetime_now, deferred_sleep
 
 HANDLER_EXEC_TIME_THRESHOLD = 30
@@ -44,23 +51,56 @@ mimetypes.add_type('application/woff2', '.woff2')
 class StaticFileProducer(object):
     """Streaming producter for files
 
+    The file is read in a thread so that the reactor is never blocked
+    waiting for the disk.
+
     @ivar handler: The L{IRequest} to write the contents of the file to.
     @ivar fileObject: The file the contents of which to write to the request.
+    @ivar length: The number of bytes to write starting from the current
+        position of the file; the whole file if None.
     """
     bufferSize = GLSettings.file_chunk_size
 
-    def __init__(self, handler, fileObject):
+    def __init__(self, handler, fileObject, length=None):
         self.handler = handler
         self.fileObject = fileObject
+        self.remaining = length
+        self.reading = False
 
     def start(self):
+        # the admission slot is held only while the handler prepares the
+        # response and not for the whole transfer
+        self.handler.release_admission()
         self.handler.request.connection.transport.registerProducer(self, False)
 
     def resumeProducing(self):
+        if not self.handler or self.reading:
+            return
+
+        size = self.bufferSize
+        if self.remaining is not None:
+            size = min(size, self.remaining)
+
+        self.reading = True
+        threads.deferToThread(self.fileObject.read, size).addBoth(self.dataRead)
+
+    def dataRead(self, data):
+        self.reading = False
+
         if not self.handler:
+            # the producer has been stopped while reading
+            self.fileObject.close()
             return
-        data = self.fileObject.read(self.bufferSize)
-        if data:
+
+        if isinstance(data, Failure):
+            log.err("Unable to read file %s: %s" % (self.fileObject.name, data.getErrorMessage()))
+            self.handler.request.connection.transport.unregisterProducer()
+            self.handler.request.connection.transport.loseConnection()
+            self.stopProducing()
+        elif data:
+            if self.remaining is not None:
+                self.remaining -= len(data)
+
             self.handler.write(data)
             self.handler.flush()
         else:
@@ -69,7 +109,12 @@ class StaticFileProducer(object):
             self.stopProducing()
 
     def stopProducing(self):
-        self.fileObject.close()
+        if not self.reading:
+            self.fileObject.close()
+
+        if self.handler:
+            self.handler.release_admission()
+
         self.handler = None
 
 
@@ -89,9 +134,86 @@ class GLSession(object):
         return "%s %s expire in %s" % (self.user_role, self.user_id, self.expireCall)
 
 
+def parse_range_header(value):
+    """
+    Parse the value of a Range header requesting a single byte range
+
+    :return: a tuple (first, last) where first is None for suffix ranges
+        and last is None for open ranges; None if the header is missing,
+        malformed or requests multiple ranges (that are not supported).
+    """
+    if value is None:
+        return None
+
+    unit, _, byte_range = value.partition('=')
+    if unit.strip() != 'bytes' or ',' in byte_range:
+        return None
+
+    first, sep, last = byte_range.strip().partition('-')
+    if not sep:
+        return None
+
+    try:
+        first = int(first) if first.strip() else None
+        last = int(last) if last.strip() else None
+    except ValueError:
+        return None
+
+    if first is None and last is None:
+        return None
+
+    if first is not None and last is not None and last < first:
+        return None
+
+    return first, last
+
+
+def accepts_encoding(value, encoding):
+    """
+    Check if the value of an Accept-Encoding header accepts a content coding
+
+    :return: True if the coding, or the wildcard when the coding is not
+        listed, is present with a q-value greater than zero.
+    """
+    if value is None:
+        return False
+
+    qvalues = {}
+    for item in value.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        qvalue = 1.0
+        for param in params.split(';'):
+            name, _, param_value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    qvalue = float(param_value)
+                except ValueError:
+                    qvalue = 0.0
+
+        qvalues[coding] = qvalue
+
+    return qvalues.get(encoding, qvalues.get('*', 0.0)) > 0
+
+
+def get_multipart_boundary(headers):
+    content_type = headers.get("Content-Type", "")
+    if not content_type.startswith("multipart/form-data"):
+        return None
+
+    for field in content_type.split(";"):
+        k, _, v = field.strip().partition("=")
+        if k == "boundary" and v:
+            return v
+
+
 class GLHTTPConnection(HTTPConnection):
     def __init__(self):
         self.uploaded_file = {}
+        self._multipart_parser = None
 
     def _on_headers(self, data):
         try:
@@ -128,7 +250,17 @@ class GLHTTPConnection(HTTPConnection):
                 if headers.get("Expect") == "100-continue":
                     self.transport.write("HTTP/1.1 100 (Continue)\r\n\r\n")
 
-                if content_length < 100000:
+                boundary = get_multipart_boundary(headers)
+
+                if boundary is not None and method in ("POST", "PUT"):
+                    # multipart bodies (i.e. file uploads) are parsed while they are received
+                    # and the files are written directly to encrypted temporary files
+                    self._multipart_parser = MultipartParser(boundary,
+                                                             self._request.arguments,
+                                                             self._request.files,
+                                                             lambda: GLSecureTemporaryFile(GLSettings.tmp_upload_path))
+                    self._request.body = ''
+                elif content_length < 100000:
                     self._contentbuffer = StringIO()
                 else:
                     self._contentbuffer = GLSecureTemporaryFile(GLSettings.tmp_upload_path)
@@ -142,17 +274,59 @@ class GLHTTPConnection(HTTPConnection):
             log.msg("Exception while handling HTTP request from %s: %s" % (self._remote_ip, e))
             self.transport.loseConnection()
 
+    def rawDataReceived(self, data):
+        if self._multipart_parser is None:
+            return HTTPConnection.rawDataReceived(self, data)
+
+        data, rest = data[:self.content_length], data[self.content_length:]
+        self.content_length -= len(data)
+
+        try:
+            self._multipart_parser.feed(data)
+
+            if self.content_length == 0:
+                self._multipart_parser.close()
+        except Exception as e:
+            log.msg("Exception while parsing multipart body from %s: %s" % (self._remote_ip, e))
+            self._multipart_parser.abort()
+            self._multipart_parser = self.content_length = None
+            self.transport.loseConnection()
+            return
+
+        if self.content_length == 0:
+            self._multipart_parser = self.content_length = None
+            self.request_callback(self._request)
+            self.setLineMode(rest)
+
+    def connectionLost(self, reason):
+        if self._multipart_parser is not None:
+            self._multipart_parser.abort()
+            self._multipart_parser = None
+
+        HTTPConnection.connectionLost(self, reason)
+
 
 class BaseHandler(RequestHandler):
     serialize_lists = True
+    admission_priority = admission.NORMAL
     handler_exec_time_threshold = HANDLER_EXEC_TIME_THRESHOLD
     filehandler = False
 
-    def __init__(self, application, request, **kwargs):
+    def __init__(self, application, request, route=None, **kwargs):
         RequestHandler.__init__(self, application, request, **kwargs)
 
         self.name = type(self).__name__
 
+        # the pattern of the route served by the handler as set by the
+        # API factory; used to account the timing stats of the requests
+        self.route = route if route is not None else self.name
+
+        # number and time of the SQL statements executed serving the request
+        self.query_stats = QueryStats('%s %s' % (self.request.method, self.request.path))
+
+        self.admitted = False
+        self.admission = None
+
         self.handler_time_analysis_begin()
         self.handler_request_logging_begin()
 
@@ -482,17 +656,28 @@ class BaseHandler(RequestHandler):
     @staticmethod
     def validate_message(message, message_template):
         try:
-            jmessage = json.loads(message)
+            jmessage = jsoncodec.loads(message)
         except ValueError:
             raise errors.InvalidInputFormat("Invalid JSON format")
 
-        if BaseHandler.validate_jmessage(jmessage, message_template):
+        if get_validator(message_template)(jmessage):
             return jmessage
 
         raise errors.InvalidInputFormat("Unexpected condition!?")
 
     def on_connection_close(self, *args, **kwargs):
-        pass
+        if self.admission is not None and not self.admission.called:
+            admission_control.cancel(self.admission_priority, self.admission)
+
+        self.release_admission()
+
+    def release_admission(self):
+        """
+        Give back the admission slot of the request, if it holds one.
+        """
+        if self.admitted:
+            self.admitted = False
+            admission_control.release(self.admission_priority)
 
     def prepare(self):
         """
@@ -517,6 +702,8 @@ class BaseHandler(RequestHandler):
         self.handler_time_analysis_end()
         self.handler_request_logging_end()
 
+        self.release_admission()
+
     def do_verbose_log(self, content):
         """
         Record in the verbose log the content as defined by Cyclone wrappers.
@@ -531,9 +718,112 @@ class BaseHandler(RequestHandler):
         except Exception as excep:
             log.err("Unable to open %s: %s" % (GLSettings.httplogfile, excep))
 
+    def write(self, chunk):
+        if isinstance(chunk, (dict, list)):
+            chunk = jsoncodec.encode(chunk)
+            self.set_header("Content-Type", "application/json")
+
+        RequestHandler.write(self, chunk)
+
+    def write_cached_response(self, response):
+        """
+        Write a GLApiCachedResponse answering 304 to conditional requests
+        matching its ETag and using its gzip body when accepted by the client
+        """
+        # the resource can be stored by the client but needs to be revalidated
+        self.set_header("Cache-control", "no-cache, must-revalidate")
+        self.clear_header("Pragma")
+        self.clear_header("Expires")
+        self.set_header("Content-Type", "application/json")
+
+        use_gzip = self.request.supports_http_1_1() and \
+                   accepts_encoding(self.request.headers.get("Accept-Encoding"), "gzip")
+
+        # the caches must not serve the encoding chosen for a client to the others
+        self.set_header("Vary", "Accept-Encoding")
+        self.set_header("Etag", response.gzip_etag if use_gzip else response.etag)
+
+        if response.matches(self.request.headers.get("If-None-Match")):
+            self.set_status(304)
+            return
+
+        if use_gzip:
+            self.set_header("Content-Encoding", "gzip")
+            self.write(response.gzip_body)
+        else:
+            self.write(response.body)
+
+    def get_byte_range(self, size):
+        """
+        Return the (start, end) byte range requested with the Range header
+        of the request, None if the whole file should be sent or False if
+        the requested range cannot be satisfied.
+
+        The range is ignored if an If-Range header does not match the
+        current ETag or Last-Modified of the file.
+        """
+        byte_range = parse_range_header(self.request.headers.get('Range'))
+        if byte_range is None:
+            return None
+
+        if_range = self.request.headers.get('If-Range')
+        if if_range is not None and if_range not in (self._headers.get('Etag'),
+                                                      self._headers.get('Last-Modified')):
+            return None
+
+        first, last = byte_range
+
+        if first is None:
+            # suffix range: the last bytes of the file
+            if last == 0 or size == 0:
+                return False
+
+            return max(size - last, 0), size - 1
+
+        if first >= size:
+            return False
+
+        return first, size - 1 if last is None else min(last, size - 1)
+
     def write_file(self, filepath):
+        """
+        Stream the file, or the byte range requested by the client
+
+        :return: the (start, end) byte range served, None if the whole file
+            is served or False if the requested range cannot be satisfied.
+        """
+        stat = os.stat(filepath)
+
+        if 'Etag' not in self._headers:
+            self.set_header('Etag', '"%x-%x"' % (int(stat.st_mtime), stat.st_size))
+
+        if 'Last-Modified' not in self._headers:
+            self.set_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+
+        self.set_header('Accept-Ranges', 'bytes')
+
+        byte_range = self.get_byte_range(stat.st_size)
+
+        if byte_range is False:
+            self.set_status(416)
+            self.set_header('Content-Range', 'bytes */%d' % stat.st_size)
+            self.finish()
+            return byte_range
+
         f = open(filepath, "rb")
-        StaticFileProducer(self, f).start()
+
+        if byte_range is None:
+            self.set_header('Content-Length', stat.st_size)
+            StaticFileProducer(self, f).start()
+        else:
+            start, end = byte_range
+            self.set_status(206)
+            self.set_header('Content-Range', 'bytes %d-%d/%d' % (start, end, stat.st_size))
+            self.set_header('Content-Length', end - start + 1)
+            f.seek(start)
+            StaticFileProducer(self, f, end - start + 1).start()
+
+        return byte_range
 
     def write_error(self, status_code, **kw):
         exception = kw.get('exception')
@@ -548,6 +838,9 @@ class BaseHandler(RequestHandler):
             else:
                 error_dict.update({'arguments': []})
 
+            if hasattr(exception, 'retry_after'):
+                self.set_header('Retry-After', str(exception.retry_after))
+
             self.set_status(status_code)
             self.write(error_dict)
         else:
@@ -581,12 +874,27 @@ class BaseHandler(RequestHandler):
     def check_tor2web(self):
         return False if self.request.headers.get('X-Tor2Web', None) is None else True
 
+    def close_file_uploads(self):
+        """
+        Close the temporary files of the file parts of the request
+        and forget the upload flows started by them
+        """
+        bodies = [part['body'] for parts in self.request.files.itervalues() for part in parts]
+
+        for flow_identifier, f in GLUploads.items():
+            if f in bodies:
+                del GLUploads[flow_identifier]
+
+        for body in bodies:
+            body.close()
+
     def get_file_upload(self):
         try:
             if len(self.request.files) != 1:
                 raise errors.InvalidInputFormat("cannot accept more than a file upload at once")
 
-            chunk_size = len(self.request.files['file'][0]['body'])
+            chunk = self.request.files['file'][0]
+            chunk_size = chunk['body_len']
             total_file_size = int(self.request.arguments['flowTotalSize'][0]) if 'flowTotalSize' in self.request.arguments else chunk_size
             flow_identifier = self.request.arguments['flowIdentifier'][0] if 'flowIdentifier' in self.request.arguments else generateRandomKey(10)
 
@@ -596,20 +904,27 @@ class BaseHandler(RequestHandler):
                 raise errors.FileTooBig(GLSettings.memory_copy.maximum_filesize)
 
             if flow_identifier not in GLUploads:
-                f = GLSecureTemporaryFile(GLSettings.tmp_upload_path)
+                # the first chunk is already written in an encrypted temporary file
+                # that is kept as the file on which the next chunks are appended
+                f = chunk['body']
                 GLUploads[flow_identifier] = f
             else:
                 f = GLUploads[flow_identifier]
 
-            f.write(self.request.files['file'][0]['body'])
+                data = chunk['body'].read(GLSettings.file_chunk_size)
+                while data:
+                    f.write(data)
+                    data = chunk['body'].read(GLSettings.file_chunk_size)
+
+                chunk['body'].close()
 
             if 'flowChunkNumber' in self.request.arguments and 'flowTotalChunks' in self.request.arguments:
                 if self.request.arguments['flowChunkNumber'][0] != self.request.arguments['flowTotalChunks'][0]:
                     return None
 
             uploaded_file = {
-                'filename': self.request.files['file'][0]['filename'],
-                'content_type': self.request.files['file'][0]['content_type'],
+                'filename': chunk['filename'],
+                'content_type': chunk['content_type'],
                 'body_len': total_file_size,
                 'body_filepath': f.filepath,
                 'body': f
@@ -621,12 +936,37 @@ class BaseHandler(RequestHandler):
             return uploaded_file
 
         except errors.FileTooBig:
+            self.close_file_uploads()
             raise  # propagate the exception
 
         except Exception as exc:
             log.err("Error while handling file upload %s" % exc)
+            self.close_file_uploads()
             return None
 
+    def _execute_handler(self, r, args, kwargs):
+        if self.admission_priority is None:
+            return self._execute_admitted_handler(None, r, args, kwargs)
+
+        self.admission = admission_control.acquire(self.admission_priority)
+
+        if not self.admission.called:
+            # cyclone registers on_connection_close only once the handler is
+            # executed; the request must leave the queue if the client goes away
+            self.notifyFinish().addCallback(self.on_connection_close)
+
+        self.admission.addCallbacks(
+            self._execute_admitted_handler,
+            lambda f: self._handle_request_exception(f.value),
+            callbackArgs=(r, args, kwargs))
+
+    def _execute_admitted_handler(self, _, r, args, kwargs):
+        self.admitted = self.admission_priority is not None
+
+        # the transactions executed by the handler account their statements
+        # to the query stats of the request
+        return call_with_query_stats(self.query_stats, RequestHandler._execute_handler, self, r, args, kwargs)
+
     def _handle_request_exception(self, e):
         ret = RequestHandler._handle_request_exception(self, e)
 
@@ -646,13 +986,14 @@ class BaseHandler(RequestHandler):
         self.start_time = time.time()
 
     def handler_time_analysis_end(self):
-        """
-        If the software is running with the option -S --stats (GLSetting.log_timing_stats)
-        then we are doing performance testing, having our mailbox spammed is not important,
-        so we just skip to report the anomaly.
-        """
         current_run_time = time.time() - self.start_time
 
+        timing_stats.record(self.route, self.request.method, self.get_status(), current_run_time)
+
+        if self.query_stats.count:
+            log.debug("Request %s executed %d queries in %.3fs" %
+                      (self.query_stats.name, self.query_stats.count, self.query_stats.time))
+
         if current_run_time > self.handler_exec_time_threshold:
             error = "Handler [%s] exceeded execution threshold (of %d secs) with an execution time of %.2f seconds" % \
                     (self.name, self.handler_exec_time_threshold, current_run_time)
@@ -660,10 +1001,6 @@ class BaseHandler(RequestHandler):
 
             send_exception_email(error)
 
-        if GLSettings.log_timing_stats:
-            TimingStatsHandler.log_measured_timing(self.request.method, self.request.uri, self.start_time, current_run_time)
-
-
     def handler_request_logging_begin(self):
         if GLSettings.devel_mode and GLSettings.log_requests_responses:
             try:
@@ -677,14 +1014,14 @@ class BaseHandler(RequestHandler):
                 for k, v in self.request.headers.get_all():
                     content += "%s: %s\n" % (k, v)
 
-                if type(self.request.body) == dict and 'body' in self.request.body:
-                    # this is needed due to cyclone hack for file uploads
-                    body = self.request.body['body'].read()
-                else:
-                    body = self.request.body
+                if len(self.request.body):
+                    content += "\nrequest-body:\n" + self.request.body + "\n"
 
-                if len(body):
-                    content += "\nrequest-body:\n" + body + "\n"
+                # the content of the uploaded files is not logged
+                for name, parts in self.request.files.iteritems():
+                    for part in parts:
+                        content += "\nrequest-file: %s %s (%s, %d bytes)\n" % \
+                                   (name, part['filename'], part['content_type'], part['body_len'])
 
                 self.do_verbose_log(content)
 
@@ -706,6 +1043,9 @@ class BaseHandler(RequestHandler):
 
 
 class BaseStaticFileHandler(BaseHandler):
+    # static files are served from memory or streamed from the disk
+    admission_priority = None
+
     def initialize(self, path):
         self.root = "%s%s" % (os.path.abspath(path), "/")
 
@@ -722,56 +1062,93 @@ class BaseStaticFileHandler(BaseHandler):
         if not os.path.exists(abspath) or not os.path.isfile(abspath):
             raise HTTPError(404)
 
-        mime_type, encoding = mimetypes.guess_type(abspath)
-        if mime_type:
-            self.set_header("Content-Type", mime_type)
+        return static_file_index.get(abspath).addCallback(self.write_static_file)
 
-        self.write_file(abspath)
+    def is_not_modified(self, etag, mtime):
+        if_none_match = self.request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or \
+                   etag in [x.strip() for x in if_none_match.split(',')]
 
+        if_modified_since = self.request.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            date = email.utils.parsedate_tz(if_modified_since)
+            return date is not None and int(mtime) <= email.utils.mktime_tz(date)
 
-class BaseRedirectHandler(BaseHandler, RedirectHandler):
-    pass
+        return False
+
+    def write_static_file(self, entry):
+        """
+        Serve the file described by the StaticFileEntry, answering with a 304
+        to the conditional requests matching the current version of the file.
+        """
+        use_gzip = entry.gzip_path is not None and \
+                   accepts_encoding(self.request.headers.get('Accept-Encoding'), 'gzip')
 
+        if entry.gzip_path is not None:
+            # the caches must not serve the encoding chosen for a client to the others
+            self.set_header('Vary', 'Accept-Encoding')
 
-class TimingStatsHandler(BaseHandler):
-    TimingsTracker = []
+        if entry.fingerprinted:
+            self.set_header('Cache-Control', 'public, max-age=31536000')
+        else:
+            self.set_header('Cache-Control', 'no-cache, must-revalidate')
 
-    @staticmethod
-    def log_measured_timing(method, uri, start_time, run_time):
-        if not GLSettings.log_timing_stats:
-            return
+        self.clear_header('Pragma')
+        self.clear_header('Expires')
+
+        if entry.mime_type:
+            self.set_header('Content-Type', entry.mime_type)
 
-        if uri == '/s/timings':
+        etag = entry.gzip_etag if use_gzip else entry.etag
+        self.set_header('Etag', etag)
+        self.set_header('Last-Modified', email.utils.formatdate(entry.mtime, usegmt=True))
+
+        if self.is_not_modified(etag, entry.mtime):
+            self.set_status(304)
+            self.finish()
             return
 
-        TimingStatsHandler.TimingsTracker = \
-            TimingStatsHandler.TimingsTracker[999:] if len(TimingStatsHandler.TimingsTracker) > 999 else TimingStatsHandler.TimingsTracker
-
-        if method == 'POST' and uri == '/token':
-            category = 'token'
-        elif method == 'PUT' and uri.startswith('/submission'):
-            category = 'submission'
-        elif method == 'POST' and uri == '/wbtip/comments':
-            category = 'comment'
-        elif method == 'JOB' and uri == 'Delivery':
-            category = 'delivery'
+        if use_gzip:
+            self.set_header('Content-Encoding', 'gzip')
+            data, path = entry.gzip_data, entry.gzip_path
+        else:
+            data, path = entry.data, entry.path
+
+        if data is not None:
+            self.finish(data)
         else:
-            category = 'uncategorized'
+            self.write_file(path)
+
+
+class BaseRedirectHandler(BaseHandler, RedirectHandler):
+    pass
+
+
+class TimingStatsHandler(BaseHandler):
+    """
+    Serve the latency histograms of the requests and of the jobs;
+    with the option -S --request-stats (GLSettings.log_timing_stats)
+    they are served also to unauthenticated clients.
+    """
+    def check_access(self):
+        if GLSettings.log_timing_stats:
+            return
 
-        TimingStatsHandler.TimingsTracker.append({
-            'category': category,
-            'method': method,
-            'uri': uri,
-            'start_time': start_time,
-            'run_time': run_time
-        })
+        if not self.current_user:
+            raise errors.NotAuthenticated
 
+        if self.current_user.user_role != 'admin':
+            raise errors.InvalidAuthentication
+
+    @BaseHandler.unauthenticated
     def get(self):
-        csv = "category,method,uri,start_time,run_time\n"
-        for measure in TimingStatsHandler.TimingsTracker:
-            csv += "%s,%s,%s,%s,%d\n" % (measure['category'],
-                                         measure['method'],
-                                         measure['uri'],
-                                         measure['start_time'],
-                                         measure['run_time'])
-        self.write(csv)
+        self.check_access()
+
+        self.write(timing_stats.stats())
+
+    @BaseHandler.unauthenticated
+    def delete(self):
+        self.check_access()
+
+        timing_stats.reset()
@@ -11,17 +11,17 @@ from cyclone.web import asynchronous
 from twisted.internet import threads
 from twisted.internet.defer import inlineCallbacks
 
-from globaleaks import models
 from globaleaks.handlers.admin.context import admin_serialize_context
 from globaleaks.handlers.admin.node import db_admin_serialize_node
 from globaleaks.handlers.admin.notification import db_get_notification
 from globaleaks.handlers.admin.receiver import admin_serialize_receiver
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.handlers.files import serialize_receiver_file
-from globaleaks.handlers.rtip import db_access_rtip, serialize_rtip, \
-    db_get_itip_comment_list, db_get_itip_message_list
+from globaleaks.handlers.rtip import db_access_rtip, serialize_rtip
+from globaleaks.handlers.submission import db_prefetch_tips
 from globaleaks.orm import transact
 from globaleaks.settings import GLSettings
+from globaleaks.utils import admission
 from globaleaks.utils.templating import Templating
 from globaleaks.utils.utility import deferred_sleep
 from globaleaks.utils.zipstream import ZipStream
@@ -33,13 +33,15 @@ def get_tip_export(store, user_id, rtip_id, language):
 
     receiver = rtip.receiver
 
-    rtip_dict = serialize_rtip(store, rtip, language)
+    graph = db_prefetch_tips(store, [rtip.internaltip_id])
+
+    rtip_dict = serialize_rtip(store, rtip, language, graph)
 
     export_dict = {
         'type': u'export_template',
         'node': db_admin_serialize_node(store, language),
         'notification': db_get_notification(store, language),
-        'tip': serialize_rtip(store, rtip, language),
+        'tip': rtip_dict,
         'context': admin_serialize_context(store, rtip.internaltip.context, language),
         'receiver': admin_serialize_receiver(receiver, language),
         'comments': rtip_dict['comments'],
@@ -51,7 +53,7 @@ def get_tip_export(store, user_id, rtip_id, language):
 
     export_dict['files'].append({'buf': export_template, 'name': "data.txt"})
 
-    for rf in store.find(models.ReceiverFile, models.ReceiverFile.receivertip_id == rtip_id):
+    for rf in graph.receiverfiles.get(rtip.id, []):
         rf.downloads += 1
         file_dict = serialize_receiver_file(rf)
         file_dict['name'] = 'files/' + file_dict['name']
@@ -76,6 +78,7 @@ class ZipStreamProducer(object):
         self.zipstreamObject = zipstreamObject
 
     def start(self):
+        self.handler.release_admission()
         self.handler.request.connection.transport.registerProducer(self, False)
 
     def resumeProducing(self):
@@ -92,6 +95,9 @@ class ZipStreamProducer(object):
             self.stopProducing()
 
     def stopProducing(self):
+        if self.handler:
+            self.handler.release_admission()
+
         self.handler = None
 
     def zip_chunk(self):
@@ -110,6 +116,7 @@ class ZipStreamProducer(object):
 
 class ExportHandler(BaseHandler):
     handler_exec_time_threshold = 3600
+    admission_priority = admission.LOW
 
     @BaseHandler.transport_security_check('receiver')
     @BaseHandler.authenticated('receiver')
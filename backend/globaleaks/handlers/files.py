@@ -18,6 +18,7 @@ from globaleaks.models import ReceiverFile, InternalTip, InternalFile, Whistlebl
 from globaleaks.orm import transact
 from globaleaks.rest import errors
 from globaleaks.settings import GLSettings
+from globaleaks.utils.signals import job_signals, DELIVERY
 from globaleaks.utils.token import TokenList
 from globaleaks.utils.utility import log, datetime_to_ISO8601, datetime_now
 
@@ -156,6 +157,8 @@ class FileAdd(BaseHandler):
             log.err("Unable to register (append) file in DB: %s" % excep)
             raise errors.InternalServerError("Unable to accept new files")
 
+        job_signals.emit(DELIVERY)
+
     @BaseHandler.transport_security_check('whistleblower')
     @BaseHandler.authenticated('whistleblower')
     @inlineCallbacks
@@ -234,13 +237,22 @@ def download_file(store, user_id, rtip_id, file_id):
     if not rfile or rfile.receivertip.receiver_id != user_id:
         raise errors.FileIdNotFound
 
+    return serialize_receiver_file(rfile)
+
+
+@transact
+def register_file_download(store, file_id):
+    rfile = store.find(ReceiverFile,
+                       ReceiverFile.id == unicode(file_id)).one()
+
+    if not rfile:
+        return
+
     log.debug("Download of file %s by receiver %s (%d)" %
               (rfile.internalfile_id, rfile.receivertip.receiver_id, rfile.downloads))
 
     rfile.downloads += 1
 
-    return serialize_receiver_file(rfile)
-
 
 class Download(BaseHandler):
     handler_exec_time_threshold = 3600
@@ -258,6 +270,10 @@ class Download(BaseHandler):
             self.set_header('X-Download-Options', 'noopen')
             self.set_header('Content-Type', 'application/octet-stream')
             self.set_header('Content-Disposition', 'attachment; filename=\"%s\"' % rfile['name'])
-            self.write_file(filelocation)
+            byte_range = self.write_file(filelocation)
+
+            # the continuation of an interrupted download is not a new download
+            if byte_range is None or (byte_range and byte_range[0] == 0):
+                yield register_file_download(rfile_id)
         else:
             self.set_status(404)
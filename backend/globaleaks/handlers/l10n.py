@@ -3,30 +3,30 @@
 # langfiles
 #  **************
 #
-import json
 import os
 
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks import models
 from globaleaks.handlers.base import BaseHandler
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transact_ro
 from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
 from globaleaks.security import directory_traversal_check
+from globaleaks.utils import jsoncodec
 
 
 def langfile_path(lang):
     return os.path.abspath(os.path.join(GLSettings.client_path, 'l10n', '%s.json' % lang))
 
 
-@transact
+@transact_ro
 def get_l10n(store, lang):
     path = langfile_path(lang)
     directory_traversal_check(GLSettings.client_path, path)
 
     with open(path, 'rb') as f:
-        texts = json.loads(f.read())
+        texts = jsoncodec.loads(f.read())
 
     custom_texts = store.find(models.CustomTexts, models.CustomTexts.lang == unicode(lang)).one()
     custom_texts = custom_texts.texts if custom_texts is not None else {}
@@ -36,6 +36,9 @@ def get_l10n(store, lang):
     return texts
 
 
+GLApiCache.register('l10n', ['l10n'], get_l10n)
+
+
 class L10NHandler(BaseHandler):
     """
     This class is used to return the custom translation files;
@@ -45,9 +48,7 @@ class L10NHandler(BaseHandler):
     @BaseHandler.unauthenticated
     @inlineCallbacks
     def get(self, lang):
-        self.set_header('Content-Type', 'application/json')
-
-        l10n = yield GLApiCache.get('l10n', self.request.language,
-                                    get_l10n, self.request.language)
+        l10n = yield GLApiCache.get_response('l10n', self.request.language,
+                                             get_l10n, self.request.language)
 
-        self.write(l10n)
+        self.write_cached_response(l10n)
@@ -0,0 +1,189 @@
+# -*- coding: UTF-8
+#
+#   metrics
+#   *******
+#
+# Implementation of the /metrics handler serving the metrics of the backend
+# in the Prometheus text exposition format.
+#
+# The handler is disabled by default; when enabled (--enable-metrics) it is
+# served to the admins and, when --metrics-port is given, without
+# authentication on a dedicated listener bound only to 127.0.0.1.
+# The main listener cannot be trusted for unauthenticated access from
+# localhost as the requests coming from the Tor hidden service reach it
+# from 127.0.0.1.
+from cyclone.web import HTTPError
+from twisted.internet.defer import inlineCallbacks, returnValue
+
+from globaleaks import models
+from globaleaks.anomaly import Alarm
+from globaleaks.event import EventTrackQueue
+from globaleaks.handlers.base import BaseHandler, GLSessions
+from globaleaks.orm import transact_ro, transaction_stats
+from globaleaks.rest.apicache import GLApiCache
+from globaleaks.settings import GLSettings
+from globaleaks.utils.admission import admission_control
+from globaleaks.utils.timingstats import timing_stats
+from globaleaks.utils.token import TokenList
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+QUANTILES = [0.5, 0.9, 0.99]
+
+
+def escape_label_value(value):
+    return unicode(value).replace(u'\\', u'\\\\').replace(u'"', u'\\"').replace(u'\n', u'\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return u''
+
+    return u'{%s}' % u','.join(u'%s="%s"' % (name, escape_label_value(value)) for name, value in labels)
+
+
+class MetricsWriter(object):
+    def __init__(self):
+        self.lines = []
+
+    def add(self, name, metric_type, description, samples):
+        """
+        Add a metric family; samples is a list of (suffix, labels, value)
+        """
+        self.lines.append(u'# HELP %s %s' % (name, description))
+        self.lines.append(u'# TYPE %s %s' % (name, metric_type))
+
+        for suffix, labels, value in samples:
+            self.lines.append(u'%s%s%s %r' % (name, suffix, format_labels(labels), float(value)))
+
+    def add_gauge(self, name, description, value, labels=()):
+        self.add(name, 'gauge', description, [('', labels, value)])
+
+    def render(self):
+        return (u'\n'.join(self.lines) + u'\n').encode('utf-8')
+
+
+def summary_samples(histogram, labels):
+    labels = list(labels)
+
+    samples = [('', labels + [('quantile', q)], histogram.percentile(q * 100)) for q in QUANTILES]
+    samples.append(('_sum', labels, histogram.total))
+    samples.append(('_count', labels, histogram.count))
+
+    return samples
+
+
+def threadpool_queue_size(threadpool):
+    queue = getattr(threadpool, 'q', None)
+    return queue.qsize() if queue is not None else 0
+
+
+@transact_ro
+def get_backlog(store):
+    return {
+        'mail_queue': store.find(models.Mail).count(),
+        'delivery_backlog': store.find(models.InternalFile, models.InternalFile.new == True).count()
+    }
+
+
+@inlineCallbacks
+def collect_metrics():
+    writer = MetricsWriter()
+
+    requests_samples = []
+    jobs_samples = []
+    for (route, method, status), histogram in sorted(timing_stats.histograms.iteritems()):
+        if method == 'JOB':
+            jobs_samples += summary_samples(histogram, [('job', route), ('status', status)])
+        else:
+            requests_samples += summary_samples(histogram, [('route', route), ('method', method), ('status', status)])
+
+    writer.add('globaleaks_http_request_duration_seconds', 'summary',
+               'Latency of the requests by route pattern, method and status', requests_samples)
+
+    writer.add('globaleaks_job_duration_seconds', 'summary',
+               'Duration of the runs of the scheduled jobs', jobs_samples)
+
+    writer.add('globaleaks_orm_queue_size', 'gauge',
+               'Transactions waiting in the queue of the ORM thread pools',
+               [('', [('pool', pool)], threadpool_queue_size(getattr(GLSettings, pool)))
+                for pool in ['orm_tp', 'orm_ro_tp']])
+
+    writer.add_gauge('globaleaks_kdf_queue_size', 'Password and receipt hashes waiting to be computed',
+                     threadpool_queue_size(GLSettings.kdf_tp))
+
+    writer.add_gauge('globaleaks_pgp_queue_size', 'Files waiting to be encrypted by the delivery',
+                     threadpool_queue_size(GLSettings.pgp_tp))
+
+    wait_samples = []
+    duration_samples = []
+    for pool, histograms in sorted(transaction_stats.histograms.items()):
+        wait_samples += summary_samples(histograms['wait'], [('pool', pool)])
+        duration_samples += summary_samples(histograms['duration'], [('pool', pool)])
+
+    writer.add('globaleaks_orm_wait_seconds', 'summary',
+               'Time waited by the transactions in the queue of the ORM thread pools', wait_samples)
+
+    writer.add('globaleaks_orm_transaction_duration_seconds', 'summary',
+               'Duration of the transactions', duration_samples)
+
+    admission_stats = sorted(admission_control.stats().iteritems())
+    writer.add('globaleaks_admission_active_requests', 'gauge',
+               'Requests being served by priority class',
+               [('', [('priority', p)], stats['active']) for p, stats in admission_stats])
+    writer.add('globaleaks_admission_queued_requests', 'gauge',
+               'Requests waiting to be admitted by priority class',
+               [('', [('priority', p)], stats['queued']) for p, stats in admission_stats])
+    writer.add('globaleaks_admission_rejected_requests_total', 'counter',
+               'Requests rejected by the admission control by priority class',
+               [('', [('priority', p)], stats['rejected']) for p, stats in admission_stats])
+
+    writer.add_gauge('globaleaks_sessions', 'Active sessions', len(GLSessions))
+    writer.add_gauge('globaleaks_tokens', 'Active submission tokens', len(TokenList))
+    writer.add_gauge('globaleaks_tracked_events', 'Events tracked for the anomaly detection', len(EventTrackQueue))
+
+    cache = GLApiCache.cache
+    writer.add('globaleaks_api_cache_requests_total', 'counter', 'Lookups of the API cache',
+               [('', [('result', 'hit')], cache.hits), ('', [('result', 'miss')], cache.misses)])
+    writer.add('globaleaks_api_cache_evictions_total', 'counter', 'Entries evicted from the API cache',
+               [('', [], cache.evictions)])
+    writer.add_gauge('globaleaks_api_cache_hit_ratio', 'Hit ratio of the API cache', cache.hit_rate())
+    writer.add_gauge('globaleaks_api_cache_entries', 'Entries of the API cache', len(cache))
+    writer.add_gauge('globaleaks_api_cache_bytes', 'Memory used by the API cache', cache.bytes)
+
+    backlog = yield get_backlog()
+    writer.add_gauge('globaleaks_mail_queue_length', 'Mails waiting to be sent', backlog['mail_queue'])
+    writer.add_gauge('globaleaks_delivery_backlog_files', 'Files waiting to be processed by the delivery',
+                     backlog['delivery_backlog'])
+
+    writer.add('globaleaks_alarm_stress_level', 'gauge', 'Stress levels of the anomaly detection (0 to 2)',
+               [('', [('type', 'disk_space')], Alarm.stress_levels['disk_space']),
+                ('', [('type', 'activity')], Alarm.stress_levels['activity'])])
+
+    returnValue(writer.render())
+
+
+class MetricsHandler(BaseHandler):
+    def initialize(self, localhost_listener=False):
+        self.localhost_listener = localhost_listener
+
+    def get(self):
+        if not GLSettings.metrics_enabled:
+            raise HTTPError(404)
+
+        if self.localhost_listener:
+            return self.write_metrics()
+
+        return self.get_authenticated()
+
+    @BaseHandler.transport_security_check('admin')
+    @BaseHandler.authenticated('admin')
+    def get_authenticated(self):
+        return self.write_metrics()
+
+    @inlineCallbacks
+    def write_metrics(self):
+        metrics = yield collect_metrics()
+
+        self.set_header('Content-Type', CONTENT_TYPE)
+        self.write(metrics)
@@ -5,6 +5,7 @@
 # Implementation of classes handling the HTTP request to /node, public
 # exposed API.
 
+from cyclone.util import ObjectDict
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks import models, LANGUAGES_SUPPORTED
@@ -13,7 +14,7 @@ from globaleaks.handlers.base import BaseHandler
 from globaleaks.models import l10n
 from globaleaks.models.config import NodeFactory
 from globaleaks.models.l10n import NodeL10NFactory
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transact_ro, db_prefetch, prefetched_values
 from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
 from globaleaks.utils.sets import disjoint_union
@@ -51,7 +52,49 @@ def serialize_node(store, language):
     return db_serialize_node(store, language)
 
 
-def serialize_context(store, context, language):
+def db_prefetch_questionnaires(store, questionnaire_ids=(), step_ids=(), field_ids=()):
+    """
+    Load with a number of queries that depends only on the depth of the
+    field trees, the steps, fields, field attributes and field options
+    accessed while serializing the given questionnaires, steps and fields.
+
+    The returned graph maps the ids of the parent objects to the lists of
+    the related objects and keeps them alive in the store cache.
+    """
+    graph = ObjectDict()
+
+    graph.steps = db_prefetch(store, models.Step, models.Step.questionnaire_id, set(questionnaire_ids))
+    step_ids = set(step_ids).union(step.id for step in prefetched_values(graph.steps))
+
+    graph.step_children = db_prefetch(store, models.Field, models.Field.step_id, step_ids)
+
+    graph.fields = {}
+    graph.field_children = {}
+
+    # the field trees are loaded level by level together with the templates they refer to
+    fields = prefetched_values(graph.step_children)
+    missing_ids = set(field_ids)
+    while fields or missing_ids:
+        fields += prefetched_values(db_prefetch(store, models.Field, models.Field.id, missing_ids))
+        graph.fields.update((field.id, field) for field in fields)
+
+        children = db_prefetch(store, models.Field, models.Field.fieldgroup_id, [field.id for field in fields])
+        graph.field_children.update(children)
+
+        missing_ids = set(field.template_id for field in fields if field.template_id is not None)
+        fields = [field for field in prefetched_values(children) if field.id not in graph.fields]
+        missing_ids.difference_update(graph.fields, [field.id for field in fields])
+
+    field_ids = graph.fields.keys()
+    graph.attrs = db_prefetch(store, models.FieldAttr, models.FieldAttr.field_id, field_ids)
+    graph.options = db_prefetch(store, models.FieldOption, models.FieldOption.field_id, field_ids)
+    graph.field_triggers = db_prefetch(store, models.FieldOption, models.FieldOption.trigger_field, field_ids)
+    graph.step_triggers = db_prefetch(store, models.FieldOption, models.FieldOption.trigger_step, step_ids)
+
+    return graph
+
+
+def serialize_context(store, context, language, graph=None):
     """
     Serialize context description
 
@@ -75,7 +118,7 @@ def serialize_context(store, context, language):
         'enable_two_way_messages': context.enable_two_way_messages,
         'enable_attachments': context.enable_attachments,
         'show_receivers_in_alphabetical_order': context.show_receivers_in_alphabetical_order,
-        'questionnaire': serialize_questionnaire(store, context.questionnaire, language), 
+        'questionnaire': serialize_questionnaire(store, context.questionnaire, language, graph),
         'receivers': [r.id for r in context.receivers],
         'picture': context.picture.data if context.picture is not None else ''
     }
@@ -83,14 +126,18 @@ def serialize_context(store, context, language):
     return get_localized_values(ret_dict, context, context.localized_keys, language)
 
 
-def serialize_questionnaire(store, questionnaire, language):
+def serialize_questionnaire(store, questionnaire, language, graph=None):
     """
     Serialize the specified questionnaire
 
     :param store: the store on which perform queries.
     :param language: the language in which to localize data.
+    :param graph: the objects loaded by db_prefetch_questionnaires; loaded if not provided.
     :return: a dictionary representing the serialization of the questionnaire.
     """
+    if graph is None:
+        graph = db_prefetch_questionnaires(store, questionnaire_ids=[questionnaire.id])
+
     ret_dict = {
         'id': questionnaire.id,
         'key': questionnaire.key,
@@ -98,7 +145,7 @@ def serialize_questionnaire(store, questionnaire, language):
         'name': questionnaire.name,
         'show_steps_navigation_bar': questionnaire.show_steps_navigation_bar,
         'steps_navigation_requires_completion': questionnaire.steps_navigation_requires_completion,
-        'steps': [serialize_step(store, s, language) for s in questionnaire.steps]
+        'steps': [serialize_step(store, s, language, graph) for s in graph.steps.get(questionnaire.id, [])]
     }
 
     return get_localized_values(ret_dict, questionnaire, questionnaire.localized_keys, language)
@@ -146,31 +193,35 @@ def serialize_field_attr(attr, language):
     return ret_dict
 
 
-def serialize_field(store, field, language):
+def serialize_field(store, field, language, graph=None):
     """
     Serialize a field, localizing its content depending on the language.
 
     :param field: the field object to be serialized
     :param language: the language in which to localize data
+    :param graph: the objects loaded by db_prefetch_questionnaires; loaded if not provided.
     :return: a serialization of the object
     """
+    if graph is None:
+        graph = db_prefetch_questionnaires(store, field_ids=[field.id])
+
     # naif likes if we add reference links
     # this code is inspired by:
     #  - https://www.youtube.com/watch?v=KtNsUgKgj9g
 
-    if field.template:
-        f_to_serialize = field.template
+    if field.template_id is not None:
+        f_to_serialize = graph.fields[field.template_id]
     else:
         f_to_serialize = field
 
     attrs = {}
-    for attr in store.find(models.FieldAttr, models.FieldAttr.field_id == f_to_serialize.id):
+    for attr in graph.attrs.get(f_to_serialize.id, []):
         attrs[attr.name] = serialize_field_attr(attr, language)
 
     triggered_by_options = [{
         'field': trigger.field_id,
         'option': trigger.id
-    } for trigger in field.triggered_by_options]
+    } for trigger in graph.field_triggers.get(field.id, [])]
 
     ret_dict = {
         'id': field.id,
@@ -191,25 +242,29 @@ def serialize_field(store, field, language):
         'width': field.width,
         'triggered_by_score': field.triggered_by_score,
         'triggered_by_options': triggered_by_options,
-        'options': [serialize_field_option(o, language) for o in f_to_serialize.options],
-        'children': [serialize_field(store, f, language) for f in f_to_serialize.children]
+        'options': [serialize_field_option(o, language) for o in graph.options.get(f_to_serialize.id, [])],
+        'children': [serialize_field(store, f, language, graph) for f in graph.field_children.get(f_to_serialize.id, [])]
     }
 
     return get_localized_values(ret_dict, f_to_serialize, field.localized_keys, language)
 
 
-def serialize_step(store, step, language):
+def serialize_step(store, step, language, graph=None):
     """
     Serialize a step, localizing its content depending on the language.
 
     :param step: the step to be serialized.
     :param language: the language in which to localize data
+    :param graph: the objects loaded by db_prefetch_questionnaires; loaded if not provided.
     :return: a serialization of the object
     """
+    if graph is None:
+        graph = db_prefetch_questionnaires(store, step_ids=[step.id])
+
     triggered_by_options = [{
         'field': trigger.field_id,
         'option': trigger.id
-    } for trigger in step.triggered_by_options]
+    } for trigger in graph.step_triggers.get(step.id, [])]
 
     ret_dict = {
         'id': step.id,
@@ -217,7 +272,7 @@ def serialize_step(store, step, language):
         'presentation_order': step.presentation_order,
         'triggered_by_score': step.triggered_by_score,
         'triggered_by_options': triggered_by_options,
-        'children': [serialize_field(store, f, language) for f in step.children]
+        'children': [serialize_field(store, f, language, graph) for f in graph.step_children.get(step.id, [])]
     }
 
     return get_localized_values(ret_dict, step, step.localized_keys, language)
@@ -251,9 +306,12 @@ def serialize_receiver(receiver, language):
 def db_get_public_context_list(store, language):
     context_list = []
 
-    for context in store.find(models.Context):
-        if context.receivers.count():
-            context_list.append(serialize_context(store, context, language))
+    contexts = [context for context in store.find(models.Context) if context.receivers.count()]
+
+    graph = db_prefetch_questionnaires(store, questionnaire_ids=set(c.questionnaire_id for c in contexts))
+
+    for context in contexts:
+        context_list.append(serialize_context(store, context, language, graph))
 
     return context_list
 
@@ -269,7 +327,7 @@ def db_get_public_receiver_list(store, language):
     return receiver_list
 
 
-@transact
+@transact_ro
 def get_public_resources(store, language):
     return {
         'node': db_serialize_node(store, language),
@@ -278,6 +336,10 @@ def get_public_resources(store, language):
     }
 
 
+GLApiCache.register('public', ['node', 'context', 'questionnaire', 'step', 'field', 'receiver', 'user', 'file'],
+                    get_public_resources)
+
+
 class PublicResource(BaseHandler):
     @BaseHandler.transport_security_check("unauth")
     @BaseHandler.unauthenticated
@@ -286,6 +348,6 @@ class PublicResource(BaseHandler):
         """
         Get all the public resources.
         """
-        ret = yield GLApiCache.get('public', self.request.language,
-                                   get_public_resources, self.request.language)
-        self.write(ret)
+        ret = yield GLApiCache.get_response('public', self.request.language,
+                                            get_public_resources, self.request.language)
+        self.write_cached_response(ret)
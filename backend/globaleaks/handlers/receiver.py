@@ -6,18 +6,21 @@
 # Used by receivers to update personal preferences and access to personal data
 
 from twisted.internet.defer import inlineCallbacks
-from storm.expr import And, In
+from storm.expr import And, Or, In, Alias, Select, Count, Coalesce, Column, \
+    Join, LeftJoin, Asc, Desc
 
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transact_ro
 from globaleaks.handlers.user import db_user_update_user
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.handlers.rtip import db_postpone_expiration_date, db_delete_rtip
 from globaleaks.handlers.submission import db_get_archived_preview_schema
 from globaleaks.handlers.user import user_serialize_user
-from globaleaks.models import Receiver, ReceiverTip
+from globaleaks.models import Receiver, ReceiverTip, InternalTip, InternalFile, \
+    Comment, Message, Context
 from globaleaks.rest import requests, errors
 from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
+from globaleaks.utils import admission
 from globaleaks.utils.structures import Rosetta, get_localized_values
 from globaleaks.utils.utility import log, datetime_to_ISO8601
 
@@ -61,39 +64,130 @@ def update_receiver_settings(store, receiver_id, request, language):
     return receiver_serialize_receiver(receiver, language)
 
 
-@transact
-def get_receivertip_list(store, receiver_id, language):
+TIP_LIST_SORT_KEYS = {
+    'creation_date': InternalTip.creation_date,
+    'update_date': InternalTip.update_date,
+    'expiration_date': InternalTip.expiration_date,
+    'last_access': ReceiverTip.last_access,
+    'progressive': InternalTip.progressive,
+    'total_score': InternalTip.total_score,
+    'label': ReceiverTip.label
+}
+
+
+def db_count_by(column, where, name):
+    """
+    Return a subselect counting the rows grouped by column that can be
+    joined (as name) with the list of tips; the counter is available as
+    Column('counter', subselect)
+    """
+    return Alias(Select((column, Alias(Count(), 'counter')), where, group_by=column), name)
+
+
+def db_get_receivertip_list(store, receiver_id, language, sort=u'creation_date', order=u'asc', limit=None, cursor=None):
+    """
+    Load the summary of the tips of a receiver with a single query
+    joining the tips with the counters of their files, comments and messages.
+
+    :param sort: one of the keys of TIP_LIST_SORT_KEYS
+    :param order: 'asc' or 'desc'
+    :param limit: the maximum number of tips to be returned
+    :param cursor: the id of the last tip of the previous page
+    """
+    if sort not in TIP_LIST_SORT_KEYS:
+        raise errors.InvalidInputFormat("invalid sort key")
+
+    if order not in [u'asc', u'desc']:
+        raise errors.InvalidInputFormat("invalid sort order")
+
+    sort_column = TIP_LIST_SORT_KEYS[sort]
+    direction = Asc if order == u'asc' else Desc
+
+    receiver_itips = Select(ReceiverTip.internaltip_id, ReceiverTip.receiver_id == receiver_id)
+
+    files = db_count_by(InternalFile.internaltip_id, In(InternalFile.internaltip_id, receiver_itips), 'files')
+    comments = db_count_by(Comment.internaltip_id, In(Comment.internaltip_id, receiver_itips), 'comments')
+    messages = db_count_by(Message.receivertip_id,
+                           In(Message.receivertip_id,
+                              Select(ReceiverTip.id, ReceiverTip.receiver_id == receiver_id)),
+                           'messages')
+
+    tables = [
+        ReceiverTip,
+        Join(InternalTip, InternalTip.id == ReceiverTip.internaltip_id),
+        Join(Context, Context.id == InternalTip.context_id),
+        LeftJoin(files, Column('internaltip_id', files) == InternalTip.id),
+        LeftJoin(comments, Column('internaltip_id', comments) == InternalTip.id),
+        LeftJoin(messages, Column('receivertip_id', messages) == ReceiverTip.id)
+    ]
+
+    where = [ReceiverTip.receiver_id == receiver_id]
+
+    if cursor is not None:
+        cursor_value = store.using(*tables[:2]).find(sort_column,
+                                                     ReceiverTip.id == cursor,
+                                                     ReceiverTip.receiver_id == receiver_id).one()
+        if cursor_value is None:
+            raise errors.InvalidInputFormat("invalid cursor")
+
+        if order == u'asc':
+            where.append(Or(sort_column > cursor_value, And(sort_column == cursor_value, ReceiverTip.id > cursor)))
+        else:
+            where.append(Or(sort_column < cursor_value, And(sort_column == cursor_value, ReceiverTip.id < cursor)))
+
+    result = store.using(*tables).find((ReceiverTip, InternalTip, Context,
+                                        Coalesce(Column('counter', files), 0),
+                                        Coalesce(Column('counter', comments), 0),
+                                        Coalesce(Column('counter', messages), 0)),
+                                       And(*where))
+
+    result = result.order_by(direction(sort_column), direction(ReceiverTip.id))
+    if limit is not None:
+        result.config(limit=limit)
+
+    context_names = {}
+    preview_schemas = {}
     rtip_summary_list = []
 
-    for rtip in store.find(ReceiverTip, ReceiverTip.receiver_id == receiver_id):
-        mo = Rosetta(rtip.internaltip.context.localized_keys)
-        mo.acquire_storm_object(rtip.internaltip.context)
+    for rtip, itip, context, file_counter, comment_counter, message_counter in result:
+        if context.id not in context_names:
+            mo = Rosetta(context.localized_keys)
+            mo.acquire_storm_object(context)
+            context_names[context.id] = mo.dump_localized_key('name', language)
+
+        if itip.questionnaire_hash not in preview_schemas:
+            preview_schemas[itip.questionnaire_hash] = db_get_archived_preview_schema(store, itip.questionnaire_hash, language)
 
         rtip_summary_list.append({
             'id': rtip.id,
-            'creation_date': datetime_to_ISO8601(rtip.internaltip.creation_date),
+            'creation_date': datetime_to_ISO8601(itip.creation_date),
             'last_access': datetime_to_ISO8601(rtip.last_access),
-            'update_date': datetime_to_ISO8601(rtip.internaltip.update_date),
-            'expiration_date': datetime_to_ISO8601(rtip.internaltip.expiration_date),
-            'timetolive': rtip.internaltip.context.tip_timetolive,
-            'progressive': rtip.internaltip.progressive,
-            'new': rtip.access_counter == 0 or rtip.last_access < rtip.internaltip.update_date,
-            'context_name': mo.dump_localized_key('name', language),
+            'update_date': datetime_to_ISO8601(itip.update_date),
+            'expiration_date': datetime_to_ISO8601(itip.expiration_date),
+            'timetolive': context.tip_timetolive,
+            'progressive': itip.progressive,
+            'new': rtip.access_counter == 0 or rtip.last_access < itip.update_date,
+            'context_name': context_names[context.id],
             'access_counter': rtip.access_counter,
-            'file_counter': rtip.internaltip.internalfiles.count(),
-            'comment_counter': rtip.internaltip.comments.count(),
-            'message_counter': rtip.messages.count(),
-            'tor2web': rtip.internaltip.tor2web,
-            'questionnaire_hash': rtip.internaltip.questionnaire_hash,
-            'preview_schema': db_get_archived_preview_schema(store, rtip.internaltip.questionnaire_hash, language),
-            'preview': rtip.internaltip.preview,
-            'total_score': rtip.internaltip.total_score,
+            'file_counter': file_counter,
+            'comment_counter': comment_counter,
+            'message_counter': message_counter,
+            'tor2web': itip.tor2web,
+            'questionnaire_hash': itip.questionnaire_hash,
+            'preview_schema': preview_schemas[itip.questionnaire_hash],
+            'preview': itip.preview,
+            'total_score': itip.total_score,
             'label': rtip.label
         })
 
     return rtip_summary_list
 
 
+@transact_ro
+def get_receivertip_list(store, receiver_id, language, sort=u'creation_date', order=u'asc', limit=None, cursor=None):
+    return db_get_receivertip_list(store, receiver_id, language, sort, order, limit, cursor)
+
+
 @transact
 def perform_tips_operation(store, receiver_id, operation, rtips_ids):
     receiver = store.find(Receiver, Receiver.id == receiver_id).one()
@@ -160,7 +254,7 @@ class ReceiverInstance(BaseHandler):
                                                          request,
                                                          self.request.language)
 
-        GLApiCache.invalidate()
+        GLApiCache.invalidate_dependencies(['receiver', 'user'])
 
         self.write(receiver_status)
 
@@ -169,17 +263,49 @@ class TipsCollection(BaseHandler):
     """
     This interface return the summary list of the Tips available for the authenticated Receiver
     GET /tips
+
+    The list can be paginated with the optional query arguments:
+        - sort: the key used to sort the list (default: creation_date)
+        - order: asc or desc (default: asc, the order of creation of the tips)
+        - limit: the size of the page
+        - cursor: the id of the last tip of the previous page
+    When further tips are available the id to be used as cursor for
+    the following page is returned in the X-Next-Cursor header.
     """
+    admission_priority = admission.LOW
+
     @BaseHandler.transport_security_check('receiver')
     @BaseHandler.authenticated('receiver')
     @inlineCallbacks
     def get(self):
         """
         Response: receiverTipList
-        Errors: InvalidAuthentication
+        Errors: InvalidAuthentication, InvalidInputFormat
         """
+        sort = self.get_argument('sort', u'creation_date')
+        order = self.get_argument('order', u'asc')
+        cursor = self.get_argument('cursor', None)
+
+        limit = self.get_argument('limit', None)
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+
+            if limit <= 0:
+                raise errors.InvalidInputFormat("invalid limit")
+
+        # one more tip is requested in order to know if a next page exists
         answer = yield get_receivertip_list(self.current_user.user_id,
-                                            self.request.language)
+                                            self.request.language,
+                                            sort, order,
+                                            limit + 1 if limit is not None else None,
+                                            cursor)
+
+        if limit is not None and len(answer) > limit:
+            answer = answer[:limit]
+            self.set_header('X-Next-Cursor', answer[-1]['id'])
 
         self.write(answer)
 
@@ -13,12 +13,14 @@ from twisted.internet.defer import inlineCallbacks
 from globaleaks.orm import transact
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.handlers.custodian import serialize_identityaccessrequest
-from globaleaks.handlers.submission import serialize_usertip
+from globaleaks.handlers.submission import serialize_usertip, db_prefetch_tips, \
+    invalidate_archived_schema_cache
 from globaleaks.models import Comment, Message, \
     ReceiverFile, ReceiverTip, InternalTip, ArchivedSchema, \
     SecureFileDelete, IdentityAccessRequest
 from globaleaks.rest import errors, requests
 from globaleaks.settings import GLSettings
+from globaleaks.utils.signals import job_signals, NOTIFICATION
 from globaleaks.utils.utility import log, utc_future_date, datetime_now, \
     datetime_to_ISO8601, datetime_to_pretty_str
 
@@ -86,18 +88,25 @@ def serialize_message(msg):
     }
 
 
-def serialize_rtip(store, rtip, language):
+def serialize_rtip(store, rtip, language, graph=None):
+    """
+    Serialize a ReceiverTip; callers serializing many tips can pass the
+    graph returned by db_prefetch_tips for all of them.
+    """
     user_id = rtip.receiver.id
 
-    ret = serialize_usertip(store, rtip, language)
+    if graph is None:
+        graph = db_prefetch_tips(store, [rtip.internaltip_id])
+
+    ret = serialize_usertip(store, rtip, language, graph)
 
     ret['id'] = rtip.id
     ret['receiver_id'] = user_id
     ret['label'] = rtip.label
-    ret['comments'] = db_get_itip_comment_list(store, rtip.internaltip)
-    ret['messages'] = db_get_itip_message_list(rtip)
-    ret['files'] = db_get_files_receiver(store, user_id, rtip.id)
-    ret['iars'] = db_get_identityaccessrequest_list(store, rtip.id, language)
+    ret['comments'] = db_get_itip_comment_list(store, rtip.internaltip, graph)
+    ret['messages'] = db_get_itip_message_list(rtip, graph)
+    ret['files'] = db_get_files_receiver(store, user_id, rtip.id, graph)
+    ret['iars'] = db_get_identityaccessrequest_list(store, rtip.id, language, graph)
     ret['enable_notifications'] = bool(rtip.enable_notifications)
 
     return ret
@@ -113,11 +122,14 @@ def db_access_rtip(store, user_id, rtip_id):
     return rtip
 
 
-def db_get_files_receiver(store, user_id, rtip_id):
-    receiver_files = store.find(ReceiverFile,
-                                (ReceiverFile.receivertip_id == ReceiverTip.id,
-                                 ReceiverTip.id == rtip_id,
-                                 ReceiverTip.receiver_id == user_id))
+def db_get_files_receiver(store, user_id, rtip_id, graph=None):
+    if graph is not None:
+        receiver_files = graph.receiverfiles.get(rtip_id, [])
+    else:
+        receiver_files = store.find(ReceiverFile,
+                                    (ReceiverFile.receivertip_id == ReceiverTip.id,
+                                     ReceiverTip.id == rtip_id,
+                                     ReceiverTip.receiver_id == user_id))
 
     return [receiver_serialize_file(receiverfile.internalfile, receiverfile, rtip_id)
             for receiverfile in receiver_files]
@@ -174,6 +186,7 @@ def db_delete_itip(store, itip):
 
     if store.find(InternalTip, InternalTip.questionnaire_hash == itip.questionnaire_hash).count() == 0:
         store.find(ArchivedSchema, ArchivedSchema.hash == itip.questionnaire_hash).remove()
+        invalidate_archived_schema_cache(itip.questionnaire_hash)
 
 
 def db_delete_itips(store, itips):
@@ -252,8 +265,10 @@ def get_rtip(store, user_id, rtip_id, language):
     return db_get_rtip(store, user_id, rtip_id, language)
 
 
-def db_get_itip_comment_list(store, internaltip):
-    return [serialize_comment(comment) for comment in internaltip.comments]
+def db_get_itip_comment_list(store, internaltip, graph=None):
+    comments = graph.comments.get(internaltip.id, []) if graph is not None else internaltip.comments
+
+    return [serialize_comment(comment) for comment in comments]
 
 
 @transact
@@ -284,8 +299,10 @@ def create_comment(store, user_id, rtip_id, request):
     return serialize_comment(comment)
 
 
-def db_get_itip_message_list(rtip):
-    return [serialize_message(message) for message in rtip.messages]
+def db_get_itip_message_list(rtip, graph=None):
+    messages = graph.messages.get(rtip.id, []) if graph is not None else rtip.messages
+
+    return [serialize_message(message) for message in messages]
 
 
 @transact
@@ -303,8 +320,11 @@ def create_message(store, user_id, rtip_id, request):
     return serialize_message(msg)
 
 
-def db_get_identityaccessrequest_list(store, rtip_id, language):
-    iars = store.find(IdentityAccessRequest, IdentityAccessRequest.receivertip_id == rtip_id)
+def db_get_identityaccessrequest_list(store, rtip_id, language, graph=None):
+    if graph is not None:
+        iars = graph.iars.get(rtip_id, [])
+    else:
+        iars = store.find(IdentityAccessRequest, IdentityAccessRequest.receivertip_id == rtip_id)
 
     return [serialize_identityaccessrequest(iar, language) for iar in iars]
 
@@ -391,6 +411,8 @@ class RTipCommentCollection(BaseHandler):
 
         answer = yield create_comment(self.current_user.user_id, tip_id, request)
 
+        job_signals.emit(NOTIFICATION)
+
         self.set_status(201)  # Created
         self.write(answer)
 
@@ -412,6 +434,8 @@ class ReceiverMsgCollection(BaseHandler):
 
         message = yield create_message(self.current_user.user_id, tip_id, request)
 
+        job_signals.emit(NOTIFICATION)
+
         self.set_status(201)  # Created
         self.write(message)
 
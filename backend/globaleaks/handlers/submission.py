@@ -8,22 +8,32 @@
 
 import copy
 import json
+from cyclone.util import ObjectDict
 from storm.expr import And, In
 from twisted.internet import defer
 
 from globaleaks import models
 from globaleaks.handlers.admin.context import db_get_context_steps
 from globaleaks.handlers.base import BaseHandler
-from globaleaks.orm import transact
+from globaleaks.orm import transact, db_prefetch, prefetched_values
 from globaleaks.rest import errors, requests
-from globaleaks.security import hash_password, sha256, generateRandomReceipt
+from globaleaks.security import deferred_hash_password, sha256, generateRandomReceipt
 from globaleaks.settings import GLSettings
+from globaleaks.utils import admission
 from globaleaks.utils.structures import Rosetta, get_localized_values
+from globaleaks.utils.lrucache import LRUCache
+from globaleaks.utils.signals import job_signals, DELIVERY, NOTIFICATION
 from globaleaks.utils.token import TokenList
 from globaleaks.utils.utility import log, utc_future_date, \
     datetime_now, datetime_never, datetime_to_ISO8601
 
 
+# Archived schemas are identified by the hash of their content and never
+# change; their localized versions are shared by all the callers that
+# must then never modify them.
+archived_schema_cache = LRUCache(GLSettings.archived_schema_cache_size)
+
+
 def get_submission_sequence_number(itip):
     return "%s-%d" % (itip.creation_date.strftime("%Y%m%d"), itip.progressive)
 
@@ -69,15 +79,21 @@ def _db_get_archived_field_recursively(field, language):
 
 
 def _db_get_archived_questionnaire_schema(store, hash, type, language):
+    cache_key = (hash, type, language)
+
+    questionnaire = archived_schema_cache.get(cache_key)
+    if questionnaire is not None:
+        return questionnaire
+
     aqs = store.find(models.ArchivedSchema,
                      models.ArchivedSchema.hash == hash,
                      models.ArchivedSchema.type == type).one()
 
     if not aqs:
         log.err("Unable to find questionnaire schema with hash %s" % hash)
-        questionnaire = []
-    else:
-        questionnaire = copy.deepcopy(aqs.schema)
+        return []
+
+    questionnaire = copy.deepcopy(aqs.schema)
 
     if type == 'questionnaire':
         for step in questionnaire:
@@ -90,6 +106,8 @@ def _db_get_archived_questionnaire_schema(store, hash, type, language):
         for field in questionnaire:
             _db_get_archived_field_recursively(field, language)
 
+    archived_schema_cache.set(cache_key, questionnaire)
+
     return questionnaire
 
 
@@ -101,19 +119,77 @@ def db_get_archived_preview_schema(store, hash, language):
     return _db_get_archived_questionnaire_schema(store, hash, u'preview', language)
 
 
-def db_serialize_questionnaire_answers_recursively(answers):
+def invalidate_archived_schema_cache(hash):
+    archived_schema_cache.delete_if(lambda key: key[0] == hash)
+
+
+def db_prefetch_tips(store, internaltip_ids):
+    """
+    Load with a fixed number of queries, regardless of the number of
+    receivers, comments, messages and files, the graph of objects accessed
+    while serializing the given internaltips.
+
+    The returned graph maps the ids of the parent objects to the lists of
+    the related objects and keeps them alive in the store cache.
+    """
+    graph = ObjectDict()
+
+    graph.internaltips = db_prefetch(store, models.InternalTip, models.InternalTip.id, set(internaltip_ids))
+    itip_ids = graph.internaltips.keys()
+
+    graph.contexts = db_prefetch(store, models.Context, models.Context.id,
+                                 set(itip.context_id for itip in prefetched_values(graph.internaltips)))
+
+    graph.whistleblowertips = db_prefetch(store, models.WhistleblowerTip,
+                                          models.WhistleblowerTip.internaltip_id, itip_ids)
+
+    graph.receivertips = db_prefetch(store, models.ReceiverTip, models.ReceiverTip.internaltip_id, itip_ids)
+    rtips = prefetched_values(graph.receivertips)
+    rtip_ids = [rtip.id for rtip in rtips]
+
+    graph.receivers = db_prefetch(store, models.Receiver, models.Receiver.id,
+                                  set(rtip.receiver_id for rtip in rtips))
+
+    graph.comments = db_prefetch(store, models.Comment, models.Comment.internaltip_id, itip_ids)
+    graph.messages = db_prefetch(store, models.Message, models.Message.receivertip_id, rtip_ids)
+    graph.internalfiles = db_prefetch(store, models.InternalFile, models.InternalFile.internaltip_id, itip_ids)
+    graph.receiverfiles = db_prefetch(store, models.ReceiverFile, models.ReceiverFile.receivertip_id, rtip_ids)
+    graph.iars = db_prefetch(store, models.IdentityAccessRequest,
+                             models.IdentityAccessRequest.receivertip_id, rtip_ids)
+
+    user_ids = set(graph.receivers.keys())
+    user_ids.update(comment.author_id for comment in prefetched_values(graph.comments))
+    user_ids.update(iar.reply_user_id for iar in prefetched_values(graph.iars))
+    graph.users = db_prefetch(store, models.User, models.User.id, user_ids)
+
+    graph.fieldanswers = db_prefetch(store, models.FieldAnswer, models.FieldAnswer.internaltip_id, itip_ids)
+    fieldanswers = prefetched_values(graph.fieldanswers)
+
+    graph.fieldanswergroups = db_prefetch(store, models.FieldAnswerGroup, models.FieldAnswerGroup.fieldanswer_id,
+                                          [answer.id for answer in fieldanswers if not answer.is_leaf])
+
+    graph.groupfieldanswers = {}
+    for answer in fieldanswers:
+        if answer.fieldanswergroup_id is not None:
+            graph.groupfieldanswers.setdefault(answer.fieldanswergroup_id, []).append(answer)
+
+    return graph
+
+
+def db_serialize_questionnaire_answers_recursively(answers, graph):
     ret = {}
 
     for answer in answers:
         if answer.is_leaf:
             ret[answer.key] = answer.value
         else:
-            ret[answer.key] = [db_serialize_questionnaire_answers_recursively(group.fieldanswers)
-                               for group in answer.groups.order_by(models.FieldAnswerGroup.number)]
+            groups = sorted(graph.fieldanswergroups.get(answer.id, []), key=lambda group: group.number)
+            ret[answer.key] = [db_serialize_questionnaire_answers_recursively(graph.groupfieldanswers.get(group.id, []), graph)
+                               for group in groups]
     return ret
 
 
-def db_serialize_questionnaire_answers(store, usertip):
+def db_serialize_questionnaire_answers(store, usertip, graph):
     internaltip = usertip.internaltip
 
     questionnaire = db_get_archived_questionnaire_schema(store, internaltip.questionnaire_hash, GLSettings.memory_copy.default_language)
@@ -132,10 +208,10 @@ def db_serialize_questionnaire_answers(store, usertip):
             else:
                 answers_ids.append(f['id'])
 
-    answers = store.find(models.FieldAnswer, And(models.FieldAnswer.internaltip_id == internaltip.id,
-                                                 In(models.FieldAnswer.key, answers_ids)))
+    answers = [answer for answer in graph.fieldanswers.get(internaltip.id, [])
+               if answer.key in answers_ids]
 
-    return db_serialize_questionnaire_answers_recursively(answers)
+    return db_serialize_questionnaire_answers_recursively(answers, graph)
 
 
 def db_save_questionnaire_answers(store, internaltip_id, entries):
@@ -195,17 +271,17 @@ def db_archive_questionnaire_schema(store, questionnaire, questionnaire_hash):
         store.add(aqsp)
 
 
-def db_get_itip_receiver_list(store, itip, language):
+def db_get_itip_receiver_list(store, itip, language, graph):
     return [{
         "id": rtip.receiver.id,
         "name": rtip.receiver.user.name,
         "pgp_key_public": rtip.receiver.user.pgp_key_public,
         "last_access": datetime_to_ISO8601(rtip.last_access),
         "access_counter": rtip.access_counter,
-    } for rtip in itip.receivertips]
+    } for rtip in graph.receivertips.get(itip.id, [])]
 
 
-def serialize_itip(store, internaltip, language):
+def serialize_itip(store, internaltip, language, graph):
     context = internaltip.context
     mo = Rosetta(context.localized_keys)
     mo.acquire_storm_object(context)
@@ -220,7 +296,7 @@ def serialize_itip(store, internaltip, language):
         'context_id': internaltip.context_id,
         'context_name': mo.dump_localized_key('name', language),
         'questionnaire': db_get_archived_questionnaire_schema(store, internaltip.questionnaire_hash, language),
-        'receivers': db_get_itip_receiver_list(store, internaltip, language),
+        'receivers': db_get_itip_receiver_list(store, internaltip, language, graph),
         'tor2web': internaltip.tor2web,
         'timetolive': context.tip_timetolive,
         'enable_comments': context.enable_comments,
@@ -234,7 +310,7 @@ def serialize_itip(store, internaltip, language):
         'show_recipients_details': context.show_recipients_details,
         'status_page_message': mo.dump_localized_key('status_page_message', language),
         'wb_last_access': datetime_to_ISO8601(internaltip.wb_last_access),
-        'wb_access_revoked': internaltip.is_wb_access_revoked()
+        'wb_access_revoked': len(graph.whistleblowertips.get(internaltip.id, [])) == 0
     }
 
 def serialize_internalfile(ifile):
@@ -268,12 +344,15 @@ def serialize_receiverfile(rfile):
     return rfile_dict
 
 
-def serialize_usertip(store, usertip, language):
+def serialize_usertip(store, usertip, language, graph=None):
     internaltip = usertip.internaltip
 
-    ret = serialize_itip(store, internaltip, language)
+    if graph is None:
+        graph = db_prefetch_tips(store, [internaltip.id])
+
+    ret = serialize_itip(store, internaltip, language, graph)
     ret['id'] = usertip.id
-    ret['answers'] = db_serialize_questionnaire_answers(store, usertip)
+    ret['answers'] = db_serialize_questionnaire_answers(store, usertip, graph)
     ret['access_counter'] = usertip.access_counter
     ret['total_score'] = usertip.internaltip.total_score
 
@@ -294,16 +373,14 @@ def db_create_receivertip(store, receiver, internaltip):
 
     return receivertip.id
 
-def db_create_whistleblowertip(store, internaltip):
+def db_create_whistleblowertip(store, internaltip, receipt, receipt_hash):
     """
     The plaintext receipt is returned only now, and then is
     stored hashed in the WBtip table
     """
     wbtip = models.WhistleblowerTip()
 
-    receipt = unicode(generateRandomReceipt())
-
-    wbtip.receipt_hash = hash_password(receipt, GLSettings.memory_copy.private.receipt_salt)
+    wbtip.receipt_hash = receipt_hash
     wbtip.internaltip_id = internaltip.id
 
     store.add(wbtip)
@@ -316,7 +393,7 @@ def create_whistleblowertip(*args):
     return db_create_whistleblowertip(*args)[0] # here is exported only the receipt
 
 
-def db_create_submission(store, request, uploaded_files, t2w, language):
+def db_create_submission(store, request, uploaded_files, t2w, language, receipt, receipt_hash):
     answers = request['answers']
 
     context = store.find(models.Context, models.Context.id == request['context_id']).one()
@@ -386,7 +463,7 @@ def db_create_submission(store, request, uploaded_files, t2w, language):
         log.err("Submission create: unable to create db entry for files: %s" % excep)
         raise excep
 
-    receipt, wbtip = db_create_whistleblowertip(store, submission)
+    receipt, wbtip = db_create_whistleblowertip(store, submission, receipt, receipt_hash)
 
     if submission.context.maximum_selectable_receivers and \
                     len(receiver_id_list) > submission.context.maximum_selectable_receivers:
@@ -415,14 +492,33 @@ def db_create_submission(store, request, uploaded_files, t2w, language):
 
 
 @transact
-def create_submission(store, request, uploaded_files, t2w, language):
-    return db_create_submission(store, request, uploaded_files, t2w, language)
+def store_submission(store, request, uploaded_files, t2w, language, receipt, receipt_hash):
+    return db_create_submission(store, request, uploaded_files, t2w, language, receipt, receipt_hash)
+
+
+@defer.inlineCallbacks
+def create_submission(request, uploaded_files, t2w, language):
+    """
+    The receipt is hashed outside of the transaction (see security.deferred_hash_password)
+    """
+    receipt = unicode(generateRandomReceipt())
+    receipt_hash = yield deferred_hash_password(receipt, GLSettings.memory_copy.private.receipt_salt)
+
+    submission = yield store_submission(request, uploaded_files, t2w, language, receipt, receipt_hash)
+
+    # the files and the receiver tips of the submission are ready to be processed
+    job_signals.emit(DELIVERY)
+    job_signals.emit(NOTIFICATION)
+
+    defer.returnValue(submission)
 
 
 class SubmissionInstance(BaseHandler):
     """
     This is the interface for create, populate and complete a submission.
     """
+    admission_priority = admission.HIGH
+
     @BaseHandler.transport_security_check('whistleblower')
     @BaseHandler.unauthenticated
     @defer.inlineCallbacks
@@ -10,7 +10,7 @@ from globaleaks import models
 from globaleaks.orm import transact
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.rest import requests, errors
-from globaleaks.security import change_password, parse_pgp_key
+from globaleaks.security import change_password, parse_pgp_key, GLPGPKeyring
 from globaleaks.settings import GLSettings
 from globaleaks.utils.structures import get_localized_values
 from globaleaks.utils.utility import log, datetime_to_ISO8601, datetime_now, datetime_null
@@ -31,6 +31,9 @@ def parse_pgp_options(user, request):
     if not remove_key and pgp_key_public != '':
         k = parse_pgp_key(pgp_key_public)
 
+    if k is None or k['fingerprint'] != user.pgp_key_fingerprint:
+        GLPGPKeyring.remove_key(user.pgp_key_fingerprint)
+
     if k is not None:
         user.pgp_key_public = k['public']
         user.pgp_key_fingerprint = k['fingerprint']
@@ -10,10 +10,11 @@ from twisted.internet.defer import inlineCallbacks
 from globaleaks.orm import transact
 from globaleaks.handlers.base import BaseHandler
 from globaleaks.handlers.rtip import serialize_comment, serialize_message, db_get_itip_comment_list
-from globaleaks.handlers.submission import serialize_usertip, \
+from globaleaks.handlers.submission import serialize_usertip, db_prefetch_tips, \
     db_save_questionnaire_answers, db_get_archived_questionnaire_schema
 from globaleaks.models import WhistleblowerTip, Comment, Message, ReceiverTip
 from globaleaks.rest import errors, requests
+from globaleaks.utils.signals import job_signals, NOTIFICATION
 from globaleaks.utils.utility import log, datetime_now, datetime_to_ISO8601
 
 
@@ -36,10 +37,15 @@ def db_access_wbtip(store, wbtip_id):
     return wbtip
 
 
-def db_get_file_list(store, wbtip_id):
+def db_get_file_list(store, wbtip_id, graph=None):
     wbtip = db_access_wbtip(store, wbtip_id)
 
-    return [wb_serialize_file(internalfile) for internalfile in wbtip.internaltip.internalfiles]
+    if graph is not None:
+        internalfiles = graph.internalfiles.get(wbtip.internaltip_id, [])
+    else:
+        internalfiles = wbtip.internaltip.internalfiles
+
+    return [wb_serialize_file(internalfile) for internalfile in internalfiles]
 
 
 def db_get_wbtip(store, wbtip_id, language):
@@ -59,8 +65,11 @@ def get_wbtip(store, wbtip_id, language):
     return db_get_wbtip(store, wbtip_id, language)
 
 
-def serialize_wbtip(store, wbtip, language):
-    ret = serialize_usertip(store, wbtip, language)
+def serialize_wbtip(store, wbtip, language, graph=None):
+    if graph is None:
+        graph = db_prefetch_tips(store, [wbtip.internaltip_id])
+
+    ret = serialize_usertip(store, wbtip, language, graph)
 
     # filter submission progressive
     # to prevent a fake whistleblower to assess every day how many
@@ -68,8 +77,8 @@ def serialize_wbtip(store, wbtip, language):
     del ret['progressive']
 
     ret['id'] = wbtip.id
-    ret['comments'] = db_get_itip_comment_list(store, wbtip.internaltip)
-    ret['files'] = db_get_file_list(store, wbtip.id)
+    ret['comments'] = db_get_itip_comment_list(store, wbtip.internaltip, graph)
+    ret['files'] = db_get_file_list(store, wbtip.id, graph)
 
     return ret
 
@@ -190,6 +199,8 @@ class WBTipCommentCollection(BaseHandler):
         request = self.validate_message(self.request.body, requests.CommentDesc)
         answer = yield create_comment(self.current_user.user_id, request)
 
+        job_signals.emit(NOTIFICATION)
+
         self.set_status(201)  # Created
         self.write(answer)
 
@@ -217,6 +228,8 @@ class WBTipMessageCollection(BaseHandler):
 
         message = yield create_message(self.current_user.user_id, receiver_id, request)
 
+        job_signals.emit(NOTIFICATION)
+
         self.set_status(201)  # Created
         self.write(message)
 
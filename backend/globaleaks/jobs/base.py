@@ -6,8 +6,9 @@
 import time
 from twisted.internet import task, defer, reactor, threads
 
-from globaleaks.handlers.base import TimingStatsHandler
 from globaleaks.utils.mailutils import send_exception_email, extract_exception_traceback_and_send_email
+from globaleaks.utils.signals import job_signals
+from globaleaks.utils.timingstats import timing_stats
 from globaleaks.utils.utility import log, datetime_null
 
 
@@ -28,9 +29,18 @@ class GLJob(task.LoopingCall):
     monitor_period = 5 * 60
     last_monitor_check_failed = 0 # Epoch start
 
+    # The signals (see globaleaks.utils.signals) waking up the job and the
+    # delay (seconds) of the run following a signal, so that the signals
+    # emitted close in time are served by a single run.
+    signals = []
+    signal_delay = 1
+
     def __init__(self):
         self.job = task.LoopingCall.__init__(self, self.run)
         self.clock = reactor if test_reactor is None else test_reactor
+        self.executing = False
+        self.wakeup_call = None
+        self.wakeup_pending = False
 
     def _errback(self, loopingCall):
         error = "Job %s died with runtime %.4f [low: %.4f, high: %.4f]" % \
@@ -53,12 +63,33 @@ class GLJob(task.LoopingCall):
 
         self.clock.callLater(delay, self.start, self.interval)
 
+        for signal in self.signals:
+            job_signals.connect(signal, self.wakeup)
+
+    def stop(self):
+        for signal in self.signals:
+            job_signals.disconnect(signal, self.wakeup)
+
+        task.LoopingCall.stop(self)
+
+    def wakeup(self):
+        """
+        Run the job within signal_delay seconds instead of waiting for its
+        interval; if the job is running it is run again once completed.
+        """
+        if self.executing:
+            self.wakeup_pending = True
+        elif self.wakeup_call is None or not self.wakeup_call.active():
+            self.wakeup_call = self.clock.callLater(self.signal_delay, self.run)
+
     def stats_collection_begin(self):
         self.start_time = time.time()
 
-    def stats_collection_end(self):
+    def stats_collection_end(self, status):
         current_run_time = time.time() - self.start_time
 
+        timing_stats.record(self.name, 'JOB', status, current_run_time)
+
         # discard empty cycles from stats
         if self.mean_time == -1:
             self.meantime = current_run_time
@@ -73,17 +104,32 @@ class GLJob(task.LoopingCall):
 
     @defer.inlineCallbacks
     def run(self):
+        if self.executing:
+            # the job is already running following a signal or its interval
+            return
+
+        self.executing = True
         self.stats_collection_begin()
 
+        status = 'success'
+
         try:
             yield threads.deferToThread(self.operation)
         except Exception as e:
+            status = 'failure'
+
             log.err("Exception while performing scheduled operation %s: %s" % \
                     (type(self).__name__, e))
 
             extract_exception_traceback_and_send_email(e)
 
-        self.stats_collection_end()
+        self.stats_collection_end(status)
+
+        self.executing = False
+
+        if self.wakeup_pending:
+            self.wakeup_pending = False
+            self.wakeup()
 
 
 class GLJobsMonitor(GLJob):
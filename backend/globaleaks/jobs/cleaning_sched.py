@@ -16,9 +16,11 @@ from globaleaks.handlers.admin.context import admin_serialize_context
 from globaleaks.handlers.admin.notification import db_get_notification
 from globaleaks.handlers.admin.receiver import admin_serialize_receiver
 from globaleaks.handlers.rtip import db_delete_itips, serialize_rtip
+from globaleaks.handlers.submission import db_prefetch_tips
 from globaleaks.jobs.base import GLJob
 from globaleaks.security import overwrite_and_remove
 from globaleaks.settings import GLSettings
+from globaleaks.utils.signals import job_signals, NOTIFICATION
 from globaleaks.utils.templating import Templating
 from globaleaks.utils.utility import log, datetime_now
 
@@ -65,15 +67,20 @@ class CleaningSchedule(GLJob):
     @transact_sync
     def check_for_expiring_submissions(self, store):
         threshold = datetime_now() + timedelta(GLSettings.memory_copy.notif.tip_expiration_threshold)
-        for rtip in store.find(models.ReceiverTip, models.ReceiverTip.internaltip_id == models.InternalTip.id,
-                                                   models.InternalTip.expiration_date < threshold):
+        rtips = list(store.find(models.ReceiverTip,
+                                models.ReceiverTip.internaltip_id == models.InternalTip.id,
+                                models.InternalTip.expiration_date < threshold))
+
+        graph = db_prefetch_tips(store, set(rtip.internaltip_id for rtip in rtips))
+
+        for rtip in rtips:
             user = rtip.receiver.user
             language = user.language
             node_desc = db_admin_serialize_node(store, language)
             notification_desc = db_get_notification(store, language)
             context_desc = admin_serialize_context(store, rtip.internaltip.context, language)
             receiver_desc = admin_serialize_receiver(rtip.receiver, language)
-            tip_desc = serialize_rtip(store, rtip, user.language)
+            tip_desc = serialize_rtip(store, rtip, user.language, graph)
 
             data = {
                'type': u'tip_expiration',
@@ -128,6 +135,8 @@ class CleaningSchedule(GLJob):
 
         self.check_for_expiring_submissions()
 
+        job_signals.emit(NOTIFICATION)
+
         self.clean_db()
 
         self.perform_secure_deletion_of_files()
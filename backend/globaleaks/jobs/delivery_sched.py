@@ -10,14 +10,20 @@
 # Call also the FileProcess working point, in order to verify which
 # kind of file has been submitted.
 
+import Queue
+import fcntl
 import os
+import threading
+
+from twisted.python.failure import Failure
 
 from globaleaks.handlers.admin.receiver import admin_serialize_receiver
 from globaleaks.jobs.base import GLJob
 from globaleaks.models import InternalFile, ReceiverFile
 from globaleaks.orm import transact_sync
-from globaleaks.security import GLBPGP, GLSecureFile, generateRandomKey
+from globaleaks.security import GLPGPKeyring, GLSecureFile, generateRandomKey
 from globaleaks.settings import GLSettings
+from globaleaks.utils.signals import job_signals, DELIVERY, NOTIFICATION
 from globaleaks.utils.utility import log
 
 __all__ = ['DeliverySchedule']
@@ -25,6 +31,9 @@ __all__ = ['DeliverySchedule']
 
 INTERNALFILES_HANDLE_RETRY_MAX = 3
 
+# size of the chunks of plaintext streamed to the encryptions of the receivers
+PLAINTEXT_CHUNK_SIZE = 1024 * 1024
+
 
 @transact_sync
 def receiverfile_planning(store):
@@ -89,68 +98,327 @@ def receiverfile_planning(store):
     return receiverfiles_maps
 
 
-def fsops_pgp_encrypt(fpath, recipient_pgp):
+def fsops_pgp_encrypt(input_file, recipient_pgp):
     """
     return
         path of encrypted file,
         length of the encrypted file
 
-    this function is used to encrypt a file for a specific recipient.
+    this function is used to encrypt the plaintext read from input_file
+    for a specific recipient.
     commonly 'receiver_desc' is expected as second argument;
     anyhow a simpler dict can be used.
 
     required keys are checked on top
     """
-    gpoj = GLBPGP()
+    encrypted_file_path = os.path.join(os.path.abspath(GLSettings.submission_path), "pgp_encrypted-%s" % generateRandomKey(16))
+    _, encrypted_file_size = GLPGPKeyring.encrypt_file(recipient_pgp['pgp_key_public'],
+                                                       recipient_pgp['pgp_key_fingerprint'],
+                                                       input_file, encrypted_file_path)
 
-    try:
-        gpoj.load_key(recipient_pgp['pgp_key_public'])
+    return encrypted_file_path, encrypted_file_size
+
+
+class PipeReader(object):
+    """
+    Read end of a pipe returning the available data up to PLAINTEXT_CHUNK_SIZE
+    bytes whatever the size requested, as python-gnupg reads its input in
+    chunks of 1KB
+    """
+    def __init__(self, fd):
+        self.fd = fd
+
+    def read(self, size=-1):
+        return os.read(self.fd, PLAINTEXT_CHUNK_SIZE)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PGPEncryptionThread(threading.Thread):
+    """
+    Thread encrypting for a receiver the plaintext written to self.pipe;
+    the outcome is available in self.success and self.result once the
+    thread is terminated.
+    """
+    def __init__(self, rfileinfo):
+        threading.Thread.__init__(self)
+        self.rfileinfo = rfileinfo
+        self.success = False
+        self.result = None
+
+        r, w = os.pipe()
+
+        # the pipes must not be inherited by the gpg processes of the other
+        # receivers as they would never get the end of the plaintext
+        for fd in (r, w):
+            fcntl.fcntl(fd, fcntl.F_SETFD, fcntl.fcntl(fd, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+
+        self.input_file = PipeReader(r)
+        self.pipe = os.fdopen(w, 'wb', 0)
+
+    def run(self):
+        try:
+            self.result = fsops_pgp_encrypt(self.input_file, self.rfileinfo['receiver'])
+            self.success = True
+        except Exception:
+            self.result = Failure()
+        finally:
+            # the writer gets a broken pipe if the encryption failed early
+            self.input_file.close()
+
+
+class EncryptionSlots(object):
+    """
+    Bound the number of gpg processes running at the same time to
+    GLSettings.pgp_concurrency, the size of the GLSettings.pgp_tp thread pool.
+
+    The slots needed by a file are acquired all at once so that the files
+    processed concurrently never wait for each other.
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.used = 0
+
+    def size(self):
+        return max(1, GLSettings.pgp_concurrency)
+
+    def acquire(self, count):
+        with self.condition:
+            while self.used and self.used + count > self.size():
+                self.condition.wait()
 
-        filepath = os.path.join(GLSettings.submission_path, fpath)
+            self.used += count
 
-        with GLSecureFile(filepath) as f:
-            encrypted_file_path = os.path.join(os.path.abspath(GLSettings.submission_path), "pgp_encrypted-%s" % generateRandomKey(16))
-            _, encrypted_file_size = gpoj.encrypt_file(recipient_pgp['pgp_key_fingerprint'], f, encrypted_file_path)
+    def release(self, count):
+        with self.condition:
+            self.used -= count
+            self.condition.notify_all()
 
-    except:
-        raise
 
+encryption_slots = EncryptionSlots()
+
+
+def fsops_fanout_ifile(ifile_path, ifile_size, plain_path, pgp_rfiles):
+    """
+    Decrypt the AES file and stream its plaintext to the gpg process of each
+    of the pgp_rfiles and, if plain_path is not None, to the plaintext file.
+
+    The file is decrypted once for every batch of receivers fitting in the
+    encryption slots, and not decrypted at all if nothing consumes it.
+
+    @return: the list of (rfileinfo, success, result) of the encryptions and
+             True if the plaintext file has been created
+    """
+    if not pgp_rfiles and plain_path is None:
+        return [], False
+
+    batch_size = encryption_slots.size()
+    batches = [pgp_rfiles[i:i + batch_size] for i in range(0, len(pgp_rfiles), batch_size)] or [[]]
+
+    encryptions = []
+    plaintext_created = False
+
+    for batch in batches:
+        encryption_slots.acquire(len(batch))
+        try:
+            batch_encryptions, batch_plaintext_created = fsops_stream_ifile(ifile_path, ifile_size, plain_path, batch)
+        finally:
+            encryption_slots.release(len(batch))
+
+        encryptions.extend(batch_encryptions)
+
+        if plain_path is not None:
+            plaintext_created = batch_plaintext_created
+            plain_path = None
+
+    return encryptions, plaintext_created
+
+
+def fsops_stream_ifile(ifile_path, ifile_size, plain_path, pgp_rfiles):
+    """
+    Decrypt the AES file once and stream its plaintext at the same time to
+    the gpg process of each of the pgp_rfiles and, if plain_path is not None,
+    to the plaintext file.
+
+    @return: the list of (rfileinfo, success, result) of the encryptions and
+             True if the plaintext file has been created
+    """
+    encryptions = [PGPEncryptionThread(rfileinfo) for rfileinfo in pgp_rfiles]
+    sinks = [encryption.pipe for encryption in encryptions]
+    plaintext_f = None
+    plaintext_created = False
+    error = None
+
+    for encryption in encryptions:
+        encryption.start()
+
+    try:
+        with GLSecureFile(ifile_path) as encrypted_file:
+            if plain_path is not None:
+                try:
+                    plaintext_f = open(plain_path, "wb")
+                except IOError as excep:
+                    log.err("Unable to create plaintext file %s: %s" % (plain_path, excep))
+
+            written_size = 0
+            while True:
+                chunk = encrypted_file.read(PLAINTEXT_CHUNK_SIZE)
+                if len(chunk) == 0:
+                    if written_size != ifile_size:
+                        log.err("Integrity error on rfile write for ifile %s; ifile_size(%d), rfile_size(%d)" %
+                                (ifile_path, ifile_size, written_size))
+                    break
+
+                written_size += len(chunk)
+
+                for sink in list(sinks):
+                    try:
+                        sink.write(chunk)
+                    except IOError:
+                        # the encryption failed and its error is reported by the thread
+                        sinks.remove(sink)
+
+                if plaintext_f is not None:
+                    try:
+                        plaintext_f.write(chunk)
+                    except IOError as excep:
+                        log.err("Unable to create plaintext file %s: %s" % (plain_path, excep))
+                        plaintext_f.close()
+                        plaintext_f = None
+
+            plaintext_created = plaintext_f is not None
+    except Exception:
+        error = Failure()
+        log.err("Unable to decrypt %s: %s" % (ifile_path, error.getErrorMessage()))
     finally:
-        # the finally statement is always called also if
-        # except contains a return or a raise
-        gpoj.destroy_environment()
+        if plaintext_f is not None:
+            plaintext_f.close()
 
-    return encrypted_file_path, encrypted_file_size
+        for encryption in encryptions:
+            try:
+                encryption.pipe.close()
+            except IOError:
+                pass
+
+        for encryption in encryptions:
+            encryption.join()
+
+    if error is not None:
+        # the receivers would otherwise get the encryption of a truncated file
+        for encryption in encryptions:
+            if encryption.success:
+                fsops_remove_file(encryption.result[0])
+
+        return [(rfileinfo, False, error) for rfileinfo in pgp_rfiles], False
+
+    return [(encryption.rfileinfo, encryption.success, encryption.result) for encryption in encryptions], plaintext_created
+
+
+@transact_sync
+def update_receiverfile(store, rfileinfo):
+    rfile = store.find(ReceiverFile, ReceiverFile.id == rfileinfo['id']).one()
+    if rfile is None:
+        return
+
+    rfile.status = rfileinfo['status']
+    rfile.file_path = rfileinfo['path']
+    rfile.size = rfileinfo['size']
+
+
+def start_fanouts(receiverfiles_maps):
+    """
+    Start the processing of each of the files on the GLSettings.pgp_tp
+    thread pool
+
+    @return: the queue where the outcome of each processing is put
+    """
+    results = Queue.Queue()
+
+    for receiverfiles_map in receiverfiles_maps.itervalues():
+        pgp_rfiles = [rfileinfo for rfileinfo in receiverfiles_map['rfiles'] if rfileinfo['status'] == u'processing']
+        plain_path = receiverfiles_map['plain_path'] if receiverfiles_map['plaintext_file_needed'] else None
+
+        def onResult(success, result, receiverfiles_map=receiverfiles_map):
+            results.put((receiverfiles_map, success, result))
+
+        GLSettings.pgp_tp.callInThreadWithCallback(onResult, fsops_fanout_ifile,
+                                                   receiverfiles_map['ifile_path'],
+                                                   receiverfiles_map['ifile_size'],
+                                                   plain_path, pgp_rfiles)
+
+    return results
+
+
+def complete_pgp_encryptions(encryptions):
+    """
+    Update each receiver file with the outcome of its encryption so that
+    the files become available to the receivers progressively
+    """
+    for rfileinfo, success, result in encryptions:
+        if success:
+            new_path, new_size = result
+
+            log.debug("Switch on Receiver File for %s path %s => %s size %d => %d" %
+                      (rfileinfo['receiver']['name'], rfileinfo['path'],
+                       new_path, rfileinfo['size'], new_size))
+
+            rfileinfo['path'] = new_path
+            rfileinfo['size'] = new_size
+            rfileinfo['status'] = u'encrypted'
+        else:
+            log.err("Unable to complete PGP encrypt for %s on %s: %s. marking the file as unavailable." % (
+                    rfileinfo['receiver']['name'], rfileinfo['path'], result.getErrorMessage())
+            )
+            rfileinfo['status'] = u'unavailable'
+
+        update_receiverfile(rfileinfo)
+
+
+def fsops_remove_file(path):
+    try:
+        os.remove(path)
+    except OSError as ose:
+        log.err("Unable to remove %s: %s" % (path, ose.message))
+
+
+def fsops_remove_ifile(ifile_path):
+    ifile_name = os.path.basename(ifile_path).split('.')[0]
+
+    # the original AES file should always be deleted
+    log.debug("Deleting the submission AES encrypted file: %s" % ifile_path)
+
+    # Remove the AES file
+    fsops_remove_file(ifile_path)
+
+    # Remove the AES file key
+    try:
+        os.remove(os.path.join(GLSettings.ramdisk_path, ("%s%s" % (GLSettings.AES_keyfile_prefix, ifile_name))))
+    except OSError as ose:
+        log.err("Unable to remove keyfile associated with %s: %s" % (ifile_path, ose.message))
 
 
 def process_files(receiverfiles_maps):
     """
     @param receiverfiles_maps: the mapping of ifile/rfiles to be created on filesystem
     @return: return None
+
+    Each AES file is decrypted once per batch of GLSettings.pgp_concurrency
+    receivers with a key and its plaintext is streamed at the same time to
+    their PGP encryptions and, with the first batch, to the plaintext file
+    if needed; the files are processed concurrently on the GLSettings.pgp_tp
+    thread pool and each of them is stored as soon as it is processed.
     """
-    for ifile_id, receiverfiles_map in receiverfiles_maps.iteritems():
+    for receiverfiles_map in receiverfiles_maps.itervalues():
         ifile_path = receiverfiles_map['ifile_path']
         ifile_name = os.path.basename(ifile_path).split('.')[0]
         plain_path = os.path.join(GLSettings.submission_path, "%s.plain" % ifile_name)
 
+        receiverfiles_map['plain_path'] = plain_path
         receiverfiles_map['plaintext_file_needed'] = False
-        for rcounter, rfileinfo in enumerate(receiverfiles_map['rfiles']):
+        for rfileinfo in receiverfiles_map['rfiles']:
             if len(rfileinfo['receiver']['pgp_key_public']):
-                try:
-                    new_path, new_size = fsops_pgp_encrypt(rfileinfo['path'], rfileinfo['receiver'])
-
-                    log.debug("%d# Switch on Receiver File for %s path %s => %s size %d => %d" %
-                              (rcounter,  rfileinfo['receiver']['name'], rfileinfo['path'],
-                               new_path, rfileinfo['size'], new_size))
-
-                    rfileinfo['path'] = new_path
-                    rfileinfo['size'] = new_size
-                    rfileinfo['status'] = u'encrypted'
-                except Exception as excep:
-                    log.err("%d# Unable to complete PGP encrypt for %s on %s: %s. marking the file as unavailable." % (
-                            rcounter, rfileinfo['receiver']['name'], rfileinfo['path'], excep)
-                    )
-                    rfileinfo['status'] = u'unavailable'
+                rfileinfo['status'] = u'processing'
             elif GLSettings.memory_copy.allow_unencrypted:
                 receiverfiles_map['plaintext_file_needed'] = True
                 rfileinfo['status'] = u'reference'
@@ -161,68 +429,66 @@ def process_files(receiverfiles_maps):
         if receiverfiles_map['plaintext_file_needed']:
             log.debug(":( NOT all receivers support PGP and the system allows plaintext version of files: %s saved as plaintext file %s" %
                       (ifile_path, plain_path))
+        else:
+            log.debug("All Receivers support PGP or the system denies plaintext version of files: marking internalfile as removed")
 
-            try:
-                with open(plain_path, "wb") as plaintext_f, GLSecureFile(ifile_path) as encrypted_file:
-                    chunk_size = 4096
-                    written_size = 0
-                    while True:
-                        chunk = encrypted_file.read(chunk_size)
-                        if len(chunk) == 0:
-                            if written_size != receiverfiles_map['ifile_size']:
-                                log.err("Integrity error on rfile write for ifile %s; ifile_size(%d), rfile_size(%d)" %
-                                        (ifile_id, receiverfiles_map['ifile_size'], written_size))
-                            break
-                        written_size += len(chunk)
-                        plaintext_f.write(chunk)
+    results = start_fanouts(receiverfiles_maps)
+
+    for _ in range(len(receiverfiles_maps)):
+        receiverfiles_map, success, result = results.get()
+
+        ifile_path = receiverfiles_map['ifile_path']
 
-                receiverfiles_map['ifile_path'] = plain_path
-            except Exception as excep:
-                log.err("Unable to create plaintext file %s: %s" % (plain_path, excep))
+        if success:
+            encryptions, plaintext_created = result
         else:
-            log.debug("All Receivers support PGP or the system denies plaintext version of files: marking internalfile as removed")
+            log.err("Unable to process %s: %s" % (ifile_path, result.getErrorMessage()))
+            encryptions = [(rfileinfo, False, result) for rfileinfo in receiverfiles_map['rfiles']
+                           if rfileinfo['status'] == u'processing']
+            plaintext_created = False
 
-        # the original AES file should always be deleted
-        log.debug("Deleting the submission AES encrypted file: %s" % ifile_path)
+        complete_pgp_encryptions(encryptions)
 
-        # Remove the AES file
-        try:
-            os.remove(ifile_path)
-        except OSError as ose:
-            log.err("Unable to remove %s: %s" % (ifile_path, ose.message))
+        if plaintext_created:
+            receiverfiles_map['ifile_path'] = receiverfiles_map['plain_path']
+        else:
+            for rfileinfo in receiverfiles_map['rfiles']:
+                if rfileinfo['status'] == u'reference':
+                    rfileinfo['status'] = u'unavailable'
 
-        # Remove the AES file key
-        try:
-            os.remove(os.path.join(GLSettings.ramdisk_path, ("%s%s" % (GLSettings.AES_keyfile_prefix, ifile_name))))
-        except OSError as ose:
-            log.err("Unable to remove keyfile associated with %s: %s" % (ifile_path, ose.message))
+        # the files are made to point to their new path before the removal
+        # of the AES file they were pointing to
+        update_internalfile_and_store_receiverfiles(receiverfiles_map)
+
+        fsops_remove_ifile(ifile_path)
 
 
 @transact_sync
-def update_internalfile_and_store_receiverfiles(store, receiverfiles_maps):
-    for ifile_id, receiverfiles_map in receiverfiles_maps.iteritems():
-        ifile = store.find(InternalFile, InternalFile.id == ifile_id).one()
-        if ifile is None:
-            continue
+def update_internalfile_and_store_receiverfiles(store, receiverfiles_map):
+    ifile = store.find(InternalFile, InternalFile.id == receiverfiles_map['ifile_id']).one()
+    if ifile is None:
+        return
 
-        ifile.new = False
+    ifile.new = False
 
-        # update filepath possibly changed in case of plaintext file needed
-        ifile.file_path = receiverfiles_map['ifile_path']
+    # update filepath possibly changed in case of plaintext file needed
+    ifile.file_path = receiverfiles_map['ifile_path']
 
-        for rf in receiverfiles_map['rfiles']:
-            rfile = store.find(ReceiverFile, ReceiverFile.id == rf['id']).one()
-            if rfile is None:
-                continue
+    for rf in receiverfiles_map['rfiles']:
+        rfile = store.find(ReceiverFile, ReceiverFile.id == rf['id']).one()
+        if rfile is None:
+            continue
 
-            rfile.status = rf['status']
-            rfile.file_path = rf['path']
-            rfile.size = rf['size']
+        rfile.status = rf['status']
+        rfile.file_path = rf['path']
+        rfile.size = rf['size']
 
 
 class DeliverySchedule(GLJob):
     name = "Delivery"
-    interval = 2
+    # the job is woken up by the registration of new files
+    interval = 60
+    signals = [DELIVERY]
     monitor_interval = 15 * 60
 
     def operation(self):
@@ -233,4 +499,5 @@ class DeliverySchedule(GLJob):
 
         if len(receiverfiles_maps):
             process_files(receiverfiles_maps)
-            update_internalfile_and_store_receiverfiles(receiverfiles_maps)
+
+            job_signals.emit(NOTIFICATION)
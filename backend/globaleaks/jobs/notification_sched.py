@@ -8,17 +8,18 @@ import copy
 from twisted.internet import defer, reactor, threads
 
 from globaleaks import models
-from globaleaks.orm import transact, transact_sync
+from globaleaks.orm import transact, transact_sync, db_prefetch, prefetched_values
 from globaleaks.handlers.admin.context import admin_serialize_context
 from globaleaks.handlers.admin.node import db_admin_serialize_node
 from globaleaks.handlers.admin.notification import db_get_notification
 from globaleaks.handlers.admin.receiver import admin_serialize_receiver
 from globaleaks.handlers.rtip import serialize_rtip, serialize_message, serialize_comment
-from globaleaks.handlers.submission import serialize_internalfile
+from globaleaks.handlers.submission import serialize_internalfile, db_prefetch_tips
 from globaleaks.jobs.base import GLJob
-from globaleaks.security import GLBPGP
+from globaleaks.security import GLPGPKeyring
 from globaleaks.settings import GLSettings
 from globaleaks.utils.mailutils import sendmail
+from globaleaks.utils.signals import NOTIFICATION
 from globaleaks.utils.templating import Templating
 from globaleaks.utils.utility import log
 
@@ -42,6 +43,7 @@ trigger_model_map = {
 class MailGenerator(object):
     def __init__(self):
         self.cache = {}
+        self.graph = None
 
     def serialize_config(self, store, key, language):
         cache_key = key + '-' + language
@@ -63,7 +65,7 @@ class MailGenerator(object):
 
         if cache_key not in self.cache:
             if key == 'tip':
-                cache_obj = serialize_rtip(store, obj, language)
+                cache_obj = serialize_rtip(store, obj, language, self.graph)
             elif key == 'context':
                 cache_obj = admin_serialize_context(store, obj, language)
             elif key == 'receiver':
@@ -169,20 +171,15 @@ class MailGenerator(object):
 
         # If the receiver has encryption enabled encrypt the mail body
         if len(data['receiver']['pgp_key_public']):
-            gpob = GLBPGP()
-
             try:
-                gpob.load_key(data['receiver']['pgp_key_public'])
-                body = gpob.encrypt_message(data['receiver']['pgp_key_fingerprint'], body)
+                body = GLPGPKeyring.encrypt_message(data['receiver']['pgp_key_public'],
+                                                    data['receiver']['pgp_key_fingerprint'],
+                                                    body)
             except Exception as excep:
                 log.err("Error in PGP interface object (for %s: %s)! (notification+encryption)" %
                         (data['receiver']['username'], str(excep)))
 
                 return
-            finally:
-                # the finally statement is always called also if
-                # except contains a return or a raise
-                gpob.destroy_environment()
 
         mail = models.Mail({
             'address': data['receiver']['mail_address'],
@@ -192,13 +189,34 @@ class MailGenerator(object):
 
         store.add(mail)
 
+    def prefetch(self, store, elements):
+        """
+        Load at once the tips of all the notified elements so that
+        serializing them does not cost queries proportional to their number
+        """
+        rtip_ids = set(element.receivertip_id for element in elements['Message'] + elements['ReceiverFile'])
+        rtips = db_prefetch(store, models.ReceiverTip, models.ReceiverTip.id, rtip_ids)
+
+        itip_ids = set(rtip.internaltip_id for rtip in elements['ReceiverTip'])
+        itip_ids.update(comment.internaltip_id for comment in elements['Comment'])
+        itip_ids.update(rtip.internaltip_id for rtip in prefetched_values(rtips))
+
+        self.graph = db_prefetch_tips(store, itip_ids)
+
     @transact_sync
     def generate(self, store):
-        for trigger in ['ReceiverTip', 'Comment', 'Message', 'ReceiverFile']:
+        triggers = ['ReceiverTip', 'Comment', 'Message', 'ReceiverFile']
+
+        elements = {}
+        for trigger in triggers:
             model = trigger_model_map[trigger]
+            elements[trigger] = list(store.find(model, model.new == True))
+
+        if not GLSettings.memory_copy.notif.disable_receiver_notification_emails:
+            self.prefetch(store, elements)
 
-            elements = store.find(model, model.new == True)
-            for element in elements:
+        for trigger in triggers:
+            for element in elements[trigger]:
                 element.new = False
 
                 if GLSettings.memory_copy.notif.disable_receiver_notification_emails:
@@ -210,7 +228,7 @@ class MailGenerator(object):
 
                 getattr(self, 'process_%s' % trigger)(store, element, data)
 
-            count = elements.count()
+            count = len(elements[trigger])
             if count > 0:
                 log.debug("Notification: generated %d notifications of type %s" %
                           (count, trigger))
@@ -244,6 +262,10 @@ def get_mails_from_the_pool(store):
 
 class NotificationSchedule(GLJob):
     name = "Notification"
+    # the job is woken up by the creation of new tips, comments, messages,
+    # receiver files and mails; its periodic run retries the mails that
+    # failed to be sent
+    signals = [NOTIFICATION]
     monitor_interval = 15 * 60
 
     def sendmail(self, mail):
@@ -20,7 +20,9 @@ from globaleaks.handlers.admin.notification import db_get_notification
 from globaleaks.handlers.admin.user import db_get_admin_users
 from globaleaks.handlers.user import user_serialize_user
 from globaleaks.jobs.base import GLJob
+from globaleaks.security import GLPGPKeyring
 from globaleaks.settings import GLSettings
+from globaleaks.utils.signals import job_signals, NOTIFICATION
 from globaleaks.utils.utility import datetime_now, datetime_null
 from globaleaks.utils.templating import Templating
 
@@ -67,6 +69,7 @@ class PGPCheckSchedule(GLJob):
             if user.pgp_key_public and user.pgp_key_expiration != datetime_null():
                 if user.pgp_key_expiration < datetime_now():
                     expired_or_expiring.append(user_serialize_user(user, GLSettings.memory_copy.default_language))
+                    GLPGPKeyring.remove_key(user.pgp_key_fingerprint)
                     user.pgp_key_public = None
                     user.pgp_key_fingerprint = None
                     user.pgp_key_expiration = None
@@ -82,3 +85,5 @@ class PGPCheckSchedule(GLJob):
 
     def operation(self):
         self.perform_pgp_validation_checks()
+
+        job_signals.emit(NOTIFICATION)
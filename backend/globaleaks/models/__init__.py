@@ -5,7 +5,7 @@ GlobaLeaks ORM Models definitions.
 from __future__ import absolute_import
 from datetime import timedelta
 
-from storm.locals import Bool, Int, Reference, ReferenceSet, Unicode, Storm, JSON
+from storm.locals import Bool, Int, Reference, ReferenceSet, Unicode, Storm
 
 from globaleaks.models.validators import shorttext_v, longtext_v, \
     shortlocal_v, longlocal_v, shorturl_v, longurl_v, natnum_v
@@ -14,7 +14,7 @@ from globaleaks.settings import GLSettings
 from globaleaks.utils.utility import datetime_now, datetime_null, uuid4
 from globaleaks.rest import errors
 
-from .properties import MetaModel, DateTime
+from .properties import MetaModel, DateTime, JSON
 
 empty_localization = {}
 
@@ -1,10 +1,11 @@
 from globaleaks import __version__
 from globaleaks.utils.utility import log
 from storm.expr import And, Not
-from storm.locals import Storm, Bool, Unicode, JSON
+from storm.locals import Storm, Bool, Unicode
 
 import config_desc
 from .config_desc import GLConfig
+from .properties import JSON
 
 
 class ConfigFactory(object):
@@ -5,9 +5,14 @@ from storm.properties import Property
 # datetime objects are going to be extended
 from storm.locals import DateTime as _DateTime
 from storm.variables import DateTimeVariable as _DateTimeVariable
+# JSON columns are going to use globaleaks.utils.jsoncodec
+from storm.locals import JSON as _JSON
+from storm.variables import JSONVariable as _JSONVariable
 # Storm's metaclass is going to be extended.
 from storm.properties import PropertyPublisherMeta
 
+from globaleaks.utils import jsoncodec
+
 __all__ = ['MetaModel']
 
 
@@ -69,3 +74,25 @@ class DateTime(_DateTime):
     Re-define storm's property datetime to use our parser.
     """
     variable_class = DateTimeVariable
+
+
+class JSONVariable(_JSONVariable):
+    """
+    Extend storm variable for JSON objects to use the JSON codec of globaleaks.
+    """
+    __slots__ = ()
+
+    def _loads(self, value):
+        if not isinstance(value, unicode):
+            raise TypeError("Cannot safely assume encoding of byte string %r." % value)
+        return jsoncodec.loads(value)
+
+    def _dumps(self, value):
+        return jsoncodec.dumps(value)
+
+
+class JSON(_JSON):
+    """
+    Re-define storm's property JSON to use our codec.
+    """
+    variable_class = JSONVariable
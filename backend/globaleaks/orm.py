@@ -1,20 +1,28 @@
 # -*- coding: UTF-8
 # orm: contains main hooks to storm ORM
 # ******
+import os
 import sys
 import threading
+import time
 
 from storm import exceptions, tracer
 import storm.databases.sqlite
 from storm.database import create_database
+from storm.expr import In
 from storm.databases.sqlite import sqlite
 from storm.store import Store
 
 
 from twisted.internet import reactor
+from twisted.internet.defer import Deferred
 from twisted.internet.threads import deferToThreadPool
 
 from globaleaks.settings import GLSettings
+from globaleaks.utils.sqltracer import QueryStats, query_tracer, get_context_query_stats, \
+    resume_with_query_stats
+from globaleaks.utils.timingstats import LatencyHistogram, MAX_HISTOGRAMS, OVERFLOW_ROUTE
+from globaleaks.utils.utility import datetime_now, datetime_to_ISO8601, log
 
 
 class SQLite(storm.databases.sqlite.Database):
@@ -28,10 +36,14 @@ class SQLite(storm.databases.sqlite.Database):
         self._synchronous = uri.options.get("synchronous")
         self._journal_mode = uri.options.get("journal_mode")
         self._foreign_keys = uri.options.get("foreign_keys")
+        self._query_only = uri.options.get("query_only")
 
     def raw_connect(self):
+        # The connections of the pooled Stores are used by one thread at a
+        # time but they are closed by the reactor thread on shutdown
         raw_connection = sqlite.connect(self._filename, timeout=self._timeout,
-                                        isolation_level=None)
+                                        isolation_level=None,
+                                        check_same_thread=False)
 
         if self._synchronous is not None:
             raw_connection.execute("PRAGMA synchronous = %s" %
@@ -45,6 +57,10 @@ class SQLite(storm.databases.sqlite.Database):
             raw_connection.execute("PRAGMA foreign_keys = %s" %
                                    (self._foreign_keys,))
 
+        if self._query_only is not None:
+            raw_connection.execute("PRAGMA query_only = %s" %
+                                   (self._query_only,))
+
         raw_connection.execute("PRAGMA secure_delete = ON")
 
         return raw_connection
@@ -57,19 +73,361 @@ def get_store():
     return Store(create_database(GLSettings.db_uri))
 
 
+def get_ro_db_uri():
+    return GLSettings.db_uri + '&query_only=ON'
+
+
+def get_ro_store():
+    return Store(create_database(get_ro_db_uri()))
+
+
+def db_checkpoint(db_file_path):
+    """
+    Move the content of the write-ahead log of the database into the
+    database file and truncate the log, so that the database file alone
+    contains every committed transaction
+    """
+    if not os.path.exists(db_file_path):
+        return
+
+    raw_connection = sqlite.connect(db_file_path, isolation_level=None)
+    try:
+        raw_connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        raw_connection.close()
+
+
+# SQLite limits the number of host parameters of a statement (default: 999)
+PREFETCH_CHUNK_SIZE = 500
+
+
+def db_prefetch(store, model, column, values):
+    """
+    Load with a single query (for each chunk of PREFETCH_CHUNK_SIZE values)
+    all the objects of model whose column matches one of the given values.
+
+    The loaded objects are added to the store cache so that the following
+    accesses to them through Storm References on primary keys do not
+    query the database; the caller must keep the returned dict alive
+    for as long as it relies on this.
+
+    :return: a dict mapping each value to the list of the matching objects
+    """
+    ret = dict((value, []) for value in values if value is not None)
+
+    keys = ret.keys()
+    for i in range(0, len(keys), PREFETCH_CHUNK_SIZE):
+        for obj in store.find(model, In(column, keys[i:i + PREFETCH_CHUNK_SIZE])):
+            ret[getattr(obj, column.name)].append(obj)
+
+    return ret
+
+
+def prefetched_values(prefetched):
+    return [obj for objs in prefetched.itervalues() for obj in objs]
+
+
+class StorePool(object):
+    """
+    Pool of Stores keyed per ORM worker thread and database uri.
+
+    Opening a sqlite connection and configuring it with the PRAGMAs
+    of SQLite.raw_connect is a relevant part of the cost of a short
+    transaction; the pool keeps a Store open for each thread so that it
+    can be reused across transactions.
+
+    A pooled Store is discarded and reopened when:
+      - it is older than GLSettings.orm_connection_max_age seconds;
+      - it fails the health check performed before reusing it;
+      - it cannot be rolled back after a failure;
+      - the pool is cleared.
+    """
+    def __init__(self):
+        self.local = threading.local()
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.stores = set()
+
+    def _get_thread_stores(self):
+        if getattr(self.local, 'generation', None) != self.generation:
+            for store, _ in getattr(self.local, 'stores', {}).itervalues():
+                self._release(store)
+
+            self.local.stores = {}
+            self.local.generation = self.generation
+
+        return self.local.stores
+
+    @staticmethod
+    def _close(store):
+        try:
+            store.close()
+        except Exception:
+            pass
+
+    def _release(self, store):
+        with self.lock:
+            self.stores.discard(store)
+
+        self._close(store)
+
+    @staticmethod
+    def _check_health(store):
+        try:
+            store.execute("SELECT 1").get_one()
+            return True
+        except Exception:
+            return False
+
+    def get(self, uri):
+        stores = self._get_thread_stores()
+
+        if uri in stores:
+            store, creation_time = stores[uri]
+
+            if time.time() - creation_time < GLSettings.orm_connection_max_age and \
+               self._check_health(store):
+                return store
+
+            self.discard(uri)
+
+        store = Store(create_database(uri))
+
+        if GLSettings.orm_connection_max_age > 0:
+            stores[uri] = (store, time.time())
+
+            with self.lock:
+                self.stores.add(store)
+
+        return store
+
+    def put(self, uri, store):
+        """
+        Release the store after the transaction has been committed or rolled back
+        """
+        try:
+            store.reset()
+        except Exception:
+            self.discard(uri)
+            self._release(store)
+            return
+
+        if self._get_thread_stores().get(uri, (None, 0))[0] is not store:
+            self._release(store)
+
+    def reset(self, uri, store):
+        """
+        Rollback the store after a failure and release it
+        """
+        try:
+            store.rollback()
+        except Exception:
+            self.discard(uri)
+            self._release(store)
+            return
+
+        self.put(uri, store)
+
+    def discard(self, uri):
+        store, _ = self._get_thread_stores().pop(uri, (None, 0))
+        if store is not None:
+            self._release(store)
+
+    def clear(self):
+        """
+        Invalidate all the pooled Stores of every thread; each thread closes
+        its own Stores the next time it accesses the pool.
+        """
+        self.generation += 1
+
+    def close(self):
+        """
+        Close the pooled Stores of every thread.
+
+        To be called only when no transaction can be running, e.g. once
+        the ORM thread pools have been stopped.
+        """
+        self.clear()
+
+        with self.lock:
+            stores, self.stores = self.stores, set()
+
+        for store in stores:
+            self._close(store)
+
+
+store_pool = StorePool()
+
+
+def shutdown_db():
+    """
+    Close the pooled connections and checkpoint the write-ahead log
+    """
+    store_pool.close()
+    db_checkpoint(GLSettings.db_file_path)
+
+
+class TransactionStats(object):
+    """
+    Latency histograms of the transactions.
+
+    For each thread pool are kept the histograms of the time waited in the
+    queue of the pool and of the duration of the transactions.
+
+    For each transaction function are kept the histograms of its phases:
+      - queue: the time waited in the queue of the thread pool;
+      - lock: the time waited to acquire the transact_lock;
+      - exec: the execution time of the function;
+      - commit: the time spent committing (or releasing) the store.
+    """
+    phases = ['queue', 'lock', 'exec', 'commit']
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.functions = {}
+        self.queries = {}
+        self.start_date = datetime_now()
+
+    def record(self, pool, name, timings, query_stats=None):
+        """
+        :param timings: a dict mapping the phases to their durations in seconds
+        :param query_stats: the QueryStats of the statements of the transaction
+        """
+        with self.lock:
+            if pool not in self.histograms:
+                self.histograms[pool] = {
+                    'wait': LatencyHistogram(),
+                    'duration': LatencyHistogram()
+                }
+
+            self.histograms[pool]['wait'].add(timings.get('queue', 0))
+            self.histograms[pool]['duration'].add(sum(v for k, v in timings.iteritems() if k != 'queue'))
+
+            key = (pool, name)
+            if key not in self.functions:
+                if len(self.functions) >= MAX_HISTOGRAMS:
+                    key = (pool, OVERFLOW_ROUTE)
+
+                self.functions.setdefault(key, {})
+                self.queries.setdefault(key, [0, 0.0])
+
+            for phase, value in timings.iteritems():
+                if phase not in self.functions[key]:
+                    self.functions[key][phase] = LatencyHistogram()
+
+                self.functions[key][phase].add(value)
+
+            if query_stats is not None:
+                self.queries[key][0] += query_stats.count
+                self.queries[key][1] += query_stats.time
+
+    def stats(self):
+        """
+        Return the stats of the phases of every transaction function
+        sorted by the total time spent executing them; the times are in
+        milliseconds
+        """
+        with self.lock:
+            functions = sorted(self.functions.iteritems(),
+                               key=lambda x: sum(h.total for p, h in x[1].iteritems() if p != 'queue'),
+                               reverse=True)
+
+            transactions = []
+            for (pool, name), histograms in functions:
+                count = histograms['exec'].count
+                queries, sql_time = self.queries[(pool, name)]
+
+                transaction = {
+                    'pool': pool,
+                    'name': name,
+                    'count': count,
+                    'queries': queries,
+                    'queries_per_transaction': float(queries) / count if count else 0.0,
+                    'sql_time': sql_time * 1000
+                }
+
+                for phase in self.phases:
+                    if phase in histograms:
+                        transaction[phase] = histograms[phase].summary()
+
+                transactions.append(transaction)
+
+            return {
+                'since': datetime_to_ISO8601(self.start_date),
+                'transactions': transactions
+            }
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.functions = {}
+            self.queries = {}
+            self.start_date = datetime_now()
+
+
+transaction_stats = TransactionStats()
+
+
 transact_lock = threading.Lock()
 
 
+class TransactionTrace(object):
+    """
+    Measure the duration of the consecutive phases of a transaction and
+    account its statements to the transaction and to the HTTP request
+    (if any) on behalf of which it is executed
+    """
+    def __init__(self, pool, name, start_time, request_query_stats):
+        self.pool = pool
+        self.name = name
+        self.last = start_time
+        self.timings = {}
+        self.query_stats = QueryStats(name)
+        self.request_query_stats = request_query_stats
+
+    def mark(self, phase):
+        now = time.time()
+        self.timings[phase] = now - self.last
+        self.last = now
+
+    def start_query_tracing(self):
+        if self.request_query_stats is None:
+            query_tracer.start(self.name, [self.query_stats])
+        else:
+            query_tracer.start('%s for %s' % (self.name, self.request_query_stats.name),
+                               [self.query_stats, self.request_query_stats])
+
+    def end(self):
+        query_tracer.stop()
+
+        transaction_stats.record(self.pool, self.name, self.timings, self.query_stats)
+
+        duration = sum(self.timings.values())
+        if duration > GLSettings.orm_slow_transaction_threshold:
+            log.info("Slow transaction %s on %s: %.3fs (%s, queries: %d in %.3fs)" %
+                     (self.name, self.pool, duration,
+                      ', '.join('%s: %.3fs' % (phase, self.timings[phase])
+                                for phase in TransactionStats.phases if phase in self.timings),
+                      self.query_stats.count, self.query_stats.time))
+
+
 class transact(object):
     """
     Class decorator for managing transactions.
     Because Storm sucks.
     """
+    # name of the GLSettings thread pool executing the transactions
+    threadpool = 'orm_tp'
+
     def __init__(self, method):
         self.method = method
         self.instance = None
         self.debug = GLSettings.orm_debug
 
+        # name used to label the stats of the transaction
+        self.name = '%s.%s' % (method.__module__.replace('globaleaks.', '', 1), method.__name__)
+
         if self.debug:
             tracer.debug(self.debug, sys.stdout)
 
@@ -78,40 +436,96 @@ class transact(object):
         return self
 
     def __call__(self, *args, **kwargs):
-        return self.run(self._wrap, self.method, *args, **kwargs)
+        request_query_stats = get_context_query_stats()
+
+        trace = TransactionTrace(self.threadpool, self.name, time.time(), request_query_stats)
+
+        result = self.run(self._wrap, trace, self.method, *args, **kwargs)
+
+        if request_query_stats is not None and isinstance(result, Deferred):
+            result = resume_with_query_stats(request_query_stats, result)
+
+        return result
 
     def run(self, function, *args, **kwargs):
         return deferToThreadPool(reactor,
-                                 GLSettings.orm_tp,
+                                 getattr(GLSettings, self.threadpool),
                                  function,
                                  *args,
                                  **kwargs)
 
-    def _wrap(self, function, *args, **kwargs):
+    def _wrap(self, trace, function, *args, **kwargs):
         """
         Wrap provided function calling it inside a thread and
         passing the store to it.
         """
-        with transact_lock:
-            store = Store(create_database(GLSettings.db_uri))
+        trace.mark('queue')
+        trace.start_query_tracing()
+
+        try:
+            with transact_lock:
+                trace.mark('lock')
 
-            try:
-                if self.instance:
-                    result = function(self.instance, store, *args, **kwargs)
+                uri = GLSettings.db_uri
+                store = store_pool.get(uri)
+
+                try:
+                    try:
+                        if self.instance:
+                            result = function(self.instance, store, *args, **kwargs)
+                        else:
+                            result = function(store, *args, **kwargs)
+                    finally:
+                        trace.mark('exec')
+
+                    store.commit()
+                except:
+                    store_pool.reset(uri, store)
+                    raise
                 else:
-                    result = function(store, *args, **kwargs)
+                    store_pool.put(uri, store)
+                    return result
+                finally:
+                    trace.mark('commit')
+        finally:
+            trace.end()
 
-                store.commit()
-            except:
-                store.rollback()
-                raise
+
+class transact_ro(transact):
+    """
+    Class decorator for managing read-only transactions.
+
+    Read-only transactions are dispatched on GLSettings.orm_ro_tp and do not
+    acquire the transact_lock so that many readers can run in parallel;
+    the database is opened in WAL journal mode and thus readers neither block
+    nor are blocked by the single writer.
+
+    The connection is opened with PRAGMA query_only so that any attempt
+    to write raises an exception.
+    """
+    threadpool = 'orm_ro_tp'
+
+    def _wrap(self, trace, function, *args, **kwargs):
+        trace.mark('queue')
+        trace.start_query_tracing()
+
+        uri = get_ro_db_uri()
+        store = store_pool.get(uri)
+
+        try:
+            if self.instance:
+                return function(self.instance, store, *args, **kwargs)
             else:
-                return result
-            finally:
-                store.reset()
-                store.close()
+                return function(store, *args, **kwargs)
+        finally:
+            trace.mark('exec')
+            store_pool.reset(uri, store)
+            trace.mark('commit')
+            trace.end()
 
 
 class transact_sync(transact):
+    threadpool = 'sync'
+
     def run(self, function, *args, **kwargs):
         return function(*args, **kwargs)
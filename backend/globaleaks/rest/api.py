@@ -16,7 +16,7 @@ from globaleaks.handlers import exception, \
                                 files, authentication, token, \
                                 export, l10n, wizard, \
                                 base, user, shorturl, \
-                                robots
+                                robots, metrics
 
 from globaleaks.handlers.admin import node as admin_node
 from globaleaks.handlers.admin import user as admin_user
@@ -115,6 +115,8 @@ spec = [
     (r'/admin/stats/(\d+)', admin_statistics.StatsCollection),
     (r'/admin/activities/(summary|details)', admin_statistics.RecentEventsCollection),
     (r'/admin/anomalies', admin_statistics.AnomalyCollection),
+    (r'/admin/stats/cache', admin_statistics.CacheStatsCollection),
+    (r'/admin/stats/transactions', admin_statistics.TransactionStatsCollection),
     (r'/admin/l10n/(' + '|'.join(LANGUAGES_SUPPORTED_CODES) + ')', admin_l10n.AdminL10NHandler),
     (r'/admin/files/(logo|favicon|css|homepage|script)', admin_files.FileInstance),
     (r'/admin/staticfiles', admin_staticfiles.StaticFileList),
@@ -130,6 +132,7 @@ spec = [
     (r'/l10n/(' + '|'.join(LANGUAGES_SUPPORTED_CODES) + ')', l10n.L10NHandler),
 
     (r'/x/timingstats', base.TimingStatsHandler),
+    (r'/metrics', metrics.MetricsHandler),
 
     ## This Handler should remain the last one as it works like a last resort catch 'em all
     (r'/([a-zA-Z0-9_\-\/\.]*)', base.BaseStaticFileHandler, {'path': GLSettings.client_path})
@@ -141,6 +144,15 @@ class Application(web.Application):
     This class simply overrides the web.Application.__class_ in order to
     allow to allow adding a prefix to the API urls.
     """
+    def __init__(self, handlers=None, **settings):
+        web.Application.__init__(self, handlers, **settings)
+
+        # pass to the handlers the pattern of their route
+        for _, specs in self.handlers:
+            for spec in specs:
+                if issubclass(spec.handler_class, base.BaseHandler):
+                    spec.kwargs = dict(spec.kwargs, route=spec.regex.pattern.rstrip('$'))
+
     def __call__(self, request):
         prefix = GLSettings.api_prefix
         if prefix != '' and request.path.startswith(prefix):
@@ -158,3 +170,14 @@ def get_api_factory():
     GLAPIFactory.protocol = base.GLHTTPConnection
 
     return GLAPIFactory
+
+
+def get_metrics_factory():
+    """
+    Factory of the listener serving /metrics without authentication
+    on localhost (--metrics-port)
+    """
+    GLMetricsFactory = Application([(r'/metrics', metrics.MetricsHandler, {'localhost_listener': True})])
+    GLMetricsFactory.protocol = base.GLHTTPConnection
+
+    return GLMetricsFactory
@@ -1,28 +1,254 @@
+import gzip
+import hashlib
+import time
+from io import BytesIO
+
+from twisted.internet import defer, reactor
 from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.python.failure import Failure
+
+from globaleaks.settings import GLSettings
+from globaleaks.utils import jsoncodec
+from globaleaks.utils.lrucache import LRUCache
+from globaleaks.utils.utility import log
+
+
+class GLApiCachedResponse(object):
+    """
+    The JSON encoding of a resource, its gzip compression and
+    their strong ETags, computed once when the resource is cached.
+    """
+    def __init__(self, value):
+        self.body = jsoncodec.encode(value)
+
+        gzip_body = BytesIO()
+        # mtime is fixed in order to make the compressed body deterministic
+        with gzip.GzipFile(mode='wb', fileobj=gzip_body, mtime=0) as f:
+            f.write(self.body)
+        self.gzip_body = gzip_body.getvalue()
+
+        digest = hashlib.sha256(self.body).hexdigest()
+        self.etag = '"%s"' % digest
+        self.gzip_etag = '"%s-gzip"' % digest
+
+    def matches(self, if_none_match):
+        """
+        Return True if the If-None-Match header refers to one
+        of the representations of the resource
+        """
+        if if_none_match is None:
+            return False
+
+        if if_none_match.strip() == '*':
+            return True
+
+        etags = [etag.strip() for etag in if_none_match.split(',')]
+
+        return self.etag in etags or self.gzip_etag in etags
+
+
+@inlineCallbacks
+def encode_response(function, *args, **kwargs):
+    value = yield function(*args, **kwargs)
+    returnValue(GLApiCachedResponse(value))
+
+
+def sizeof_cached_value(value):
+    if isinstance(value, GLApiCachedResponse):
+        return len(value.body) + len(value.gzip_body)
+
+    try:
+        return len(jsoncodec.encode(value))
+    except Exception:
+        return 0
 
 
 class GLApiCache(object):
-    memory_cache_dict = {}
+    # (resource_name, language) -> value, bounded by the configured entries and memory budget
+    cache = LRUCache(GLSettings.api_cache_size_limit,
+                     GLSettings.api_cache_bytes_limit,
+                     sizeof_cached_value,
+                     lambda key, value: GLApiCache._count(key[0], 'evictions'))
+
+    # resource_name -> hits, misses, evictions and invalidations of the resource
+    resource_stats = {}
+
+    # resource_name -> set of the names of the models/config groups the resource depends on
+    dependencies = {}
+
+    # (resource_name, language) -> list of the (generation, deferred) waiting the pending computation
+    pending = {}
+
+    # (resource_name, language) -> counter incremented at every invalidation of the
+    # resource in the language; used to discard values computed while it was invalidated
+    generations = {}
+
+    # resource_name -> function(language) used to warm up the resource
+    warmup_functions = {}
+
+    # the DelayedCall of the scheduled warm-up, if any
+    warmup_call = None
+
+    @classmethod
+    def register(cls, resource_name, dependencies, warmup_function=None):
+        """
+        Register the models/config groups a resource depends on;
+        resources not registered are invalidated by any dependency.
+
+        Resources served with get_response() can register the function
+        computing them in order to be pre-populated by warm_up().
+        """
+        cls.dependencies[resource_name] = set(dependencies)
+
+        if warmup_function is not None:
+            cls.warmup_functions[resource_name] = warmup_function
+
+    @classmethod
+    def _count(cls, resource_name, counter):
+        if resource_name not in cls.resource_stats:
+            cls.resource_stats[resource_name] = {
+                'hits': 0,
+                'misses': 0,
+                'evictions': 0,
+                'invalidations': 0
+            }
+
+        cls.resource_stats[resource_name][counter] += 1
+
+    @classmethod
+    def stats(cls):
+        return {
+            'cache': cls.cache.stats(),
+            'resources': cls.resource_stats
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        cls.cache.reset_stats()
+        cls.resource_stats = {}
+
+    @classmethod
+    @inlineCallbacks
+    def warm_up(cls, languages=None):
+        """
+        Populate the cache with the registered resources not already
+        cached for all the given languages (default: the enabled languages)
+        """
+        if languages is None:
+            languages = GLSettings.memory_copy.languages_enabled
+
+        start_time = time.time()
+
+        for resource_name, function in cls.warmup_functions.items():
+            for language in languages:
+                if cls.is_cached(resource_name, language):
+                    continue
+
+                try:
+                    yield cls.get_response(resource_name, language, function, language)
+                except Exception as excep:
+                    log.err("Unable to warm up the cache of %s (%s): %s" % (resource_name, language, excep))
+
+        log.info("Cache warm-up of %d resources for %d languages completed in %.3f seconds" %
+                 (len(cls.warmup_functions), len(languages), time.time() - start_time))
+
+    @classmethod
+    def schedule_warm_up(cls):
+        if GLSettings.api_cache_warmup and \
+                (cls.warmup_call is None or not cls.warmup_call.active()):
+            cls.warmup_call = reactor.callLater(0, cls.warm_up)
 
     @classmethod
     @inlineCallbacks
     def get(cls, resource_name, language, function, *args, **kwargs):
-        if resource_name in cls.memory_cache_dict \
-                and language in cls.memory_cache_dict[resource_name]:
-            returnValue(cls.memory_cache_dict[resource_name][language])
-
-        value = yield function(*args, **kwargs)
-        if resource_name not in cls.memory_cache_dict:
-            cls.memory_cache_dict[resource_name] = {}
-        cls.memory_cache_dict[resource_name][language] = value
+        key = (resource_name, language)
+
+        value = cls.cache.get(key)
+        if value is not None:
+            cls._count(resource_name, 'hits')
+            returnValue(value)
+
+        cls._count(resource_name, 'misses')
+
+        # concurrent misses on the same resource wait for the
+        # result of the computation started by the first one
+        if key in cls.pending:
+            d = defer.Deferred()
+            cls.pending[key].append((cls.generations.get(key, 0), d))
+            value = yield d
+            returnValue(value)
+
+        cls.pending[key] = []
+        generation = cls.generations.get(key, 0)
+
+        try:
+            value = yield function(*args, **kwargs)
+        except Exception:
+            failure = Failure()
+            for _, d in cls.pending.pop(key):
+                d.errback(failure)
+            raise
+
+        if generation == cls.generations.get(key, 0):
+            cls.set(resource_name, language, value)
+
+        for waiter_generation, d in cls.pending.pop(key):
+            if waiter_generation == generation:
+                d.callback(value)
+            else:
+                # the waiter joined after an invalidation of the resource
+                # and gets the result of a new computation
+                cls.get(resource_name, language, function, *args, **kwargs).chainDeferred(d)
+
         returnValue(value)
 
+    @classmethod
+    def get_response(cls, resource_name, language, function, *args, **kwargs):
+        """
+        Like get() but caches the GLApiCachedResponse of the resource
+        """
+        return cls.get(resource_name, language, encode_response, function, *args, **kwargs)
+
     @classmethod
     def set(cls, resource_name, language, value):
-        if resource_name not in GLApiCache.memory_cache_dict:
-            cls.memory_cache_dict[resource_name] = {}
+        cls.cache.set((resource_name, language), value)
+
+    @classmethod
+    def is_cached(cls, resource_name, language=None):
+        if language is not None:
+            return (resource_name, language) in cls.cache
 
-        cls.memory_cache_dict[resource_name][language] = value
+        return resource_name in cls._get_resource_names()
+
+    @classmethod
+    def _get_keys(cls):
+        keys = set(cls.cache.keys())
+        keys.update(cls.pending)
+        return keys
+
+    @classmethod
+    def _get_resource_names(cls):
+        return set(resource_name for resource_name, _ in cls._get_keys())
+
+    @classmethod
+    def _invalidate_key(cls, key):
+        cls.generations[key] = cls.generations.get(key, 0) + 1
+
+    @classmethod
+    def _invalidate_resource(cls, resource_name, language=None):
+        for key in cls._get_keys():
+            if key[0] == resource_name and (language is None or key[1] == language):
+                cls._invalidate_key(key)
+
+        cls._count(resource_name, 'invalidations')
+
+        if language is None:
+            cls.cache.delete_if(lambda key: key[0] == resource_name)
+        else:
+            cls.cache.delete((resource_name, language))
+
+        if resource_name in cls.warmup_functions:
+            cls.schedule_warm_up()
 
     @classmethod
     def invalidate(cls, resource_name=None):
@@ -31,6 +257,27 @@ class GLApiCache(object):
         invalidated, because the change is still effective
         """
         if resource_name is None:
-            cls.memory_cache_dict = {}
+            for key in cls._get_keys():
+                cls._invalidate_key(key)
+
+            for resource_name in cls._get_resource_names():
+                cls._count(resource_name, 'invalidations')
+
+            cls.cache.delete_if(lambda key: True)
+
+            cls.schedule_warm_up()
         else:
-            cls.memory_cache_dict.pop(resource_name, None)
+            cls._invalidate_resource(resource_name)
+
+    @classmethod
+    def invalidate_dependencies(cls, dependencies, language=None):
+        """
+        Invalidate only the resources depending on the given models/config
+        groups; if a language is specified only its version is invalidated.
+        """
+        dependencies = set(dependencies)
+
+        for resource_name in cls._get_resource_names():
+            if resource_name not in cls.dependencies or \
+                    cls.dependencies[resource_name] & dependencies:
+                cls._invalidate_resource(resource_name, language)
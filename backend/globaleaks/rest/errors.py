@@ -344,7 +344,21 @@ class SubmissionDisabled(GLException):
     status_code = 503  # Service not available
 
 
-# UNUSED ERROR CODE 53, 54, 55, 56, 57 HERE!
+class ServiceOverloaded(GLException):
+    """
+    The request has been rejected by the admission control
+    """
+    reason = "The service is overloaded, retry later"
+    error_code = 54
+    status_code = 503  # Service not available
+
+    def __init__(self, retry_after):
+        GLException.__init__(self)
+        self.retry_after = retry_after
+        self.arguments = [retry_after]
+
+
+# UNUSED ERROR CODE 55, 56, 57 HERE!
 
 
 class FieldIdNotFound(GLException):
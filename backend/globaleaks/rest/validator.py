@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+#  validator
+#  *********
+#
+# Compilation of the message templates of globaleaks.rest.requests into
+# validation functions.
+#
+# Each template is translated once into a tree of closures with the regular
+# expressions already compiled and with the set of the keys expected by each
+# dict, so that the validation of a message is a single pass over it without
+# interpreting the template again at every request.
+#
+# The accepted messages are the same accepted by BaseHandler.validate_jmessage:
+# the keys not present in the template are stripped from the message while
+# missing keys and values not matching the template raise InvalidInputFormat.
+import collections
+import re
+
+from globaleaks.rest import errors, requests
+from globaleaks.utils.utility import log
+
+
+def compile_python_type(python_type):
+    if python_type == requests.SkipSpecificValidation:
+        return lambda value: True
+
+    if python_type == int:
+        def validate(value):
+            if value is None:
+                return True
+
+            try:
+                int(value)
+                return True
+            except Exception:
+                return False
+
+    elif python_type == bool:
+        def validate(value):
+            return value is None or value == u'true' or value == u'false' or isinstance(value, bool)
+
+    else:
+        def validate(value):
+            return value is None or isinstance(value, python_type)
+
+    return validate
+
+
+def compile_regexp(regexp):
+    match = re.compile(regexp).match
+
+    def validate(value):
+        try:
+            value = unicode(value)
+        except Exception:
+            return False
+
+        return match(value) is not None
+
+    return validate
+
+
+def compile_list(template):
+    validate_item = compile_type(template[0])
+
+    def validate(value):
+        # an empty list is ok
+        if len(value) == 0:
+            return True
+
+        for item in value:
+            if not validate_item(item):
+                return False
+
+        return True
+
+    return validate
+
+
+def compile_dict(template):
+    keys = frozenset(template)
+    validators = [(key, compile_type(value)) for key, value in template.iteritems()]
+
+    def validate(message):
+        if not isinstance(message, dict):
+            raise errors.InvalidInputFormat("Expected a JSON object")
+
+        # strip whatever is not validated; the client sends automatically
+        # attributes like 'creation_date' that are not part of the requests
+        if len(message) != len(keys) or not keys.issuperset(message):
+            for key in message.viewkeys() - keys:
+                del message[key]
+
+        missing_keys = keys.difference(message)
+        if missing_keys:
+            missing_keys = ', '.join(missing_keys)
+            log.debug("Keys %s expected but missing!" % missing_keys)
+            raise errors.InvalidInputFormat("Missing key %s" % missing_keys)
+
+        for key, validate_value in validators:
+            if not validate_value(message[key]):
+                log.err("Received key %s: type validation fail" % key)
+                raise errors.InvalidInputFormat("Key (%s) type validation failure" % key)
+
+        return True
+
+    return validate
+
+
+def compile_type(template):
+    # if it's callable, than assumes is a primitive class
+    if callable(template):
+        return compile_python_type(template)
+    # value as "{foo:bar}"
+    elif isinstance(template, collections.Mapping):
+        return compile_dict(template)
+    # regexp
+    elif isinstance(template, str):
+        return compile_regexp(template)
+    # value as "[ type ]"
+    elif isinstance(template, collections.Iterable):
+        return compile_list(template)
+
+    raise AssertionError
+
+
+def compile_message_template(template):
+    """
+    Return a function validating a decoded JSON message against the
+    template; the function returns True or raises InvalidInputFormat.
+    """
+    if isinstance(template, dict):
+        return compile_dict(template)
+
+    if isinstance(template, list):
+        validate_items = compile_list(template)
+
+        def validate(message):
+            if not validate_items(message):
+                raise errors.InvalidInputFormat("Not every element in %s is %s" % (message, template[0]))
+
+            return True
+
+        return validate
+
+    raise errors.InvalidInputFormat("invalid json massage: expected dict or list")
+
+
+# id(template) -> (template, validator) of the templates defined in globaleaks.rest.requests
+compiled_templates = {}
+
+
+def get_validator(template):
+    """
+    Return the validator of the template, compiling it if the
+    template is not one of those defined in globaleaks.rest.requests
+    """
+    entry = compiled_templates.get(id(template))
+    if entry is not None and entry[0] is template:
+        return entry[1]
+
+    return compile_message_template(template)
+
+
+for _name, _template in vars(requests).items():
+    if not _name.startswith('_') and isinstance(_template, (dict, list)):
+        compiled_templates[id(_template)] = (_template, compile_message_template(_template))
@@ -11,6 +11,8 @@ from globaleaks.db import init_db, clean_untracked_files, \
 
 from globaleaks.jobs import jobs_list
 from globaleaks.jobs.base import GLJob, GLJobsMonitor
+from globaleaks.orm import shutdown_db
+from globaleaks.rest.apicache import GLApiCache
 
 from globaleaks.settings import GLSettings
 from globaleaks.utils.utility import log, datetime_now
@@ -49,6 +51,18 @@ class GlobaLeaksRunner(UnixApplicationRunner):
             GLSettings.orm_tp.start()
             self._reactor.addSystemEventTrigger('after', 'shutdown', GLSettings.orm_tp.stop)
 
+            GLSettings.orm_ro_tp.start()
+            self._reactor.addSystemEventTrigger('after', 'shutdown', GLSettings.orm_ro_tp.stop)
+
+            GLSettings.kdf_tp.start()
+            self._reactor.addSystemEventTrigger('after', 'shutdown', GLSettings.kdf_tp.stop)
+
+            GLSettings.pgp_tp.start()
+            self._reactor.addSystemEventTrigger('after', 'shutdown', GLSettings.pgp_tp.stop)
+
+            # registered after the thread pools so that it runs once they are stopped
+            self._reactor.addSystemEventTrigger('after', 'shutdown', shutdown_db)
+
             if GLSettings.initialize_db:
                 yield init_db()
 
@@ -58,6 +72,8 @@ class GlobaLeaksRunner(UnixApplicationRunner):
 
             self.start_asynchronous_jobs()
 
+            GLApiCache.schedule_warm_up()
+
         except Exception as excep:
             log.err("ERROR: Cannot start GlobaLeaks; please manually check the error.")
             log.err("EXCEPTION: %s" % excep)
@@ -12,6 +12,7 @@ import os
 import random
 import shutil
 import string
+import threading
 import time
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
@@ -20,6 +21,8 @@ from datetime import datetime
 from tempfile import _TemporaryFileWrapper
 
 import scrypt
+from twisted.internet import reactor
+from twisted.internet.threads import deferToThreadPool
 from globaleaks.rest import errors
 from globaleaks.settings import GLSettings
 from globaleaks.utils.utility import log
@@ -328,6 +331,25 @@ def check_password(guessed_password, salt, password_hash):
     return hash_password(guessed_password, salt) == password_hash
 
 
+def deferred_hash_password(password, salt):
+    """
+    Compute hash_password on the GLSettings.kdf_tp thread pool so that the
+    scrypt computation does not run within a transaction.
+
+    @return: a deferred firing with the hash
+    """
+    return deferToThreadPool(reactor, GLSettings.kdf_tp, hash_password, password, salt)
+
+
+def deferred_check_password(guessed_password, salt, password_hash):
+    """
+    Compute check_password on the GLSettings.kdf_tp thread pool
+
+    @return: a deferred firing with the result of the check
+    """
+    return deferToThreadPool(reactor, GLSettings.kdf_tp, check_password, guessed_password, salt, password_hash)
+
+
 def change_password(old_password_hash, old_password, new_password, salt):
     """
     @param old_password_hash: the stored password hash.
@@ -431,6 +453,119 @@ class GLBPGP(object):
             log.err("Unable to clean temporary PGP environment: %s: %s" % (self.gnupg.gnupghome, excep))
 
 
+class GLPGPKeyringClass(object):
+    """
+    Long lived GnuPG keyring keeping imported the public keys used for the
+    encryption of the files and of the notifications.
+
+    The keys are imported the first time they are used and imported again
+    only when the key associated to the fingerprint changes, so that each
+    encryption costs a single gpg invocation; the keys that are changed or
+    no longer used are deleted from the keyring.
+
+    The keyring is created in GLSettings.pgproot and it is recreated
+    empty the first time it is used by the process or if its
+    directory has been removed.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gnupg = None
+        self.keys = {}
+
+    def get_gnupg(self):
+        path = os.path.join(GLSettings.pgproot, 'keyring')
+
+        if self.gnupg is None or self.gnupg.gnupghome != path or not os.path.isdir(path):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+            os.makedirs(path, mode=0700)
+
+            self.gnupg = GPG(gnupghome=path, options=['--trust-model', 'always'])
+            self.gnupg.encoding = "UTF-8"
+            self.keys = {}
+
+        return self.gnupg
+
+    def import_key(self, key, key_fingerprint):
+        """
+        Import the key in the keyring unless it has been already imported
+
+        @return: the GPG object of the keyring
+        """
+        key_hash = sha256(key.encode('utf-8'))
+
+        with self.lock:
+            gnupg = self.get_gnupg()
+
+            if self.keys.get(key_fingerprint) != key_hash:
+                # the previous version of the key (e.g. with a different
+                # expiration or set of subkeys) would be merged with the new one
+                self._delete_key(gnupg, key_fingerprint)
+
+                try:
+                    import_result = gnupg.import_keys(key)
+                except Exception as excep:
+                    log.err("Error in PGP import_keys: %s" % excep)
+                    raise errors.PGPKeyInvalid
+
+                if key_fingerprint not in import_result.fingerprints:
+                    raise errors.PGPKeyInvalid
+
+                self.keys[key_fingerprint] = key_hash
+
+            return gnupg
+
+    def _delete_key(self, gnupg, key_fingerprint):
+        if self.keys.pop(key_fingerprint, None) is None:
+            return
+
+        try:
+            gnupg.delete_keys(str(key_fingerprint))
+        except Exception as excep:
+            log.err("Error in PGP delete_keys: %s" % excep)
+
+    def remove_key(self, key_fingerprint):
+        """
+        Delete the key with the specified fingerprint from the keyring
+        """
+        if not key_fingerprint:
+            return
+
+        with self.lock:
+            if self.gnupg is not None:
+                self._delete_key(self.gnupg, key_fingerprint)
+
+    def encrypt_file(self, key, key_fingerprint, input_file, output_path):
+        """
+        Encrypt a file with the specified PGP key
+        """
+        gnupg = self.import_key(key, key_fingerprint)
+
+        encrypted_obj = gnupg.encrypt_file(input_file, str(key_fingerprint), output=output_path)
+
+        if not encrypted_obj.ok:
+            raise errors.PGPKeyInvalid
+
+        return encrypted_obj, os.stat(output_path).st_size
+
+    def encrypt_message(self, key, key_fingerprint, plaintext):
+        """
+        Encrypt a text message with the specified PGP key
+        """
+        gnupg = self.import_key(key, key_fingerprint)
+
+        encrypted_obj = gnupg.encrypt(plaintext, str(key_fingerprint))
+
+        if not encrypted_obj.ok:
+            raise errors.PGPKeyInvalid
+
+        return str(encrypted_obj)
+
+
+GLPGPKeyring = GLPGPKeyringClass()
+
+
 def parse_pgp_key(key):
     """
     Used for parsing a PGP key
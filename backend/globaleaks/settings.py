@@ -7,6 +7,7 @@ import getpass
 import glob
 import grp
 import logging
+import multiprocessing
 import os
 import pwd
 import re
@@ -67,6 +68,39 @@ class GLSettingsClass(object):
         # thread pool size of 1
         self.orm_tp = ThreadPool(1, 1)
 
+        # thread pool used by read-only transactions that run concurrently
+        self.orm_ro_tp = ThreadPool(1, 8)
+
+        # thread pool used to compute the scrypt hashes of the passwords
+        # and of the receipts outside of the transactions; its size limits
+        # the CPU and the memory used by concurrent authentications
+        self.kdf_tp = ThreadPool(1, 2)
+
+        # thread pool used by the delivery to process the files concurrently;
+        # each thread decrypts a file and drives the gpg processes encrypting
+        # it for the receivers. the pool and the number of gpg processes
+        # running at the same time are sized by the number of CPUs
+        self.pgp_concurrency = multiprocessing.cpu_count()
+        self.pgp_tp = ThreadPool(1, self.pgp_concurrency)
+
+        # maximum age in seconds of the connections kept open by the ORM store
+        # pool (0 disables pooling)
+        self.orm_connection_max_age = 1800
+
+        # transactions lasting more than this number of seconds
+        # (queue and lock waits included) are logged
+        self.orm_slow_transaction_threshold = 1
+
+        # SQL statements lasting more than this number of seconds are logged
+        self.orm_slow_query_threshold = 0.5
+
+        # admission control of the requests (see globaleaks.utils.admission)
+        self.admission_slots = 16
+        self.admission_reserved_slots = 4
+        self.admission_low_priority_slots = 2
+        self.admission_queue_size = 64
+        self.admission_retry_after = 30
+
         self.bind_addresses = '127.0.0.1'
 
         # bind port
@@ -157,6 +191,9 @@ class GLSettingsClass(object):
         self.disable_swap = False
         self.skip_wizard = False
         self.log_timing_stats = False
+        self.api_cache_warmup = True
+        self.metrics_enabled = False
+        self.metrics_port = None
 
         # Number of failed login enough to generate an alarm
         self.failed_login_alarm = 5
@@ -176,6 +213,16 @@ class GLSettingsClass(object):
         # size used while streaming files
         self.file_chunk_size = 65535 # 1MB
 
+        # static files up to this size are served from memory
+        self.static_file_memory_limit = 4 * 1024 * 1024 # 4MB
+
+        # number of localized archived questionnaire schemas kept in memory
+        self.archived_schema_cache_size = 256
+
+        # limits of the number of entries and of the memory used by the API cache
+        self.api_cache_size_limit = 1024
+        self.api_cache_bytes_limit = 64 * 1024 * 1024 # 64MB
+
         self.AES_key_size = 32
         self.AES_key_id_regexp = u'[A-Za-z0-9]{16}'
         self.AES_counter_nonce = 128 / 8
@@ -220,7 +267,7 @@ class GLSettingsClass(object):
         self.db_schema = os.path.join(self.static_db_source, 'sqlite.sql')
         self.db_file_name = 'glbackend-%d.db' % DATABASE_VERSION
         self.db_file_path = os.path.join(os.path.abspath(os.path.join(self.db_path, self.db_file_name)))
-        self.db_uri = self.make_db_uri(self.db_file_path)
+        self.db_uri = self.make_db_uri(self.db_file_path) + '&journal_mode=WAL'
 
         self.logfile = os.path.abspath(os.path.join(self.log_path, 'globaleaks.log'))
         self.httplogfile = os.path.abspath(os.path.join(self.log_path, "http.log"))
@@ -305,6 +352,15 @@ class GLSettingsClass(object):
             quit(-1)
         self.bind_port = self.cmdline_options.port
 
+        if self.cmdline_options.metrics_port is not None and \
+                not self.validate_port(self.cmdline_options.metrics_port):
+            quit(-1)
+        self.metrics_port = self.cmdline_options.metrics_port
+        self.metrics_enabled = self.cmdline_options.enable_metrics or self.metrics_port is not None
+
+        self.orm_slow_transaction_threshold = self.cmdline_options.orm_slow_transaction_threshold
+        self.orm_slow_query_threshold = self.cmdline_options.orm_slow_query_threshold
+
         self.accepted_hosts = list(set(self.bind_addresses + \
                                    self.cmdline_options.host_list.replace(" ", "").split(",")))
 
@@ -362,6 +418,8 @@ class GLSettingsClass(object):
 
         self.skip_wizard = self.cmdline_options.skip_wizard
 
+        self.api_cache_warmup = not self.cmdline_options.disable_cache_warmup
+
         self.api_prefix = self.cmdline_options.api_prefix
 
         if self.cmdline_options.client_path:
@@ -18,6 +18,11 @@ class TestReceiversCollection(helpers.TestHandlerWithPopulatedDB):
 
         self.assertEqual(len(self.responses[0]), 2)
 
+    @inlineCallbacks
+    def test_get_query_budget(self):
+        handler = self.request(role='admin')
+        yield self.assert_query_budget(10, handler.get)
+
 
 class TestReceiverInstance(helpers.TestHandlerWithPopulatedDB):
     _handler = receiver.ReceiverInstance
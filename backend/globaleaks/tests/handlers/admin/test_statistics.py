@@ -2,10 +2,12 @@
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks import anomaly
-from globaleaks.orm import transact
+from globaleaks.orm import transact, transaction_stats
 from globaleaks.handlers.admin import statistics
+from globaleaks.handlers.submission import archived_schema_cache
 from globaleaks.jobs.statistics_sched import AnomaliesSchedule, StatisticsSchedule
 from globaleaks.models import Stats
+from globaleaks.rest.apicache import GLApiCache
 from globaleaks.tests import helpers
 from globaleaks.tests.test_anomaly import pollute_events_for_testing, \
     pollute_events_for_testing_and_perform_synthesis
@@ -121,3 +123,52 @@ class TestRecentEventsCollection(helpers.TestHandler):
 
         for k in anomaly.ANOMALY_MAP.keys():
             self.assertTrue(k in self.responses[1])
+
+
+class TestCacheStatsCollection(helpers.TestHandler):
+    _handler = statistics.CacheStatsCollection
+
+    @inlineCallbacks
+    def test_get(self):
+        yield GLApiCache.get("passante_di_professione", "it", lambda: "come una catapulta!")
+
+        handler = self.request({}, role='admin')
+        yield handler.get()
+
+        self.assertTrue(self.responses[0]['api']['cache']['size'] >= 1)
+        self.assertTrue('passante_di_professione' in self.responses[0]['api']['resources'])
+        self.assertTrue('hit_rate' in self.responses[0]['archived_schemas'])
+
+    @inlineCallbacks
+    def test_delete(self):
+        yield GLApiCache.get("passante_di_professione", "it", lambda: "come una catapulta!")
+        archived_schema_cache.get('unexistent')
+
+        handler = self.request({}, role='admin')
+        yield handler.delete()
+
+        self.assertEqual(GLApiCache.stats()['resources'], {})
+        self.assertEqual(archived_schema_cache.stats()['misses'], 0)
+
+
+class TestTransactionStatsCollection(helpers.TestHandler):
+    _handler = statistics.TransactionStatsCollection
+
+    @inlineCallbacks
+    def test_get(self):
+        yield statistics.get_anomaly_history(limit=1)
+
+        handler = self.request({}, role='admin')
+        yield handler.get()
+
+        names = [t['name'] for t in self.responses[0]['transactions']]
+        self.assertTrue('handlers.admin.statistics.get_anomaly_history' in names)
+
+    @inlineCallbacks
+    def test_delete(self):
+        yield statistics.get_anomaly_history(limit=1)
+
+        handler = self.request({}, role='admin')
+        yield handler.delete()
+
+        self.assertEqual(transaction_stats.stats()['transactions'], [])
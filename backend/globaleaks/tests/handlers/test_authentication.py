@@ -79,6 +79,17 @@ class TestAuthentication(helpers.TestHandlerWithPopulatedDB):
 
         yield self.assertFailure(handler.post(), errors.InvalidAuthentication)
 
+    @inlineCallbacks
+    def test_login_with_outdated_credentials(self):
+        user_id, salt, password_hash = yield authentication.get_user_credentials(u'admin')
+
+        # the password changed after the check of the credentials
+        yield self.assertFailure(authentication.db_login(user_id, u'outdated', False),
+                                 errors.InvalidAuthentication)
+
+        ret = yield authentication.db_login(user_id, password_hash, False)
+        self.assertEqual(ret[0], user_id)
+
     @inlineCallbacks
     def test_failed_login_counter(self):
         handler = self.request({
@@ -1,12 +1,20 @@
 # -*- coding: utf-8 -*-
 import json
-from twisted.internet.defer import inlineCallbacks
-
-from cyclone.web import HTTPError, HTTPAuthenticationRequired
-from globaleaks.handlers.base import GLSession, GLSessions, BaseHandler, BaseStaticFileHandler, TimingStatsHandler
-from globaleaks.rest.errors import InvalidInputFormat
+import os
+from twisted.internet.defer import inlineCallbacks, returnValue
+from twisted.internet.error import ConnectionDone
+from twisted.python.failure import Failure
+from twisted.test import proto_helpers
+
+from cyclone.web import Application, HTTPError, HTTPAuthenticationRequired
+from globaleaks.handlers.base import accepts_encoding, parse_range_header, GLHTTPConnection, StaticFileProducer, GLSession, GLSessions, GLUploads, BaseHandler, BaseStaticFileHandler, TimingStatsHandler
+from globaleaks.rest.errors import InvalidInputFormat, NotAuthenticated, ServiceOverloaded
 from globaleaks.settings import GLSettings
 from globaleaks.tests import helpers
+from globaleaks.tests.utils.test_multipart import BOUNDARY, multipart_body
+from globaleaks.utils import admission
+from globaleaks.utils.admission import admission_control
+from globaleaks.utils.timingstats import timing_stats
 
 
 FUTURE = 100
@@ -49,10 +57,14 @@ class TestBaseHandler(helpers.TestHandlerWithPopulatedDB):
 
     @inlineCallbacks
     def test_base_handler_on_finish(self):
+        timing_stats.reset()
+
         handler = self.request({})
         yield handler.get_unauthenticated()
         handler.on_finish()
 
+        self.assertEqual(timing_stats.get_histogram('BaseHandlerMock', 'MOCK', 200).count, 1)
+
     @inlineCallbacks
     def test_basic_auth_on_and_valid_authentication(self):
         GLSettings.memory_copy.basic_auth = True
@@ -174,6 +186,77 @@ class TestBaseHandler(helpers.TestHandlerWithPopulatedDB):
         self.assertFalse(BaseHandler.validate_host("invalid.onion"))
         self.assertFalse(BaseHandler.validate_host("invalid.onion:12345"))  # gabanbus i miss you!
 
+    def test_write_error_service_overloaded(self):
+        handler = self.request()
+        handler.write_error(503, exception=ServiceOverloaded(30))
+
+        self.assertEqual(handler.get_status(), 503)
+        self.assertEqual(handler._headers['Retry-After'], '30')
+        self.assertEqual(self.responses[0]['error_code'], ServiceOverloaded.error_code)
+
+
+class TestAdmissionRelease(helpers.TestHandler):
+    _handler = BaseHandlerMock
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestHandler.setUp(self)
+        self.active = admission_control.stats()[admission.LOW]['active']
+
+    @inlineCallbacks
+    def admitted_request(self):
+        handler = self.request()
+        handler.admission_priority = admission.LOW
+        yield admission_control.acquire(admission.LOW)
+        handler.admitted = True
+        self.assertEqual(admission_control.stats()[admission.LOW]['active'], self.active + 1)
+        returnValue(handler)
+
+    @inlineCallbacks
+    def test_aborted_download_releases_admission_slot(self):
+        handler = yield self.admitted_request()
+
+        # the slot is released once the file starts to be streamed
+        handler.write_file(__file__)
+        self.assertEqual(admission_control.stats()[admission.LOW]['active'], self.active)
+
+        # the client disconnects in the middle of the transfer
+        producer = handler.request.connection.transport.producer
+        producer.stopProducing()
+        handler.on_connection_close()
+        self.assertEqual(admission_control.stats()[admission.LOW]['active'], self.active)
+
+    @inlineCallbacks
+    def test_aborted_producer_releases_admission_slot(self):
+        handler = yield self.admitted_request()
+
+        StaticFileProducer(handler, open(__file__, 'rb')).stopProducing()
+        self.assertEqual(admission_control.stats()[admission.LOW]['active'], self.active)
+
+    @inlineCallbacks
+    def test_connection_close_releases_admission_slot(self):
+        handler = yield self.admitted_request()
+
+        handler.on_connection_close()
+        handler.on_finish()
+        self.assertEqual(admission_control.stats()[admission.LOW]['active'], self.active)
+
+
+    def test_connection_close_cancels_queued_request(self):
+        # every low priority slot is busy
+        self.patch(GLSettings, 'admission_low_priority_slots', self.active)
+        queued = admission_control.stats()[admission.LOW]['queued']
+
+        handler = self.request()
+        handler.admission_priority = admission.LOW
+        handler._execute_handler(None, [], {})
+        self.assertEqual(admission_control.stats()[admission.LOW]['queued'], queued + 1)
+
+        # the client disconnects while the request is waiting
+        handler.request.connection.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(admission_control.stats()[admission.LOW]['queued'], queued)
+        self.assertEqual(admission_control.stats()[admission.LOW]['active'], self.active)
+
 
 class TestBaseStaticFileHandler(helpers.TestHandler):
     _handler = BaseStaticFileHandler
@@ -188,6 +271,71 @@ class TestBaseStaticFileHandler(helpers.TestHandler):
         handler = self.request(kwargs={'path': GLSettings.client_path})
         self.assertRaises(HTTPError, handler.get, 'unexistent')
 
+    def create_file(self, name, content):
+        with open(os.path.join(self.static_path, name), 'wb') as f:
+            f.write(content)
+
+    @inlineCallbacks
+    def test_get_not_modified(self):
+        self.static_path = self.mktemp()
+        os.mkdir(self.static_path)
+        self.create_file('antani.js', 'var antani;')
+
+        handler = self.request(kwargs={'path': self.static_path})
+        yield handler.get('antani.js')
+        self.assertEqual(self.responses[0], 'var antani;')
+        self.assertEqual(handler._headers['Cache-Control'], 'no-cache, must-revalidate')
+
+        handler = self.request(kwargs={'path': self.static_path},
+                               headers={'If-None-Match': handler._headers['Etag']})
+        yield handler.get('antani.js')
+        self.assertEqual(handler.get_status(), 304)
+
+        handler = self.request(kwargs={'path': self.static_path},
+                               headers={'If-Modified-Since': handler._headers['Last-Modified']})
+        yield handler.get('antani.js')
+        self.assertEqual(handler.get_status(), 304)
+
+        self.assertEqual(len(self.responses), 1)
+
+    @inlineCallbacks
+    def test_get_gzip_sibling(self):
+        self.static_path = self.mktemp()
+        os.mkdir(self.static_path)
+        self.create_file('antani.3f2a1b9c.js', 'var antani;')
+        self.create_file('antani.3f2a1b9c.js.gz', 'gzipped antani')
+
+        handler = self.request(kwargs={'path': self.static_path},
+                               headers={'Accept-Encoding': 'gzip, deflate'})
+        yield handler.get('antani.3f2a1b9c.js')
+
+        self.assertEqual(self.responses[0], 'gzipped antani')
+        self.assertEqual(handler._headers['Content-Encoding'], 'gzip')
+        self.assertEqual(handler._headers['Cache-Control'], 'public, max-age=31536000')
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+
+        handler = self.request(kwargs={'path': self.static_path},
+                               headers={'Accept-Encoding': 'gzip, deflate',
+                                        'If-None-Match': handler._headers['Etag']})
+        yield handler.get('antani.3f2a1b9c.js')
+
+        self.assertEqual(handler.get_status(), 304)
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+
+        handler = self.request(kwargs={'path': self.static_path})
+        yield handler.get('antani.3f2a1b9c.js')
+
+        self.assertEqual(self.responses[1], 'var antani;')
+        self.assertNotIn('Content-Encoding', handler._headers)
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+
+        handler = self.request(kwargs={'path': self.static_path},
+                               headers={'Accept-Encoding': 'gzip;q=0, deflate'})
+        yield handler.get('antani.3f2a1b9c.js')
+
+        self.assertEqual(self.responses[2], 'var antani;')
+        self.assertNotIn('Content-Encoding', handler._headers)
+
 
 class TestTimingStats(helpers.TestHandler):
     _handler = TimingStatsHandler
@@ -195,66 +343,125 @@ class TestTimingStats(helpers.TestHandler):
     @inlineCallbacks
     def setUp(self):
         yield super(TestTimingStats, self).setUp()
-        TimingStatsHandler.TimingsTracker = []
+        timing_stats.reset()
 
-    @inlineCallbacks
-    def test_get_feature_disabled(self):
+    def tearDown(self):
         GLSettings.log_timing_stats = False
+        return super(TestTimingStats, self).tearDown()
 
-        TimingStatsHandler.log_measured_timing("JOB", "Session Management", 1443252274.44, 0)
-        TimingStatsHandler.log_measured_timing("GET", "/styles/main.css", 1443252277.68, 0)
+    @inlineCallbacks
+    def test_get(self):
+        for run_time in [0.001, 0.002, 0.003, 1]:
+            timing_stats.record('/token', 'POST', 201, run_time)
 
-        handler = self.request()
+        timing_stats.record('Delivery', 'JOB', 'success', 0.5)
 
+        handler = self.request(role='admin')
         yield handler.get()
 
-        splits = self.responses[0].split("\n")
-
-        self.assertEqual(len(splits), 2)
+        timings = self.responses[0]['timings']
+        self.assertEqual(len(timings), 2)
+        self.assertEqual(timings[0]['route'], '/token')
+        self.assertEqual(timings[0]['count'], 4)
+        self.assertTrue(2 <= timings[0]['p50'] <= 2.4)
+        self.assertEqual(timings[0]['p99'], 1000)
+        self.assertEqual(timings[0]['max'], 1000)
+        self.assertEqual(timings[1]['route'], 'Delivery')
+        self.assertEqual(timings[1]['status'], 'success')
+
+    def test_get_unauthenticated(self):
+        handler = self.request()
 
-        self.assertEqual(splits[0], "category,method,uri,start_time,run_time")
-        self.assertEqual(splits[1], "")
+        self.assertRaises(NotAuthenticated, handler.get)
 
     @inlineCallbacks
-    def test_get_feature_enabled(self):
+    def test_get_unauthenticated_with_request_stats(self):
         GLSettings.log_timing_stats = True
 
-        TimingStatsHandler.log_measured_timing("JOB", "Session Management", 1443252274.44, 0)
-        TimingStatsHandler.log_measured_timing("GET", "/styles/main.css", 1443252277.68, 0)
-        TimingStatsHandler.log_measured_timing("JOB", "Delivery", 1443252279.0, 0)
-        TimingStatsHandler.log_measured_timing("POST", "/token", 1443252280.0, 0)
-        TimingStatsHandler.log_measured_timing("PUT", "/submission/XXA82cSXFHTOoVroWlOGqg2VF8XtJQ57QIYM09YanY", 1443252281.0, 0)
-        TimingStatsHandler.log_measured_timing("POST", "/wbtip/comments", 1443252282.0, 0)
         handler = self.request()
-
         yield handler.get()
 
-        splits = self.responses[0].split("\n")
+        self.assertEqual(self.responses[0]['timings'], [])
 
-        self.assertEqual(len(splits), 8)
+    @inlineCallbacks
+    def test_delete(self):
+        timing_stats.record('/token', 'POST', 201, 0.001)
 
-        self.assertEqual(splits[0], "category,method,uri,start_time,run_time")
-        self.assertEqual(splits[1], "uncategorized,JOB,Session Management,1443252274.44,0")
-        self.assertEqual(splits[2], "uncategorized,GET,/styles/main.css,1443252277.68,0")
-        self.assertEqual(splits[3], "delivery,JOB,Delivery,1443252279.0,0")
-        self.assertEqual(splits[4], "token,POST,/token,1443252280.0,0")
-        self.assertEqual(splits[5], "submission,PUT,/submission/XXA82cSXFHTOoVroWlOGqg2VF8XtJQ57QIYM09YanY,1443252281.0,0")
-        self.assertEqual(splits[6], "comment,POST,/wbtip/comments,1443252282.0,0")
-        self.assertEqual(splits[7], "")
+        handler = self.request(role='admin')
+        yield handler.delete()
 
-    @inlineCallbacks
-    def test_get_feature_enabled_discard_timingstatss_handler_logging(self):
-        GLSettings.log_timing_stats = True
+        self.assertEqual(timing_stats.stats()['timings'], [])
 
-        TimingStatsHandler.log_measured_timing("GET", "/s/timings", 1443252274.44, 0)
 
-        handler = self.request()
+class TestAcceptsEncoding(helpers.TestGL):
+    def test_accepts_encoding(self):
+        self.assertTrue(accepts_encoding('gzip, deflate', 'gzip'))
+        self.assertTrue(accepts_encoding('deflate, GZIP;q=0.5', 'gzip'))
+        self.assertTrue(accepts_encoding('*', 'gzip'))
+        self.assertFalse(accepts_encoding(None, 'gzip'))
+        self.assertFalse(accepts_encoding('deflate', 'gzip'))
+        self.assertFalse(accepts_encoding('gzip;q=0', 'gzip'))
+        self.assertFalse(accepts_encoding('gzip; q=0.0, *', 'gzip'))
+        self.assertFalse(accepts_encoding('*;q=0', 'gzip'))
+        self.assertFalse(accepts_encoding('x-gzip', 'gzip'))
 
-        yield handler.get()
 
-        splits = self.responses[0].split("\n")
+class TestParseRangeHeader(helpers.TestGL):
+    def test_parse_range_header(self):
+        self.assertEqual(parse_range_header('bytes=0-499'), (0, 499))
+        self.assertEqual(parse_range_header('bytes=500-'), (500, None))
+        self.assertEqual(parse_range_header('bytes=-500'), (None, 500))
+        self.assertIsNone(parse_range_header(None))
+        self.assertIsNone(parse_range_header('bytes=0-1,5-6'))
+        self.assertIsNone(parse_range_header('bytes=10-5'))
+        self.assertIsNone(parse_range_header('items=0-5'))
+        self.assertIsNone(parse_range_header('bytes=a-b'))
+
+
+class TestGLHTTPConnection(helpers.TestGL):
+    def test_multipart_upload_is_streamed(self):
+        requests = []
+
+        connection = GLHTTPConnection()
+        connection.factory = Application([])
+        connection.makeConnection(proto_helpers.StringTransport())
+        connection.request_callback = requests.append
+
+        content = os.urandom(500000)
+        body = multipart_body([('flowIdentifier', 'abc')], 'antani.txt', content)
+
+        connection.dataReceived('POST /wbtip/upload HTTP/1.1\r\n'
+                                'Content-Type: multipart/form-data; boundary=%s\r\n'
+                                'Content-Length: %d\r\n\r\n' % (BOUNDARY, len(body)))
+
+        for i in range(0, len(body), 65536):
+            connection.dataReceived(body[i:i + 65536])
+
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(requests[0].body, '')
+        self.assertEqual(requests[0].arguments['flowIdentifier'], ['abc'])
+        self.assertEqual(requests[0].files['file'][0]['body_len'], len(content))
+        self.assertEqual(requests[0].files['file'][0]['body'].read(), content)
+
+    def test_close_file_uploads(self):
+        requests = []
+
+        connection = GLHTTPConnection()
+        connection.factory = Application([])
+        connection.makeConnection(proto_helpers.StringTransport())
+        connection.request_callback = requests.append
+
+        body = multipart_body([('flowIdentifier', 'abc')], 'antani.txt', os.urandom(1000))
+
+        connection.dataReceived('POST /wbtip/upload HTTP/1.1\r\n'
+                                'Content-Type: multipart/form-data; boundary=%s\r\n'
+                                'Content-Length: %d\r\n\r\n%s' % (BOUNDARY, len(body), body))
+
+        f = requests[0].files['file'][0]['body']
+        GLUploads['abc'] = f
 
-        self.assertEqual(len(splits), 2)
+        handler = BaseHandler(connection.factory, requests[0])
+        handler.close_file_uploads()
 
-        self.assertEqual(splits[0], "category,method,uri,start_time,run_time")
-        self.assertEqual(splits[1], "")
+        self.assertNotIn('abc', GLUploads)
+        self.assertFalse(os.path.exists(f.filepath))
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
+from twisted.internet import defer, task
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks.orm import transact
+from globaleaks.rest import apicache
 from globaleaks.rest.apicache import GLApiCache
+from globaleaks.settings import GLSettings
 from globaleaks.tests import helpers
 
 
@@ -12,6 +15,7 @@ class TestGLApiCache(helpers.TestGL):
         yield helpers.TestGL.setUp(self)
 
         GLApiCache.invalidate()
+        GLApiCache.reset_stats()
 
     @staticmethod
     @transact
@@ -20,31 +24,187 @@ class TestGLApiCache(helpers.TestGL):
 
     @inlineCallbacks
     def test_get(self):
-        self.assertTrue("passante_di_professione" not in GLApiCache.memory_cache_dict)
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione"))
         pdp_it = yield GLApiCache.get("passante_di_professione", "it", self.mario, "come", "una", "catapulta!")
         pdp_en = yield GLApiCache.get("passante_di_professione", "en", self.mario, "like", "a", "catapult!")
-        self.assertTrue("passante_di_professione" in GLApiCache.memory_cache_dict)
-        self.assertTrue("it" in GLApiCache.memory_cache_dict['passante_di_professione'])
-        self.assertTrue("en" in GLApiCache.memory_cache_dict['passante_di_professione'])
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione"))
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione", "it"))
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione", "en"))
         self.assertEqual(pdp_it, "come una catapulta!")
         self.assertEqual(pdp_en, "like a catapult!")
 
     @inlineCallbacks
     def test_set(self):
-        self.assertTrue("passante_di_professione" not in GLApiCache.memory_cache_dict)
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione"))
         pdp_it = yield GLApiCache.get("passante_di_professione", "it", self.mario, "come", "una", "catapulta!")
-        self.assertTrue("passante_di_professione" in GLApiCache.memory_cache_dict)
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione"))
         self.assertTrue(pdp_it == "come una catapulta!")
         yield GLApiCache.set("passante_di_professione", "it", "ma io ho visto tutto!")
-        self.assertTrue("passante_di_professione" in GLApiCache.memory_cache_dict)
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione"))
         pdp_it = yield GLApiCache.get("passante_di_professione", "it", self.mario, "already", "cached")
         self.assertEqual(pdp_it, "ma io ho visto tutto!")
 
     @inlineCallbacks
     def test_invalidate(self):
-        self.assertTrue("passante_di_professione" not in GLApiCache.memory_cache_dict)
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione"))
         pdp_it = yield GLApiCache.get("passante_di_professione", "it", self.mario, "come", "una", "catapulta!")
-        self.assertTrue("passante_di_professione" in GLApiCache.memory_cache_dict)
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione"))
         self.assertEqual(pdp_it, "come una catapulta!")
         yield GLApiCache.invalidate("passante_di_professione")
-        self.assertTrue("passante_di_professione" not in GLApiCache.memory_cache_dict)
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione"))
+
+    @inlineCallbacks
+    def test_invalidate_dependencies(self):
+        GLApiCache.register("scugnizzo", ["context"])
+        GLApiCache.register("guaglione", ["node"])
+
+        yield GLApiCache.get("scugnizzo", "it", self.mario, "come", "una", "catapulta!")
+        yield GLApiCache.get("scugnizzo", "en", self.mario, "like", "a", "catapult!")
+        yield GLApiCache.get("guaglione", "it", self.mario, "come", "una", "catapulta!")
+
+        GLApiCache.invalidate_dependencies(["context"], "it")
+        self.assertFalse(GLApiCache.is_cached("scugnizzo", "it"))
+        self.assertTrue(GLApiCache.is_cached("scugnizzo", "en"))
+        self.assertTrue(GLApiCache.is_cached("guaglione"))
+
+        GLApiCache.invalidate_dependencies(["context"])
+        self.assertFalse(GLApiCache.is_cached("scugnizzo"))
+        self.assertTrue(GLApiCache.is_cached("guaglione"))
+
+    def test_single_flight(self):
+        calls = []
+        d = defer.Deferred()
+
+        def function():
+            calls.append(1)
+            return d
+
+        d1 = GLApiCache.get("passante_di_professione", "it", function)
+        d2 = GLApiCache.get("passante_di_professione", "it", function)
+
+        d.callback("come una catapulta!")
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.successResultOf(d1), "come una catapulta!")
+        self.assertEqual(self.successResultOf(d2), "come una catapulta!")
+
+    def test_invalidate_while_pending(self):
+        d = defer.Deferred()
+
+        GLApiCache.get("passante_di_professione", "it", lambda: d)
+        GLApiCache.invalidate("passante_di_professione")
+        d.callback("ma io ho visto tutto!")
+
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione"))
+
+    def test_invalidate_other_language_while_pending(self):
+        GLApiCache.register("scugnizzo", ["context"])
+
+        d = defer.Deferred()
+
+        GLApiCache.get("scugnizzo", "it", lambda: d)
+        GLApiCache.invalidate_dependencies(["context"], "en")
+        d.callback("come una catapulta!")
+
+        self.assertTrue(GLApiCache.is_cached("scugnizzo", "it"))
+
+        d = defer.Deferred()
+
+        GLApiCache.get("scugnizzo", "en", lambda: d)
+        GLApiCache.invalidate_dependencies(["context"], "en")
+        d.callback("like a catapult!")
+
+        self.assertFalse(GLApiCache.is_cached("scugnizzo", "en"))
+
+    def test_join_after_invalidation(self):
+        results = [defer.Deferred(), defer.Deferred()]
+        calls = []
+
+        def function():
+            calls.append(1)
+            return results[len(calls) - 1]
+
+        d1 = GLApiCache.get("passante_di_professione", "it", function)
+        d2 = GLApiCache.get("passante_di_professione", "it", function)
+        GLApiCache.invalidate("passante_di_professione")
+        d3 = GLApiCache.get("passante_di_professione", "it", function)
+        d4 = GLApiCache.get("passante_di_professione", "it", function)
+
+        results[0].callback("come una catapulta!")
+
+        self.assertEqual(self.successResultOf(d1), "come una catapulta!")
+        self.assertEqual(self.successResultOf(d2), "come una catapulta!")
+        self.assertNoResult(d3)
+        self.assertNoResult(d4)
+        self.assertEqual(len(calls), 2)
+
+        results[1].callback("ma io ho visto tutto!")
+
+        self.assertEqual(self.successResultOf(d3), "ma io ho visto tutto!")
+        self.assertEqual(self.successResultOf(d4), "ma io ho visto tutto!")
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione", "it"))
+
+    @inlineCallbacks
+    def test_warm_up(self):
+        GLApiCache.register("scugnizzo", ["context"], lambda language: defer.succeed({'language': language}))
+        self.addCleanup(GLApiCache.warmup_functions.pop, "scugnizzo")
+
+        yield GLApiCache.warm_up(['it', 'en'])
+
+        self.assertTrue(GLApiCache.is_cached("scugnizzo", "it"))
+        self.assertTrue(GLApiCache.is_cached("scugnizzo", "en"))
+
+    def test_warm_up_after_invalidate_dependencies(self):
+        clock = task.Clock()
+        self.patch(apicache, 'reactor', clock)
+        self.patch(GLSettings, 'api_cache_warmup', True)
+        self.patch(GLApiCache, 'warmup_functions', {})
+
+        GLApiCache.register("scugnizzo", ["context"], lambda language: defer.succeed({'language': language}))
+        GLApiCache.register("guaglione", ["node"])
+
+        self.successResultOf(GLApiCache.warm_up(['it', 'en']))
+
+        GLApiCache.invalidate_dependencies(["node"])
+        self.assertEqual(clock.getDelayedCalls(), [])
+
+        GLApiCache.invalidate_dependencies(["context"], "it")
+        GLApiCache.invalidate_dependencies(["context"])
+        self.assertFalse(GLApiCache.is_cached("scugnizzo"))
+        self.assertEqual(len(clock.getDelayedCalls()), 1)
+
+        clock.advance(0)
+
+        for language in GLSettings.memory_copy.languages_enabled:
+            self.assertTrue(GLApiCache.is_cached("scugnizzo", language))
+
+    @inlineCallbacks
+    def test_eviction(self):
+        self.patch(GLApiCache.cache, 'size_limit', 2)
+
+        yield GLApiCache.get("passante_di_professione", "it", self.mario, "come", "una", "catapulta!")
+        yield GLApiCache.get("passante_di_professione", "en", self.mario, "like", "a", "catapult!")
+        yield GLApiCache.get("passante_di_professione", "it", self.mario, "come", "una", "catapulta!")
+        yield GLApiCache.get("scugnizzo", "it", self.mario, "come", "una", "catapulta!")
+
+        # the least recently used language is evicted
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione", "it"))
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione", "en"))
+        self.assertTrue(GLApiCache.is_cached("scugnizzo", "it"))
+
+        stats = GLApiCache.stats()
+        self.assertEqual(stats['cache']['size'], 2)
+        self.assertEqual(stats['resources']['passante_di_professione']['hits'], 1)
+        self.assertEqual(stats['resources']['passante_di_professione']['misses'], 2)
+        self.assertEqual(stats['resources']['passante_di_professione']['evictions'], 1)
+
+    @inlineCallbacks
+    def test_bytes_limit(self):
+        self.patch(GLApiCache.cache, 'bytes_limit', 30)
+
+        yield GLApiCache.get("passante_di_professione", "it", self.mario, "come", "una", "catapulta!")
+        yield GLApiCache.get("passante_di_professione", "en", self.mario, "like", "a", "catapult!")
+
+        self.assertFalse(GLApiCache.is_cached("passante_di_professione", "it"))
+        self.assertTrue(GLApiCache.is_cached("passante_di_professione", "en"))
+        self.assertTrue(GLApiCache.cache.bytes <= 30)
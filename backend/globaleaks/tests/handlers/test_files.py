@@ -3,11 +3,14 @@ import os
 
 from twisted.internet.defer import inlineCallbacks
 
+from globaleaks import models
 from globaleaks.jobs.delivery_sched import DeliverySchedule
 from globaleaks.handlers import files
+from globaleaks.orm import transact
 from globaleaks.rest import errors
 from globaleaks.tests import helpers
 from globaleaks.utils import token
+from globaleaks.utils.signals import job_signals, DELIVERY
 
 
 class TestFileInstance(helpers.TestHandlerWithPopulatedDB):
@@ -64,6 +67,21 @@ class TestFileAdd(helpers.TestHandlerWithPopulatedDB):
             handler = self.request(role='whistleblower', user_id = wbtip_desc['id'])
             yield handler.post()
 
+    @inlineCallbacks
+    def test_post_wakes_up_the_delivery(self):
+        yield self.perform_full_submission_actions()
+
+        calls = []
+        callback = lambda: calls.append(1)
+        job_signals.connect(DELIVERY, callback)
+        self.addCleanup(job_signals.disconnect, DELIVERY, callback)
+
+        wbtip_desc = (yield self.get_wbtips())[0]
+        handler = self.request(role='whistleblower', user_id=wbtip_desc['id'])
+        yield handler.post()
+
+        self.assertEqual(len(calls), 1)
+
 
 class TestDownload(helpers.TestHandlerWithPopulatedDB):
     _handler = files.Download
@@ -79,3 +97,57 @@ class TestDownload(helpers.TestHandlerWithPopulatedDB):
             for rfile_desc in rfiles_desc:
                 handler = self.request(role='receiver', user_id = rtip_desc['receiver_id'])
                 yield handler.get(rtip_desc['id'], rfile_desc['id'])
+
+    @transact
+    def get_downloads_count(self, store, rfile_id):
+        return store.find(models.ReceiverFile, models.ReceiverFile.id == rfile_id).one().downloads
+
+    @inlineCallbacks
+    def test_get_range(self):
+        yield self.perform_full_submission_actions()
+        yield DeliverySchedule().run()
+
+        rtip_desc = (yield self.get_rtips())[0]
+        rfile_desc = (yield self.get_rfiles(rtip_desc['id']))[0]
+
+        handler = self.request(role='receiver', user_id=rtip_desc['receiver_id'])
+        yield handler.get(rtip_desc['id'], rfile_desc['id'])
+        self.assertEqual(handler.get_status(), 200)
+        self.assertEqual(handler._headers['Accept-Ranges'], 'bytes')
+        size = int(handler._headers['Content-Length'])
+
+        handler = self.request(role='receiver', user_id=rtip_desc['receiver_id'],
+                               headers={'Range': 'bytes=10-'})
+        yield handler.get(rtip_desc['id'], rfile_desc['id'])
+        self.assertEqual(handler.get_status(), 206)
+        self.assertEqual(handler._headers['Content-Range'], 'bytes 10-%d/%d' % (size - 1, size))
+        self.assertEqual(int(handler._headers['Content-Length']), size - 10)
+
+        # the resumed download is not counted
+        self.assertEqual((yield self.get_downloads_count(rfile_desc['id'])), 1)
+
+        handler = self.request(role='receiver', user_id=rtip_desc['receiver_id'],
+                               headers={'Range': 'bytes=%d-' % size})
+        yield handler.get(rtip_desc['id'], rfile_desc['id'])
+        self.assertEqual(handler.get_status(), 416)
+        self.assertEqual(handler._headers['Content-Range'], 'bytes */%d' % size)
+
+        handler = self.request(role='receiver', user_id=rtip_desc['receiver_id'],
+                               headers={'Range': 'bytes=10-', 'If-Range': '"outdated"'})
+        yield handler.get(rtip_desc['id'], rfile_desc['id'])
+        self.assertEqual(handler.get_status(), 200)
+
+        # the whole file served because of the If-Range mismatch is counted
+        self.assertEqual((yield self.get_downloads_count(rfile_desc['id'])), 2)
+
+        handler = self.request(role='receiver', user_id=rtip_desc['receiver_id'],
+                               headers={'Range': 'bytes=-1'})
+        yield handler.get(rtip_desc['id'], rfile_desc['id'])
+        self.assertEqual(handler.get_status(), 206)
+        self.assertEqual((yield self.get_downloads_count(rfile_desc['id'])), 2)
+
+        handler = self.request(role='receiver', user_id=rtip_desc['receiver_id'],
+                               headers={'Range': 'bytes=-%d' % size})
+        yield handler.get(rtip_desc['id'], rfile_desc['id'])
+        self.assertEqual(handler.get_status(), 206)
+        self.assertEqual((yield self.get_downloads_count(rfile_desc['id'])), 3)
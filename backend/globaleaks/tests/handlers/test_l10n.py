@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import json
+import zlib
+
 from twisted.internet.defer import inlineCallbacks
 
 from globaleaks.handlers import l10n
@@ -20,7 +23,7 @@ class TestL10NHandler(helpers.TestHandler):
 
         yield handler.get(lang=u'en')
 
-        self.assertNotIn('12345', self.responses[0])
+        self.assertNotIn('12345', json.loads(self.responses[0]))
 
         yield admin_l10n.update_custom_texts(u'en', custom_texts)
 
@@ -28,5 +31,22 @@ class TestL10NHandler(helpers.TestHandler):
 
         yield handler.get(lang=u'en')
 
-        self.assertIn('12345', self.responses[1])
-        self.assertEqual('54321', self.responses[1]['12345'])
+        self.assertIn('12345', json.loads(self.responses[1]))
+        self.assertEqual('54321', json.loads(self.responses[1])['12345'])
+
+    @inlineCallbacks
+    def test_get_gzip(self):
+        handler = self.request(headers={'Accept-Encoding': 'gzip, deflate'})
+        handler.request.version = 'HTTP/1.1'
+        yield handler.get(lang=u'en')
+
+        self.assertEqual(handler._headers['Content-Encoding'], 'gzip')
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+
+        handler = self.request(headers={'Accept-Encoding': 'gzip;q=0, deflate'})
+        handler.request.version = 'HTTP/1.1'
+        yield handler.get(lang=u'en')
+
+        self.assertNotIn('Content-Encoding', handler._headers)
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(self.responses[1]), json.loads(zlib.decompress(self.responses[0], 16 + zlib.MAX_WBITS)))
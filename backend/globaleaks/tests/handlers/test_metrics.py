@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from cyclone.web import HTTPError
+from twisted.internet.defer import inlineCallbacks
+
+from globaleaks.handlers import metrics
+from globaleaks.rest.errors import NotAuthenticated
+from globaleaks.settings import GLSettings
+from globaleaks.tests import helpers
+from globaleaks.utils.timingstats import timing_stats
+
+
+class TestMetricsHandler(helpers.TestHandlerWithPopulatedDB):
+    _handler = metrics.MetricsHandler
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestHandlerWithPopulatedDB.setUp(self)
+        GLSettings.metrics_enabled = True
+
+    def tearDown(self):
+        GLSettings.metrics_enabled = False
+        return helpers.TestHandlerWithPopulatedDB.tearDown(self)
+
+    def parse(self, text):
+        samples = {}
+        for line in text.splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+
+        return samples
+
+    @inlineCallbacks
+    def test_get(self):
+        timing_stats.reset()
+        timing_stats.record('/token', 'POST', 201, 0.01)
+
+        handler = self.request(role='admin')
+        yield handler.get()
+
+        samples = self.parse(self.responses[0])
+
+        self.assertEqual(samples['globaleaks_http_request_duration_seconds_count{route="/token",method="POST",status="201"}'], 1)
+        self.assertEqual(samples['globaleaks_delivery_backlog_files'], 0)
+        self.assertEqual(samples['globaleaks_alarm_stress_level{type="activity"}'], 0)
+        self.assertTrue(samples['globaleaks_orm_transaction_duration_seconds_count{pool="orm_tp"}'] > 0)
+        self.assertIn('globaleaks_api_cache_hit_ratio', samples)
+        self.assertIn('globaleaks_sessions', samples)
+        self.assertIn('globaleaks_admission_rejected_requests_total{priority="low"}', samples)
+
+    def test_get_unauthenticated(self):
+        handler = self.request()
+
+        self.assertRaises(NotAuthenticated, handler.get)
+
+    @inlineCallbacks
+    def test_get_localhost_listener(self):
+        handler = self.request(kwargs={'localhost_listener': True})
+        yield handler.get()
+
+        self.assertIn('globaleaks_mail_queue_length', self.parse(self.responses[0]))
+
+    def test_get_disabled(self):
+        GLSettings.metrics_enabled = False
+
+        handler = self.request(role='admin')
+
+        self.assertRaises(HTTPError, handler.get)
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 import json
+import zlib
 
 from twisted.internet.defer import inlineCallbacks
+from globaleaks import models
+from globaleaks.orm import transact
 from globaleaks.rest import requests
 from globaleaks.tests import helpers
 from globaleaks.handlers import admin, public
@@ -18,4 +21,80 @@ class TestPublicResource(helpers.TestHandlerWithPopulatedDB):
         yield handler.get()
 
         resp_desc = self.ss_serial_desc(config.NodeFactory.public_node, requests.PublicResourcesDesc)
-        self._handler.validate_message(json.dumps(self.responses[0]), resp_desc)
+        self._handler.validate_message(self.responses[0], resp_desc)
+
+    @inlineCallbacks
+    def test_get_gzip(self):
+        handler = self.request()
+        yield handler.get()
+
+        handler = self.request(headers={'Accept-Encoding': 'gzip, deflate'})
+        handler.request.version = 'HTTP/1.1'
+        yield handler.get()
+
+        self.assertEqual(handler._headers['Content-Encoding'], 'gzip')
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(zlib.decompress(self.responses[1], 16 + zlib.MAX_WBITS), self.responses[0])
+
+        handler = self.request(headers={'Accept-Encoding': 'gzip;q=0, deflate'})
+        handler.request.version = 'HTTP/1.1'
+        yield handler.get()
+
+        self.assertNotIn('Content-Encoding', handler._headers)
+        self.assertEqual(handler._headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(self.responses[2], self.responses[0])
+
+    @inlineCallbacks
+    def test_get_not_modified(self):
+        handler = self.request()
+        yield handler.get()
+        etag = handler._headers['Etag']
+
+        handler = self.request(headers={'If-None-Match': etag})
+        yield handler.get()
+
+        self.assertEqual(handler.get_status(), 304)
+        self.assertEqual(len(self.responses), 1)
+
+
+class TestQuestionnaireSerialization(helpers.TestGLWithPopulatedDB):
+    # queries of the transaction serializing a questionnaire, whatever
+    # the number of its fields
+    serialization_query_budget = 18
+
+    @transact
+    def serialize_questionnaire(self, store):
+        questionnaire = store.find(models.Questionnaire, models.Questionnaire.key == u'default').one()
+        # reset the store cache so that the questionnaire tree is loaded from scratch
+        store.invalidate()
+
+        public.serialize_questionnaire(store, questionnaire, 'en')
+
+    @transact
+    def add_fields(self, store, n):
+        step = store.find(models.Step).any()
+        template = store.find(models.Field, models.Field.instance == u'template').any()
+
+        def new_field(**kwargs):
+            field = models.Field()
+            field.label = field.description = field.hint = field.multi_entry_hint = {'en': u''}
+            for k, v in kwargs.iteritems():
+                setattr(field, k, v)
+            store.add(field)
+            return field
+
+        for i in range(n):
+            group = new_field(type=u'fieldgroup', step_id=step.id)
+            child = new_field(type=u'selectbox', fieldgroup_id=group.id)
+            new_field(instance=u'reference', fieldgroup_id=group.id, template_id=template.id)
+
+            store.add(models.FieldOption({'field_id': child.id, 'label': {'en': u'option'}}))
+            store.add(models.FieldAttr({'field_id': child.id, 'name': u'min_len', 'type': u'int', 'value': u'0'}))
+
+    @inlineCallbacks
+    def test_serialize_questionnaire_query_count(self):
+        yield self.add_fields(1)
+        yield self.assert_query_budget(self.serialization_query_budget, self.serialize_questionnaire)
+
+        yield self.add_fields(10)
+        yield self.assert_query_budget(self.serialization_query_budget, self.serialize_questionnaire)
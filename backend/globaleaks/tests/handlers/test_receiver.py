@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from twisted.internet.defer import inlineCallbacks
 
+from globaleaks import models
 from globaleaks.handlers import receiver, admin
+from globaleaks.orm import transact
+from globaleaks.rest import errors
 from globaleaks.tests import helpers
 
 
@@ -39,6 +42,74 @@ class TestTipsCollection(helpers.TestHandlerWithPopulatedDB):
         handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
         yield handler.get()
 
+    @transact
+    def get_rtip_ids_by_creation(self, store, receiver_id):
+        rtips = store.find(models.ReceiverTip,
+                           models.ReceiverTip.receiver_id == receiver_id,
+                           models.ReceiverTip.internaltip_id == models.InternalTip.id)
+
+        return [rtip.id for rtip in rtips.order_by(models.InternalTip.creation_date, models.ReceiverTip.id)]
+
+    @inlineCallbacks
+    def test_get_default_order(self):
+        yield self.perform_full_submission_actions()
+
+        handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+        yield handler.get()
+
+        ids = yield self.get_rtip_ids_by_creation(self.dummyReceiver_1['id'])
+
+        self.assertEqual([rtip['id'] for rtip in self.responses[-1]], ids)
+
+    @transact
+    def count_internalfiles(self, store, rtip_id):
+        rtip = store.find(models.ReceiverTip, models.ReceiverTip.id == rtip_id).one()
+        return rtip.internaltip.internalfiles.count()
+
+    @inlineCallbacks
+    def test_get_counters(self):
+        rtips = yield receiver.get_receivertip_list(self.dummyReceiver_1['id'], 'en')
+        rtips_desc = yield self.get_rtips()
+        rtips_desc = dict((rtip_desc['id'], rtip_desc) for rtip_desc in rtips_desc)
+
+        for rtip in rtips:
+            self.assertEqual(rtip['comment_counter'], len(rtips_desc[rtip['id']]['comments']))
+            self.assertEqual(rtip['message_counter'], len(rtips_desc[rtip['id']]['messages']))
+            file_counter = yield self.count_internalfiles(rtip['id'])
+            self.assertEqual(rtip['file_counter'], file_counter)
+
+    @inlineCallbacks
+    def test_get_paginated(self):
+        for _ in xrange(2):
+            yield self.perform_full_submission_actions()
+
+        rtips = yield receiver.get_receivertip_list(self.dummyReceiver_1['id'], 'en', u'progressive', u'asc')
+
+        ids = []
+        cursor = None
+        while True:
+            handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+            handler.request.arguments = {'sort': ['progressive'], 'order': ['asc'], 'limit': ['2']}
+            if cursor is not None:
+                handler.request.arguments['cursor'] = [cursor]
+
+            yield handler.get()
+
+            page = self.responses[-1]
+            self.assertTrue(len(page) <= 2)
+            ids.extend([rtip['id'] for rtip in page])
+
+            cursor = handler._headers.get('X-Next-Cursor')
+            if cursor is None:
+                break
+
+        self.assertEqual(ids, [rtip['id'] for rtip in rtips])
+
+    def test_get_invalid_sort_key(self):
+        handler = self.request(user_id=self.dummyReceiver_1['id'], role='receiver')
+        handler.request.arguments = {'sort': ['preview']}
+        return self.assertFailure(handler.get(), errors.InvalidInputFormat)
+
 
 class TestTipsOperations(helpers.TestHandlerWithPopulatedDB):
     _handler = receiver.TipsOperations
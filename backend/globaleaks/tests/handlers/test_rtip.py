@@ -2,10 +2,12 @@
 import json
 
 from twisted.internet.defer import inlineCallbacks
+from globaleaks import models
+from globaleaks.orm import transact
 from globaleaks.jobs.delivery_sched import DeliverySchedule
 from globaleaks.rest import errors
 from globaleaks.tests import helpers
-from globaleaks.handlers import rtip
+from globaleaks.handlers import rtip, submission
 from globaleaks.settings import GLSettings
 
 
@@ -187,6 +189,91 @@ class TestRTipInstance(helpers.TestHandlerWithPopulatedDB):
             yield self.assertFailure(handler.delete("unexistent_tip"), errors.TipIdNotFound)
 
 
+class TestRTipSerialization(helpers.TestGLWithPopulatedDB):
+    # queries of the transaction serializing a tip, whatever the number
+    # of its files, comments and messages
+    serialization_query_budget = 20
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGLWithPopulatedDB.setUp(self)
+        yield self.perform_full_submission_actions()
+
+    @transact
+    def serialize_rtip(self, store):
+        rtip_obj = store.find(models.ReceiverTip).any()
+        # reset the store cache so that the rtip graph is loaded from scratch
+        store.invalidate()
+
+        rtip.serialize_rtip(store, rtip_obj, 'en')
+
+    @transact
+    def add_tip_elements(self, store, n):
+        for rtip_obj in store.find(models.ReceiverTip):
+            for _ in range(n):
+                internalfile = models.InternalFile()
+                internalfile.internaltip_id = rtip_obj.internaltip_id
+                internalfile.name = u'file.txt'
+                internalfile.file_path = internalfile.id
+                internalfile.content_type = u'text/plain'
+                internalfile.size = 0
+                store.add(internalfile)
+
+                receiverfile = models.ReceiverFile()
+                receiverfile.internalfile_id = internalfile.id
+                receiverfile.receivertip_id = rtip_obj.id
+                receiverfile.file_path = receiverfile.id
+                receiverfile.size = 0
+                receiverfile.status = u'reference'
+                store.add(receiverfile)
+
+                comment = models.Comment()
+                comment.content = u'comment'
+                comment.internaltip_id = rtip_obj.internaltip_id
+                comment.author_id = rtip_obj.receiver_id
+                comment.type = u'receiver'
+                store.add(comment)
+
+                message = models.Message()
+                message.content = u'message'
+                message.receivertip_id = rtip_obj.id
+                message.type = u'receiver'
+                store.add(message)
+
+    @inlineCallbacks
+    def test_serialize_rtip_query_count_is_constant(self):
+        yield self.assert_query_budget(self.serialization_query_budget, self.serialize_rtip)
+
+        yield self.add_tip_elements(10)
+
+        yield self.assert_query_budget(self.serialization_query_budget, self.serialize_rtip)
+
+    @transact
+    def delete_itips(self, store):
+        hashes = set()
+        for itip in store.find(models.InternalTip):
+            hashes.add(itip.questionnaire_hash)
+            rtip.db_delete_itip(store, itip)
+
+        return hashes
+
+    @inlineCallbacks
+    def test_archived_schema_cache(self):
+        cache = submission.archived_schema_cache
+        cache.clear()
+
+        yield self.get_rtips()
+        misses = cache.misses
+
+        yield self.get_rtips()
+        self.assertEqual(cache.misses, misses)
+        self.assertTrue(cache.hits > 0)
+
+        hashes = yield self.delete_itips()
+        for key in cache.items:
+            self.assertFalse(key[0] in hashes)
+
+
 class TestRTipCommentCollection(helpers.TestHandlerWithPopulatedDB):
     _handler = rtip.RTipCommentCollection
 
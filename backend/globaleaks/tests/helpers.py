@@ -25,8 +25,8 @@ from storm.twisted.testing import FakeThreadPool
 from globaleaks import db, models, security, event, runner, jobs
 from globaleaks.anomaly import Alarm
 from globaleaks.db.appdata import load_appdata
-from globaleaks.orm import transact
-from globaleaks.handlers import files, rtip, wbtip
+from globaleaks.orm import transact, store_pool
+from globaleaks.handlers import files, rtip, wbtip, submission
 from globaleaks.handlers.base import GLHTTPConnection, BaseHandler, GLSessions, GLSession
 from globaleaks.handlers.admin.context import create_context, \
     get_context, db_get_context_steps
@@ -40,6 +40,7 @@ from globaleaks.rest.apicache import GLApiCache
 from globaleaks.settings import GLSettings
 from globaleaks.security import GLSecureTemporaryFile
 from globaleaks.utils import tempdict, token, utility
+from globaleaks.utils.sqltracer import QueryStats, call_with_query_stats
 from globaleaks.utils.structures import fill_localized_keys
 from globaleaks.utils.utility import datetime_null, datetime_now, datetime_to_ISO8601, \
     log, sum_dicts
@@ -87,13 +88,18 @@ def init_glsettings_for_unit_tests():
     GLSettings.set_devel_mode()
     GLSettings.logging = None
     GLSettings.failed_login_attempts = 0
+    GLSettings.api_cache_warmup = False
     GLSettings.working_path = './working_path'
     GLSettings.ramdisk_path = os.path.join(GLSettings.working_path, 'ramdisk')
 
     GLSettings.eval_paths()
+    store_pool.clear()
     GLSettings.remove_directories()
     GLSettings.create_directories()
     GLSettings.orm_tp = FakeThreadPool()
+    GLSettings.orm_ro_tp = FakeThreadPool()
+    GLSettings.kdf_tp = FakeThreadPool()
+    GLSettings.pgp_tp = FakeThreadPool()
 
     GLSessions.clear()
 
@@ -219,6 +225,7 @@ class TestGL(unittest.TestCase):
 
         Alarm.reset()
         event.EventTrackQueue.clear()
+        submission.archived_schema_cache.clear()
         jobs.statistics_sched.StatisticsSchedule.reset()
 
         self.internationalized_text = load_appdata()['node']['whistleblowing_button']
@@ -418,6 +425,23 @@ class TestGL(unittest.TestCase):
         msg = 'The following model has been found on the store: {} {}'.format(id_args, id_kwargs)
         self.assertFalse(existing, msg)
 
+    @inlineCallbacks
+    def assert_query_budget(self, budget, function, *args, **kwargs):
+        """
+        Call function and fail if the transactions it executes run more
+        than budget SQL statements; used to catch N+1 query regressions.
+        """
+        name = function.name if isinstance(function, transact) else function.__name__
+
+        query_stats = QueryStats(name)
+
+        ret = yield call_with_query_stats(query_stats, defer.maybeDeferred, function, *args, **kwargs)
+
+        msg = '{} executed {} queries exceeding the budget of {}'.format(name, query_stats.count, budget)
+        self.assertTrue(query_stats.count <= budget, msg)
+
+        defer.returnValue(ret)
+
     @transact
     def get_rtips(self, store):
         ret = []
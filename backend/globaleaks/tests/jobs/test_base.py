@@ -4,15 +4,24 @@ from twisted.internet.defer import inlineCallbacks, Deferred
 from globaleaks.tests import helpers
 
 from globaleaks.jobs.base import GLJob
+from globaleaks.utils.signals import job_signals
 
 
 class GLJobX(GLJob):
     interval = 2
+    signals = ['test']
     operation_called = 0
 
     def run(self):
         self.operation_called += 1
 
+
+class GLJobY(GLJob):
+    operation_called = 0
+
+    def operation(self):
+        self.operation_called += 1
+
 class TestGLJob(helpers.TestGL):
     def test_base_scheduler(self):
         """
@@ -38,3 +47,55 @@ class TestGLJob(helpers.TestGL):
             self.assertEqual(job.operation_called, i)
 
         job.stop()
+
+    def test_wakeup(self):
+        job = GLJobX()
+
+        job.wakeup()
+        job.wakeup()
+
+        self.test_reactor.advance(job.signal_delay - 0.5)
+        self.assertEqual(job.operation_called, 0)
+
+        self.test_reactor.advance(0.5)
+        self.assertEqual(job.operation_called, 1)
+
+    def test_signals(self):
+        job = GLJobX()
+
+        job.schedule()
+
+        self.test_reactor.advance(1)
+        self.assertEqual(job.operation_called, 1)
+
+        job_signals.emit('test')
+
+        self.test_reactor.advance(job.signal_delay)
+        self.assertEqual(job.operation_called, 2)
+
+        job.stop()
+
+        job_signals.emit('test')
+
+        self.test_reactor.advance(job.signal_delay)
+        self.assertEqual(job.operation_called, 2)
+
+    @inlineCallbacks
+    def test_wakeup_while_executing(self):
+        job = GLJobY()
+
+        job.executing = True
+        job.wakeup()
+        self.assertEqual(job.wakeup_call, None)
+
+        # the runs overlapping a running one are skipped
+        yield job.run()
+        self.assertEqual(job.operation_called, 0)
+
+        job.executing = False
+        yield job.run()
+        self.assertEqual(job.operation_called, 1)
+
+        # the signal received while running causes a new run
+        self.assertTrue(job.wakeup_call.active())
+        job.wakeup_call.cancel()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import os
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.python.threadpool import ThreadPool
+
+from globaleaks import models
+from globaleaks.jobs import delivery_sched
+from globaleaks.jobs.delivery_sched import DeliverySchedule
+from globaleaks.orm import transact
+from globaleaks.security import GLBPGP, GLSecureFile
+from globaleaks.settings import GLSettings
+from globaleaks.tests import helpers
+
+
+@transact
+def get_internalfiles_count(store):
+    return store.find(models.InternalFile).count()
+
+
+@transact
+def get_receiverfiles(store):
+    return [(rfile.status, rfile.file_path) for rfile in store.find(models.ReceiverFile)]
+
+
+class TestDeliverySchedule(helpers.TestGLWithPopulatedDB):
+    encryption_scenario = 'ENCRYPTED'
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGLWithPopulatedDB.setUp(self)
+        yield self.perform_full_submission_actions()
+
+    @inlineCallbacks
+    def assert_files_encrypted(self):
+        rfiles = yield get_receiverfiles()
+
+        self.assertTrue(len(rfiles) > 0)
+
+        for status, file_path in rfiles:
+            self.assertEqual(status, u'encrypted')
+            self.assertTrue(os.path.exists(file_path))
+
+    @inlineCallbacks
+    def test_delivery_encrypted(self):
+        yield DeliverySchedule().run()
+
+        yield self.assert_files_encrypted()
+
+    @inlineCallbacks
+    def test_delivery_with_thread_pool(self):
+        GLSettings.pgp_tp = ThreadPool(1, 4)
+        GLSettings.pgp_tp.start()
+        self.addCleanup(GLSettings.pgp_tp.stop)
+
+        yield DeliverySchedule().run()
+
+        yield self.assert_files_encrypted()
+
+    @inlineCallbacks
+    def test_delivery_updates_each_file(self):
+        updates = []
+
+        update_receiverfile = delivery_sched.update_receiverfile
+
+        def mock_update_receiverfile(rfileinfo):
+            updates.append(rfileinfo['status'])
+            return update_receiverfile(rfileinfo)
+
+        self.patch(delivery_sched, 'update_receiverfile', mock_update_receiverfile)
+
+        yield DeliverySchedule().run()
+
+        rfiles = yield get_receiverfiles()
+
+        self.assertEqual(updates, [u'encrypted'] * len(rfiles))
+
+
+    @inlineCallbacks
+    def test_delivery_content(self):
+        yield DeliverySchedule().run()
+
+        pgpobj = GLBPGP()
+        self.addCleanup(pgpobj.destroy_environment)
+        pgpobj.load_key(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
+        pgpobj.load_key(helpers.PGPKEYS['VALID_PGP_KEY2_PRV'])
+
+        rfiles = yield get_receiverfiles()
+
+        for _, file_path in rfiles:
+            with open(file_path, 'r') as f:
+                self.assertEqual(str(pgpobj.gnupg.decrypt_file(f)), helpers.get_dummy_file()['body'].read())
+
+    @inlineCallbacks
+    def test_delivery_decrypts_each_file_once(self):
+        opened = []
+
+        class CountingSecureFile(GLSecureFile):
+            def __init__(self, filepath):
+                opened.append(filepath)
+                GLSecureFile.__init__(self, filepath)
+
+        self.patch(delivery_sched, 'GLSecureFile', CountingSecureFile)
+        self.patch(GLSettings, 'pgp_concurrency', 4)
+
+        count = yield get_internalfiles_count()
+
+        yield DeliverySchedule().run()
+
+        self.assertEqual(len(opened), count)
+        self.assertEqual(len(set(opened)), count)
+
+
+class TestDeliveryFanout(helpers.TestGL):
+    def test_fanout_is_bounded_by_encryption_slots(self):
+        batches = []
+
+        def mock_stream_ifile(ifile_path, ifile_size, plain_path, pgp_rfiles):
+            batches.append((plain_path, len(pgp_rfiles), delivery_sched.encryption_slots.used))
+            return [(rfileinfo, True, None) for rfileinfo in pgp_rfiles], plain_path is not None
+
+        self.patch(delivery_sched, 'fsops_stream_ifile', mock_stream_ifile)
+        self.patch(GLSettings, 'pgp_concurrency', 2)
+
+        encryptions, plaintext_created = delivery_sched.fsops_fanout_ifile('ifile', 0, 'plain', [{}] * 5)
+
+        self.assertEqual(len(encryptions), 5)
+        self.assertTrue(plaintext_created)
+        self.assertEqual(batches, [('plain', 2, 2), (None, 2, 2), (None, 1, 1)])
+        self.assertEqual(delivery_sched.encryption_slots.used, 0)
+
+    def test_fanout_without_sinks(self):
+        self.patch(delivery_sched, 'fsops_stream_ifile', None)
+
+        self.assertEqual(delivery_sched.fsops_fanout_ifile('ifile', 0, None, []), ([], False))
+
+
+class TestDeliveryScheduleNoKey(helpers.TestGLWithPopulatedDB):
+    encryption_scenario = 'PLAINTEXT'
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGLWithPopulatedDB.setUp(self)
+        yield self.perform_full_submission_actions()
+
+    @inlineCallbacks
+    def test_delivery_nokey(self):
+        opened = []
+
+        class CountingSecureFile(GLSecureFile):
+            def __init__(self, filepath):
+                opened.append(filepath)
+                GLSecureFile.__init__(self, filepath)
+
+        self.patch(delivery_sched, 'GLSecureFile', CountingSecureFile)
+        self.patch(GLSettings.memory_copy, 'allow_unencrypted', False)
+
+        yield DeliverySchedule().run()
+
+        rfiles = yield get_receiverfiles()
+
+        self.assertEqual(opened, [])
+        self.assertEqual(set(status for status, _ in rfiles), set([u'nokey']))
+        self.assertEqual(os.listdir(GLSettings.submission_path), [])
+
+
+class TestDeliveryScheduleExpiredKey(helpers.TestGLWithPopulatedDB):
+    encryption_scenario = 'ENCRYPTED_WITH_ONE_KEY_EXPIRED'
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGLWithPopulatedDB.setUp(self)
+        yield self.perform_full_submission_actions()
+
+    @inlineCallbacks
+    def test_delivery_expired_key(self):
+        yield DeliverySchedule().run()
+
+        rfiles = yield get_receiverfiles()
+
+        self.assertEqual(set(status for status, _ in rfiles), set([u'encrypted', u'unavailable']))
+
+
+class TestDeliveryScheduleMixed(helpers.TestGLWithPopulatedDB):
+    encryption_scenario = 'MIXED'
+
+    @inlineCallbacks
+    def setUp(self):
+        yield helpers.TestGLWithPopulatedDB.setUp(self)
+        yield self.perform_full_submission_actions()
+
+    @inlineCallbacks
+    def test_delivery_mixed(self):
+        yield DeliverySchedule().run()
+
+        rfiles = yield get_receiverfiles()
+
+        self.assertEqual(set(status for status, _ in rfiles), set([u'encrypted', u'reference']))
+
+        for _, file_path in rfiles:
+            self.assertTrue(os.path.exists(file_path))
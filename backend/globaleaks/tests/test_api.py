@@ -4,4 +4,8 @@ class TestAPI(TestGL):
     def test_api_factory(self):
         from globaleaks.rest import api
         api_factory = api.get_api_factory()
-        # TODO: write some tests againg the API factory
+
+        for _, specs in api_factory.handlers:
+            for spec in specs:
+                if spec.regex.pattern == '/x/timingstats$':
+                    self.assertEqual(spec.kwargs, {'route': '/x/timingstats'})
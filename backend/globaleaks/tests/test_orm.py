@@ -1,8 +1,12 @@
+import os
+
 from twisted.internet.defer import inlineCallbacks
 
+from globaleaks import orm
 from globaleaks.tests import helpers
 
-from globaleaks.orm import transact, get_store
+from globaleaks.orm import transact, transact_ro, get_store, store_pool, transaction_stats
+from globaleaks.settings import GLSettings
 from globaleaks.models import *
 from globaleaks.utils.utility import datetime_null
 
@@ -20,6 +24,7 @@ class TestORM(helpers.TestGL):
         self.assertEqual(store.execute("PRAGMA foreign_keys").get_one()[0], 1)  # ON
         self.assertEqual(store.execute("PRAGMA secure_delete").get_one()[0], 1) # ON
         self.assertEqual(store.execute("PRAGMA auto_vacuum").get_one()[0], 1)   # FULL
+        self.assertEqual(store.execute("PRAGMA journal_mode").get_one()[0], u'wal')
 
     def db_add_receiver(self, store):
         r = self.localization_set(self.dummyReceiver_1, Receiver, 'en')
@@ -45,6 +50,24 @@ class TestORM(helpers.TestGL):
 
         return receiver.id
 
+    @transact_ro
+    def _transact_ro_count_receivers(self, store):
+        return store.find(Receiver).count()
+
+    @transact_ro
+    def _transact_ro_with_write(self, store):
+        self.db_add_receiver(store)
+        store.flush()
+
+    @transact
+    def _transact_get_store(self, store):
+        return store
+
+    @transact
+    def _transact_get_store_with_exception(self, store):
+        self.failing_store = store
+        raise Exception
+
     @transact
     def _transact_with_success(self, store):
         self.db_add_receiver(store)
@@ -77,6 +100,28 @@ class TestORM(helpers.TestGL):
 
         self.assertEqual(count1, count2)
 
+    @inlineCallbacks
+    def test_transact_ro(self):
+        count1 = yield self._transact_ro_count_receivers()
+
+        yield self._transact_with_success()
+
+        count2 = yield self._transact_ro_count_receivers()
+
+        self.assertEqual(count1 + 1, count2)
+
+    @inlineCallbacks
+    def test_transact_ro_with_write(self):
+        store = get_store()
+        count1 = store.find(Receiver).count()
+
+        yield self.assertFailure(self._transact_ro_with_write(), Exception)
+
+        store = get_store()
+        count2 = store.find(Receiver).count()
+
+        self.assertEqual(count1, count2)
+
     @inlineCallbacks
     def test_transact_decorate_function(self):
         @transact
@@ -84,3 +129,95 @@ class TestORM(helpers.TestGL):
             self.assertTrue(getattr(store, 'find'))
 
         yield transaction()
+
+    @inlineCallbacks
+    def test_store_pool_reuse(self):
+        store1 = yield self._transact_get_store()
+        store2 = yield self._transact_get_store()
+        self.assertIs(store1, store2)
+
+        store_pool.clear()
+
+        store3 = yield self._transact_get_store()
+        self.assertIsNot(store1, store3)
+
+    @inlineCallbacks
+    def test_store_pool_reuse_after_exception(self):
+        yield self.assertFailure(self._transact_get_store_with_exception(), Exception)
+
+        store = yield self._transact_get_store()
+        self.assertIs(store, self.failing_store)
+
+    @inlineCallbacks
+    def test_store_pool_max_age(self):
+        max_age = GLSettings.orm_connection_max_age
+        GLSettings.orm_connection_max_age = 0
+
+        try:
+            store1 = yield self._transact_get_store()
+            store2 = yield self._transact_get_store()
+            self.assertIsNot(store1, store2)
+        finally:
+            GLSettings.orm_connection_max_age = max_age
+
+    @inlineCallbacks
+    def test_store_pool_health_check(self):
+        store1 = yield self._transact_get_store()
+        store1.close()
+
+        store2 = yield self._transact_get_store()
+        self.assertIsNot(store1, store2)
+
+    @inlineCallbacks
+    def test_shutdown_db(self):
+        store = yield self._transact_get_store()
+
+        orm.shutdown_db()
+
+        self.assertFalse(store_pool.stores)
+        self.assertFalse(store_pool._check_health(store))
+
+        wal_file = GLSettings.db_file_path + '-wal'
+        self.assertTrue(not os.path.exists(wal_file) or os.path.getsize(wal_file) == 0)
+
+        store = yield self._transact_get_store()
+        self.assertTrue(store_pool._check_health(store))
+
+    @inlineCallbacks
+    def test_transaction_stats(self):
+        transaction_stats.reset()
+
+        yield self._transact_with_success()
+        yield self.assertFailure(self._transact_with_exception(), Exception)
+        yield self._transact_ro_count_receivers()
+
+        histograms = transaction_stats.functions[('orm_tp', 'tests.test_orm._transact_with_success')]
+        self.assertEqual(sorted(histograms.keys()), ['commit', 'exec', 'lock', 'queue'])
+        self.assertEqual(histograms['exec'].count, 1)
+
+        histograms = transaction_stats.functions[('orm_tp', 'tests.test_orm._transact_with_exception')]
+        self.assertEqual(histograms['exec'].count, 1)
+
+        histograms = transaction_stats.functions[('orm_ro_tp', 'tests.test_orm._transact_ro_count_receivers')]
+        self.assertEqual(sorted(histograms.keys()), ['commit', 'exec', 'queue'])
+
+        self.assertEqual(transaction_stats.histograms['orm_tp']['duration'].count, 2)
+
+        stats = transaction_stats.stats()
+        self.assertEqual(len(stats['transactions']), 3)
+        self.assertTrue('p99' in stats['transactions'][0]['exec'])
+
+    @inlineCallbacks
+    def test_slow_transaction_log(self):
+        messages = []
+        self.patch(orm.log, 'info', lambda msg, *args, **kwargs: messages.append(msg))
+        self.patch(GLSettings, 'orm_slow_transaction_threshold', -1)
+
+        yield self._transact_with_success()
+
+        messages = [msg for msg in messages if msg.startswith('Slow transaction')]
+        self.assertEqual(len(messages), 1)
+        self.assertIn('tests.test_orm._transact_with_success on orm_tp', messages[0])
+        for phase in ['queue', 'lock', 'exec', 'commit']:
+            self.assertIn('%s: ' % phase, messages[0])
+        self.assertIn('queries: ', messages[0])
@@ -1,13 +1,16 @@
 import binascii
 import os
+import shutil
 from datetime import datetime
+from twisted.internet.defer import inlineCallbacks
 from twisted.trial import unittest
 
 import scrypt
 from globaleaks.rest import errors
 from globaleaks.security import generateRandomSalt, hash_password, check_password, change_password, \
+    deferred_hash_password, deferred_check_password, \
     directory_traversal_check, GLSecureTemporaryFile, GLSecureFile, \
-    GLBPGP
+    GLBPGP, GLPGPKeyringClass
 from globaleaks.settings import GLSettings
 from globaleaks.tests import helpers
 
@@ -34,6 +37,20 @@ class TestPasswordManagement(unittest.TestCase):
 
         self.assertTrue(check_password(dummy_password, dummy_salt, hashed_once))
 
+    @inlineCallbacks
+    def test_deferred_password_hashing(self):
+        dummy_password = "focaccina"
+        dummy_salt = generateRandomSalt()
+
+        hashed = yield deferred_hash_password(dummy_password, dummy_salt)
+        self.assertEqual(hashed, hash_password(dummy_password, dummy_salt))
+
+        valid = yield deferred_check_password(dummy_password, dummy_salt, hashed)
+        self.assertTrue(valid)
+
+        valid = yield deferred_check_password("focaccia", dummy_salt, hashed)
+        self.assertFalse(valid)
+
     def test_change_password(self):
         first_pass = helpers.VALID_PASSWORD1
         second_pass = helpers.VALID_PASSWORD2
@@ -175,3 +192,90 @@ class TestPGP(helpers.TestGL):
                          datetime.utcfromtimestamp(1391012793))
 
         pgpobj.destroy_environment()
+
+
+class TestPGPKeyring(helpers.TestGL):
+    secret_content = 'antani'
+
+    key_fingerprint = u'ECAF2235E78E71CD95365843C7B190543CAA7585'
+
+    def decrypt(self, encrypted_body):
+        pgpobj = GLBPGP()
+
+        try:
+            pgpobj.load_key(helpers.PGPKEYS['VALID_PGP_KEY1_PRV'])
+            return str(pgpobj.gnupg.decrypt(encrypted_body))
+        finally:
+            pgpobj.destroy_environment()
+
+    def test_encrypt_message(self):
+        keyring = GLPGPKeyringClass()
+
+        for _ in range(2):
+            encrypted_body = keyring.encrypt_message(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'],
+                                                     self.key_fingerprint,
+                                                     self.secret_content)
+
+            self.assertEqual(self.decrypt(encrypted_body), self.secret_content)
+
+        self.assertEqual(keyring.keys.keys(), [self.key_fingerprint])
+
+    def test_encrypt_file(self):
+        keyring = GLPGPKeyringClass()
+
+        file_src = os.path.join(GLSettings.working_path, 'test_plaintext_file.txt')
+        file_dst = os.path.join(GLSettings.working_path, 'test_encrypted_file.txt')
+
+        with open(file_src, 'w+') as f:
+            f.write(self.secret_content)
+            f.seek(0)
+
+            _, length = keyring.encrypt_file(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'],
+                                             self.key_fingerprint,
+                                             f, file_dst)
+
+        with open(file_dst, 'r') as f:
+            encrypted_body = f.read()
+
+        self.assertEqual(length, len(encrypted_body))
+        self.assertEqual(self.decrypt(encrypted_body), self.secret_content)
+
+    def test_key_not_matching_the_fingerprint(self):
+        keyring = GLPGPKeyringClass()
+
+        self.assertRaises(errors.PGPKeyInvalid, keyring.encrypt_message,
+                          helpers.PGPKEYS['VALID_PGP_KEY2_PUB'], self.key_fingerprint, self.secret_content)
+
+    def test_key_rotation(self):
+        keyring = GLPGPKeyringClass()
+        key2_fingerprint = u'CECDC5D2B721900E65639268846C82DB1F9B45E2'
+
+        keyring.encrypt_message(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'], self.key_fingerprint, self.secret_content)
+
+        # a new version of the key takes the place of the previous one
+        encrypted_body = keyring.encrypt_message(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'] + '\n',
+                                                 self.key_fingerprint,
+                                                 self.secret_content)
+
+        self.assertEqual(self.decrypt(encrypted_body), self.secret_content)
+        self.assertEqual([k['fingerprint'] for k in keyring.gnupg.list_keys()], [self.key_fingerprint])
+
+        # the key replaced by a different one is deleted
+        keyring.remove_key(self.key_fingerprint)
+        keyring.encrypt_message(helpers.PGPKEYS['VALID_PGP_KEY2_PUB'], key2_fingerprint, self.secret_content)
+
+        self.assertEqual([k['fingerprint'] for k in keyring.gnupg.list_keys()], [key2_fingerprint])
+        self.assertEqual(keyring.keys.keys(), [key2_fingerprint])
+
+    def test_keyring_removed(self):
+        keyring = GLPGPKeyringClass()
+
+        keyring.encrypt_message(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'], self.key_fingerprint, self.secret_content)
+
+        shutil.rmtree(keyring.gnupg.gnupghome)
+
+        encrypted_body = keyring.encrypt_message(helpers.PGPKEYS['VALID_PGP_KEY1_PUB'],
+                                                 self.key_fingerprint,
+                                                 self.secret_content)
+
+        self.assertEqual(self.decrypt(encrypted_body), self.secret_content)
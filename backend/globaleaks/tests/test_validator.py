@@ -0,0 +1,129 @@
+# -*- encoding: utf-8 -*-
+import copy
+import re
+
+from globaleaks.handlers.base import BaseHandler
+from globaleaks.rest import errors, requests
+from globaleaks.rest.validator import compiled_templates, get_validator
+from globaleaks.tests import helpers
+
+sample_strings = [
+    u'',
+    u'f3b1ca3a-a6cd-4bf5-a9a5-4e2fa7a3a8c2',
+    u'admin',
+    u'enabled',
+    u'antani@globaleaks.org',
+    u'http://aaaaaaaaaaaaaaaa.onion',
+    u'https://www.globaleaks.org',
+    u'homepage',
+    u'list',
+    u'postpone',
+    u'/s/antani',
+    u'/antani',
+    u'a' * 42,
+    u'submission',
+    u'instance',
+    u'inputbox',
+    u'unicode',
+    u'pending'
+]
+
+invalid_values = [None, 1, u'antani', u'true', True, [], {}, [1], [u'antani'], {u'antani': 1}]
+
+
+def sample_value(template):
+    """
+    Return a value matching the template
+    """
+    if template == requests.SkipSpecificValidation:
+        return u'antani'
+    elif template == int:
+        return 1
+    elif template == bool:
+        return True
+    elif template == unicode:
+        return u'antani'
+    elif template == dict:
+        return {}
+    elif template == list:
+        return []
+    elif isinstance(template, dict):
+        return dict((key, sample_value(value)) for key, value in template.iteritems())
+    elif isinstance(template, str):
+        for value in sample_strings:
+            if re.match(template, value):
+                return value
+    elif isinstance(template, list):
+        return [sample_value(template[0])]
+
+    raise AssertionError("No sample value for %s" % template)
+
+
+def interpret(message, template):
+    try:
+        BaseHandler.validate_jmessage(message, template)
+        return True, message
+    except errors.InvalidInputFormat:
+        return False, None
+    except (AttributeError, TypeError):
+        # the interpreted validation fails in this way on unexpected types
+        return False, None
+
+
+def compiled(message, template):
+    try:
+        get_validator(template)(message)
+        return True, message
+    except (errors.InvalidInputFormat, TypeError):
+        return False, None
+
+
+class TestValidator(helpers.TestGL):
+    def assertSameValidation(self, message, template):
+        self.assertEqual(interpret(copy.deepcopy(message), template),
+                         compiled(copy.deepcopy(message), template))
+
+    def test_templates_are_compiled(self):
+        for template in [requests.SubmissionDesc, requests.AdminContextDesc,
+                         requests.AdminContextDescRaw, requests.AdminNodeDesc,
+                         requests.TipsOverviewDesc, requests.WizardDesc]:
+            self.assertIs(compiled_templates[id(template)][0], template)
+            self.assertIs(get_validator(template), compiled_templates[id(template)][1])
+
+    def test_not_registered_template(self):
+        template = {'antani': int}
+
+        self.assertTrue(get_validator(template)({'antani': 1}))
+        self.assertRaises(errors.InvalidInputFormat, get_validator(template), {'antani': u'x'})
+
+    def test_strip_unknown_keys(self):
+        message = {'content': u'antani', 'creation_date': u'now', 'antani': {}}
+
+        self.assertTrue(get_validator(requests.CommentDesc)(message))
+        self.assertEqual(message, {'content': u'antani'})
+
+    def test_same_validation_of_requests(self):
+        for template, _ in compiled_templates.values():
+            valid_message = sample_value(template)
+            self.assertEqual(compiled(copy.deepcopy(valid_message), template)[0], True)
+            self.assertSameValidation(valid_message, template)
+
+            for value in invalid_values:
+                self.assertSameValidation(value, template)
+
+            if not isinstance(template, dict):
+                continue
+
+            message = copy.deepcopy(valid_message)
+            message['antani'] = 1
+            self.assertSameValidation(message, template)
+
+            for key in template:
+                message = copy.deepcopy(valid_message)
+                del message[key]
+                self.assertSameValidation(message, template)
+
+                for value in invalid_values:
+                    message = copy.deepcopy(valid_message)
+                    message[key] = value
+                    self.assertSameValidation(message, template)
@@ -0,0 +1,96 @@
+# -*- encoding: utf-8 -*-
+from globaleaks.anomaly import Alarm
+from globaleaks.rest import errors
+from globaleaks.settings import GLSettings
+from globaleaks.tests import helpers
+from globaleaks.utils.admission import AdmissionControl, HIGH, NORMAL, LOW
+
+
+class TestAdmissionControl(helpers.TestGL):
+    def setUp(self):
+        self.settings = (GLSettings.admission_slots,
+                         GLSettings.admission_reserved_slots,
+                         GLSettings.admission_low_priority_slots,
+                         GLSettings.admission_queue_size)
+
+        GLSettings.admission_slots = 4
+        GLSettings.admission_reserved_slots = 1
+        GLSettings.admission_low_priority_slots = 1
+        GLSettings.admission_queue_size = 1
+
+        self.admission_control = AdmissionControl()
+
+        return helpers.TestGL.setUp(self)
+
+    def tearDown(self):
+        (GLSettings.admission_slots,
+         GLSettings.admission_reserved_slots,
+         GLSettings.admission_low_priority_slots,
+         GLSettings.admission_queue_size) = self.settings
+
+        Alarm.reset()
+
+        return helpers.TestGL.tearDown(self)
+
+    def acquire(self, priority):
+        admitted = []
+        self.admission_control.acquire(priority).addCallbacks(admitted.append, admitted.append)
+        return admitted
+
+    def test_low_priority_limit(self):
+        self.assertEqual(self.acquire(LOW), [None])
+
+        queued = self.acquire(LOW)
+        self.assertEqual(queued, [])
+
+        rejected = self.acquire(LOW)
+        rejected[0].trap(errors.ServiceOverloaded)
+        self.assertEqual(rejected[0].value.retry_after, GLSettings.admission_retry_after)
+
+        self.admission_control.release(LOW)
+        self.assertEqual(queued, [None])
+
+        self.assertEqual(self.admission_control.stats()[LOW], {'active': 1, 'queued': 0, 'rejected': 1})
+
+    def test_cancel(self):
+        self.assertEqual(self.acquire(LOW), [None])
+
+        d = self.admission_control.acquire(LOW)
+        self.admission_control.cancel(LOW, d)
+        self.assertEqual(self.admission_control.stats()[LOW]['queued'], 0)
+
+        # the queue is free for another request
+        queued = self.acquire(LOW)
+        self.assertEqual(queued, [])
+
+        self.admission_control.release(LOW)
+        self.assertFalse(d.called)
+        self.assertEqual(queued, [None])
+
+    def test_reserved_slots(self):
+        for _ in range(3):
+            self.assertEqual(self.acquire(NORMAL), [None])
+
+        queued = self.acquire(NORMAL)
+        self.assertEqual(queued, [])
+
+        # the reserved slot is still available to the high priority requests
+        self.assertEqual(self.acquire(HIGH), [None])
+
+        queued_high = self.acquire(HIGH)
+        self.assertEqual(queued_high, [])
+
+        # the high priority requests are admitted first
+        self.admission_control.release(NORMAL)
+        self.assertEqual(queued_high, [None])
+        self.assertEqual(queued, [])
+
+        self.admission_control.release(HIGH)
+        self.admission_control.release(HIGH)
+        self.assertEqual(queued, [None])
+
+    def test_load_shedding(self):
+        Alarm.stress_levels['activity'] = 2
+
+        self.acquire(LOW)[0].trap(errors.ServiceOverloaded)
+        self.assertEqual(self.acquire(NORMAL), [None])
@@ -0,0 +1,45 @@
+# -*- encoding: utf-8 -*-
+from globaleaks.tests import helpers
+from globaleaks.utils import jsoncodec
+
+value = {
+    u'name': u'antani',
+    u'description': {u'en': u'</script>', u'it': u'perch\xe9'},
+    u'presentation_order': 3,
+    u'enabled': True,
+    u'receivers': [u'a', u'b'],
+    u'score': 0.5,
+    u'empty': None,
+    u'big': 2 ** 70
+}
+
+
+class TestJSONCodec(helpers.TestGL):
+    def tearDown(self):
+        jsoncodec.set_backend()
+        return helpers.TestGL.tearDown(self)
+
+    def _test_backend(self, backend):
+        jsoncodec.set_backend(backend)
+        self.assertEqual(jsoncodec.backend, backend)
+
+        encoded = jsoncodec.encode(value)
+        self.assertIsInstance(encoded, str)
+        self.assertNotIn('</', encoded)
+        self.assertEqual(jsoncodec.loads(encoded), value)
+
+        dumped = jsoncodec.dumps(value)
+        self.assertIsInstance(dumped, unicode)
+        self.assertIn(u'perch\xe9', dumped)
+        self.assertEqual(jsoncodec.loads(dumped), value)
+
+        self.assertRaises(ValueError, jsoncodec.loads, '{antani')
+
+    def test_json(self):
+        self._test_backend('json')
+
+    def test_ujson(self):
+        self._test_backend('ujson')
+
+    if 'ujson' not in jsoncodec.backends:
+        test_ujson.skip = "ujson is not installed"
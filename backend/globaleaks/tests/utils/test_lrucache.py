@@ -0,0 +1,62 @@
+from globaleaks.tests import helpers
+from globaleaks.utils.lrucache import LRUCache
+
+
+class TestLRUCache(helpers.TestGL):
+    def test_size_limit(self):
+        cache = LRUCache(3)
+
+        for x in range(5):
+            cache.set(x, x)
+
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.evictions, 2)
+        self.assertEqual(cache.get(0), None)
+        self.assertEqual(cache.get(4), 4)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = LRUCache(2)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertTrue('a' in cache)
+        self.assertFalse('b' in cache)
+
+    def test_stats(self):
+        cache = LRUCache(2)
+
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_delete_if(self):
+        cache = LRUCache(10)
+
+        for x in range(10):
+            cache.set((x % 2, x), x)
+
+        cache.delete_if(lambda key: key[0] == 0)
+
+        self.assertEqual(len(cache), 5)
+
+    def test_bytes_limit(self):
+        evicted = []
+        cache = LRUCache(10, 10, len, lambda k, v: evicted.append(k))
+
+        cache.set('a', 'xxxx')
+        cache.set('b', 'xxxx')
+        cache.set('c', 'xxxx')
+
+        self.assertEqual(evicted, ['a'])
+        self.assertEqual(cache.bytes, 8)
+
+        cache.delete('b')
+        self.assertEqual(cache.bytes, 4)
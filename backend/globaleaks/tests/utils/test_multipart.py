@@ -0,0 +1,59 @@
+# -*- encoding: utf-8 -*-
+import os
+
+from globaleaks.security import GLSecureTemporaryFile
+from globaleaks.settings import GLSettings
+from globaleaks.tests import helpers
+from globaleaks.utils.multipart import MultipartParser, MultipartError
+
+BOUNDARY = '----WebKitFormBoundary7MA4YWxkTrZu0gW'
+
+
+def multipart_body(fields, filename, content):
+    body = ''
+    for name, value in fields:
+        body += '--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n' % (BOUNDARY, name, value)
+
+    body += '--%s\r\nContent-Disposition: form-data; name="file"; filename="%s"\r\n' \
+            'Content-Type: application/octet-stream\r\n\r\n%s\r\n--%s--\r\n' % (BOUNDARY, filename, content, BOUNDARY)
+
+    return body
+
+
+class TestMultipartParser(helpers.TestGL):
+    def parse(self, body, chunk_size):
+        arguments = {}
+        files = {}
+
+        parser = MultipartParser(BOUNDARY, arguments, files,
+                                 lambda: GLSecureTemporaryFile(GLSettings.tmp_upload_path))
+
+        for i in range(0, len(body), chunk_size):
+            parser.feed(body[i:i + chunk_size])
+
+        parser.close()
+
+        return arguments, files
+
+    def test_parse(self):
+        content = os.urandom(100000) + '\r\n--' + BOUNDARY[:10]
+        body = multipart_body([('flowChunkNumber', '1'), ('flowIdentifier', 'abc')], 'antani.txt', content)
+
+        for chunk_size in [1, 7, 4096, len(body)]:
+            arguments, files = self.parse(body, chunk_size)
+
+            self.assertEqual(arguments, {'flowChunkNumber': ['1'], 'flowIdentifier': ['abc']})
+            self.assertEqual(files['file'][0]['filename'], 'antani.txt')
+            self.assertEqual(files['file'][0]['content_type'], 'application/octet-stream')
+            self.assertEqual(files['file'][0]['body_len'], len(content))
+            self.assertEqual(files['file'][0]['body'].read(), content)
+
+    def test_missing_final_boundary(self):
+        body = multipart_body([], 'antani.txt', 'antani')
+
+        self.assertRaises(MultipartError, self.parse, body[:-10], 4096)
+
+    def test_field_too_long(self):
+        body = multipart_body([('antani', 'x' * 100000)], 'antani.txt', 'antani')
+
+        self.assertRaises(MultipartError, self.parse, body, 4096)
@@ -0,0 +1,40 @@
+# -*- encoding: utf-8 -*-
+import threading
+
+from twisted.internet import threads
+from twisted.internet.defer import inlineCallbacks, Deferred
+from twisted.trial import unittest
+
+from globaleaks.utils.signals import JobSignals
+
+
+class TestJobSignals(unittest.TestCase):
+    def test_emit(self):
+        job_signals = JobSignals()
+
+        calls = []
+        callback = lambda: calls.append(1)
+
+        job_signals.emit('signal')
+
+        job_signals.connect('signal', callback)
+        job_signals.emit('signal')
+        job_signals.emit('other_signal')
+        self.assertEqual(len(calls), 1)
+
+        job_signals.disconnect('signal', callback)
+        job_signals.emit('signal')
+        self.assertEqual(len(calls), 1)
+
+    @inlineCallbacks
+    def test_emit_from_thread(self):
+        job_signals = JobSignals()
+
+        called = Deferred()
+        job_signals.connect('signal', lambda: called.callback(threading.current_thread()))
+
+        yield threads.deferToThread(job_signals.emit, 'signal')
+
+        thread = yield called
+
+        self.assertEqual(thread, threading.current_thread())
@@ -0,0 +1,68 @@
+# -*- encoding: utf-8 -*-
+from twisted.internet.defer import inlineCallbacks
+
+from globaleaks import models
+from globaleaks.orm import transact, transact_ro
+from globaleaks.settings import GLSettings
+from globaleaks.tests import helpers
+from globaleaks.utils.sqltracer import QueryStats, call_with_query_stats, query_tracer
+
+
+class TestQueryTracer(helpers.TestGL):
+    @transact
+    def count_users(self, store):
+        return store.find(models.User).count()
+
+    @transact_ro
+    def count_contexts(self, store):
+        return store.find(models.Context).count()
+
+    @inlineCallbacks
+    def sequential_transactions(self, n=3):
+        for _ in range(n):
+            yield self.count_users()
+            yield self.count_contexts()
+
+    @inlineCallbacks
+    def test_request_query_stats(self):
+        query_stats_1 = QueryStats('test')
+        query_stats_2 = QueryStats('test')
+
+        # open the pooled stores
+        yield self.sequential_transactions(1)
+
+        yield call_with_query_stats(query_stats_1, self.sequential_transactions, 1)
+        yield call_with_query_stats(query_stats_2, self.sequential_transactions, 2)
+
+        # the transactions following the first one are accounted as well
+        self.assertTrue(query_stats_1.count >= 2)
+        self.assertEqual(query_stats_2.count, query_stats_1.count * 2)
+        self.assertTrue(query_stats_2.time > 0)
+
+    @inlineCallbacks
+    def test_no_request_query_stats(self):
+        query_stats = QueryStats('test')
+
+        yield call_with_query_stats(query_stats, lambda: None)
+        yield self.count_users()
+
+        self.assertEqual(query_stats.count, 0)
+
+    def test_slow_query_log(self):
+        threshold = GLSettings.orm_slow_query_threshold
+        GLSettings.orm_slow_query_threshold = -1
+
+        query_stats = QueryStats('test')
+        query_tracer.start('test', [query_stats])
+        try:
+            query_tracer.connection_raw_execute(None, None, 'SELECT 1', ())
+            query_tracer.connection_raw_execute_success(None, None, 'SELECT 1', ())
+        finally:
+            query_tracer.stop()
+            GLSettings.orm_slow_query_threshold = threshold
+
+        self.assertEqual(query_stats.count, 1)
+
+    def test_assert_query_budget(self):
+        return self.assertFailure(self.assert_query_budget(2, self.sequential_transactions),
+                                  self.failureException)
@@ -0,0 +1,44 @@
+from globaleaks.tests import helpers
+from globaleaks.utils.timingstats import LatencyHistogram, TimingStats, MAX_HISTOGRAMS, OVERFLOW_ROUTE
+
+
+class TestLatencyHistogram(helpers.TestGL):
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+
+        for x in range(1, 1001):
+            histogram.add(x / 1000.0)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertEqual(histogram.max, 1.0)
+        self.assertAlmostEqual(histogram.mean(), 0.5005)
+
+        for p in [50, 90, 99]:
+            self.assertTrue(p / 100.0 <= histogram.percentile(p) <= p / 100.0 * 1.2)
+
+        self.assertEqual(histogram.percentile(100), 1.0)
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+
+        self.assertEqual(histogram.percentile(50), 0.0)
+        self.assertEqual(histogram.mean(), 0.0)
+
+    def test_out_of_range(self):
+        histogram = LatencyHistogram()
+        histogram.add(0)
+        histogram.add(10 ** 6)
+
+        self.assertEqual(histogram.percentile(50), 0.0001)
+        self.assertEqual(histogram.percentile(100), 10 ** 6)
+
+
+class TestTimingStats(helpers.TestGL):
+    def test_histograms_are_bounded(self):
+        stats = TimingStats()
+
+        for x in range(MAX_HISTOGRAMS + 10):
+            stats.record('/route/%d' % x, 'GET', 200, 0.01)
+
+        self.assertEqual(len(stats.histograms), MAX_HISTOGRAMS + 1)
+        self.assertEqual(stats.get_histogram(OVERFLOW_ROUTE, 'GET', 200).count, 10)
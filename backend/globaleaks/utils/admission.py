@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#
+#  admission
+#  *********
+#
+# Admission control of the requests served by the handlers.
+#
+# Every handler belongs to a priority class:
+#   - HIGH: authentications and submission completion;
+#   - NORMAL: the default;
+#   - LOW: expensive resources as exports, lists of tips and overviews.
+#
+# At most GLSettings.admission_slots requests are served concurrently;
+# GLSettings.admission_reserved_slots of them are reserved to the HIGH
+# priority requests and at most GLSettings.admission_low_priority_slots
+# can be taken by the LOW priority ones.
+#
+# The requests that cannot be admitted wait in a queue of their class
+# limited to GLSettings.admission_queue_size entries; when the queue is
+# full, or for LOW priority requests when the activity stress level of
+# the anomaly detection is high, the request is rejected with a 503
+# Service Unavailable and a Retry-After header.
+import collections
+
+from twisted.internet.defer import Deferred, succeed, fail
+
+from globaleaks.rest import errors
+from globaleaks.settings import GLSettings
+
+HIGH = 'high'
+NORMAL = 'normal'
+LOW = 'low'
+
+PRIORITIES = [HIGH, NORMAL, LOW]
+
+# activity stress level (see globaleaks.anomaly) at which the LOW
+# priority requests are rejected
+LOW_PRIORITY_MAX_STRESS_LEVEL = 2
+
+
+def get_activity_stress_level():
+    # imported here as globaleaks.anomaly depends on the handlers
+    from globaleaks.anomaly import Alarm
+
+    return Alarm.stress_levels['activity']
+
+
+class AdmissionControl(object):
+    def __init__(self):
+        self.active = dict((priority, 0) for priority in PRIORITIES)
+        self.queues = dict((priority, collections.deque()) for priority in PRIORITIES)
+        self.rejected = dict((priority, 0) for priority in PRIORITIES)
+
+    def can_run(self, priority):
+        active = sum(self.active.itervalues())
+
+        if priority == HIGH:
+            return active < GLSettings.admission_slots
+
+        if active >= GLSettings.admission_slots - GLSettings.admission_reserved_slots:
+            return False
+
+        return priority != LOW or self.active[LOW] < GLSettings.admission_low_priority_slots
+
+    def reject(self, priority):
+        self.rejected[priority] += 1
+
+        return fail(errors.ServiceOverloaded(GLSettings.admission_retry_after))
+
+    def acquire(self, priority):
+        """
+        Return a deferred firing when a request of the given priority is
+        admitted; it fails with ServiceOverloaded if the request is rejected.
+
+        Every admitted request must call release() once served; a request
+        still queued and no longer interested must call cancel().
+        """
+        if priority == LOW and get_activity_stress_level() >= LOW_PRIORITY_MAX_STRESS_LEVEL:
+            return self.reject(priority)
+
+        if not self.queues[priority] and self.can_run(priority):
+            self.active[priority] += 1
+            return succeed(None)
+
+        if len(self.queues[priority]) >= GLSettings.admission_queue_size:
+            return self.reject(priority)
+
+        d = Deferred()
+        self.queues[priority].append(d)
+        return d
+
+    def cancel(self, priority, d):
+        """
+        Remove from the queue a request that is no longer waiting to be
+        admitted, e.g. because its client has gone away
+        """
+        try:
+            self.queues[priority].remove(d)
+        except ValueError:
+            pass
+
+    def release(self, priority):
+        self.active[priority] -= 1
+        self.dispatch()
+
+    def dispatch(self):
+        for priority in PRIORITIES:
+            queue = self.queues[priority]
+
+            while queue and self.can_run(priority):
+                self.active[priority] += 1
+                queue.popleft().callback(None)
+
+    def stats(self):
+        return dict((priority, {
+            'active': self.active[priority],
+            'queued': len(self.queues[priority]),
+            'rejected': self.rejected[priority]
+        }) for priority in PRIORITIES)
+
+
+admission_control = AdmissionControl()
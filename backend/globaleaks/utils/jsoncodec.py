@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+#  jsoncodec
+#  *********
+#
+# The JSON encoder/decoder used for the requests and the responses of the
+# handlers, for the responses kept by GLApiCache and for the JSON columns
+# of the models.
+#
+# When installed, ujson is used in place of the json module of the
+# standard library; set_backend() permits to select the implementation.
+#
+# The values are expected to be composed only by the JSON types (dicts with
+# string keys, lists, strings, numbers, booleans and None); values that
+# ujson is not able to handle (e.g. integers larger than 64 bits) are
+# processed with the json module. Floats are encoded by ujson with at most
+# 15 decimal digits.
+import json
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _json_dumps(value, ensure_ascii=True):
+    return json.dumps(value, ensure_ascii=ensure_ascii, separators=(',', ':'))
+
+
+def _ujson_dumps(value, ensure_ascii=True):
+    try:
+        return ujson.dumps(value, ensure_ascii=ensure_ascii,
+                           escape_forward_slashes=False, double_precision=15)
+    except (OverflowError, TypeError):
+        return _json_dumps(value, ensure_ascii)
+
+
+def _ujson_loads(data):
+    try:
+        return ujson.loads(data, precise_float=True)
+    except ValueError:
+        # ujson fails also on valid texts containing integers larger than
+        # 64 bits; the json module reports the errors of the invalid ones
+        return json.loads(data)
+
+
+backends = {
+    'json': (_json_dumps, json.loads)
+}
+
+if ujson is not None:
+    backends['ujson'] = (_ujson_dumps, _ujson_loads)
+
+backend = None
+_dumps = _loads = None
+
+
+def set_backend(name=None):
+    """
+    Select the JSON implementation; by default the fastest one available
+    """
+    global backend, _dumps, _loads
+
+    if name is None:
+        name = 'ujson' if 'ujson' in backends else 'json'
+
+    _dumps, _loads = backends[name]
+    backend = name
+
+
+set_backend()
+
+
+def dumps(value):
+    """
+    Return the JSON text of the value as unicode
+    """
+    ret = _dumps(value, ensure_ascii=False)
+    if not isinstance(ret, unicode):
+        ret = ret.decode('utf-8')
+
+    return ret
+
+
+def loads(data):
+    """
+    Return the value of the JSON text; raises ValueError if it is invalid
+    """
+    return _loads(data)
+
+
+def encode(value):
+    """
+    Return the JSON encoding of the value as an ASCII str suitable for
+    an HTTP response body
+    """
+    # "</" is escaped as cyclone does in order to permit to include
+    # the JSON inside a <script> tag
+    return _dumps(value).replace('</', '<\\/')
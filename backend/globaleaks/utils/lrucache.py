@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Thread safe dictionary bounded to size_limit items that evicts
+    the least recently used items and counts hits and misses.
+
+    When bytes_limit and sizeof are given the cache is also bounded to
+    bytes_limit as measured by sizeof(value); on_evict(key, value) is
+    called for every evicted item.
+    """
+    def __init__(self, size_limit, bytes_limit=None, sizeof=None, on_evict=None):
+        self.size_limit = size_limit
+        self.bytes_limit = bytes_limit
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.lock = threading.Lock()
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.items
+
+    def keys(self):
+        with self.lock:
+            return self.items.keys()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.items:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+
+            # move the item to the end of the OD as the most recently used
+            value = self.items.pop(key)
+            self.items[key] = value
+
+            return value
+
+    def _pop(self, key):
+        self.bytes -= self.sizes.pop(key, 0)
+        return self.items.pop(key)
+
+    def _over_limits(self):
+        if len(self.items) > self.size_limit:
+            return True
+
+        return self.bytes_limit is not None and self.bytes > self.bytes_limit
+
+    def set(self, key, value):
+        evicted = []
+
+        with self.lock:
+            if key in self.items:
+                self._pop(key)
+
+            self.items[key] = value
+
+            if self.sizeof is not None:
+                self.sizes[key] = self.sizeof(value)
+                self.bytes += self.sizes[key]
+
+            while self._over_limits():
+                # pops the least recently used key in the OD
+                k = next(self.items.iterkeys())
+                evicted.append((k, self._pop(k)))
+                self.evictions += 1
+
+        if self.on_evict is not None:
+            for k, v in evicted:
+                self.on_evict(k, v)
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.items:
+                return self._pop(key)
+
+    def delete_if(self, predicate):
+        """
+        Delete all the items whose key satisfies the predicate
+        """
+        with self.lock:
+            for key in [k for k in self.items if predicate(k)]:
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.bytes = 0
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': len(self.items),
+                'size_limit': self.size_limit,
+                'bytes': self.bytes,
+                'bytes_limit': self.bytes_limit,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hit_rate()
+            }
@@ -26,7 +26,7 @@ from twisted.python.failure import Failure
 from txsocksx.client import SOCKS5ClientEndpoint
 
 from globaleaks import __version__
-from globaleaks.security import GLBPGP, sha256
+from globaleaks.security import GLPGPKeyring, sha256
 from globaleaks.settings import GLSettings
 from globaleaks.utils.utility import log
 
@@ -260,10 +260,10 @@ def send_exception_email(mail_body):
 
         # If the receiver has encryption enabled (for notification), encrypt the mail body
         if len(GLSettings.memory_copy.notif.exception_email_pgp_key_public):
-            gpob = GLBPGP()
             try:
-                gpob.load_key(GLSettings.memory_copy.notif.exception_email_pgp_key_public)
-                mail_body = gpob.encrypt_message(GLSettings.memory_copy.notif.exception_email_pgp_key_fingerprint, mail_body)
+                mail_body = GLPGPKeyring.encrypt_message(GLSettings.memory_copy.notif.exception_email_pgp_key_public,
+                                                         GLSettings.memory_copy.notif.exception_email_pgp_key_fingerprint,
+                                                         mail_body)
             except Exception as excep:
                 # If exception emails are configured to be subject to encryption an the key
                 # expires the only thing to do is to disable the email.
@@ -271,10 +271,6 @@ def send_exception_email(mail_body):
                 #       this could be done simply here replacing the email subject and body.
                 log.err("Error while encrypting exception email: %s" % str(excep))
                 return None
-            finally:
-                # the finally statement is always called also if
-                # except contains a return or a raise
-                gpob.destroy_environment()
 
         # avoid to wait for the notification to happen  but rely on  background completion
         sendmail(GLSettings.memory_copy.notif.exception_email_address, mail_subject,  mail_body)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+#  multipart
+#  *********
+#
+# Incremental parser of multipart/form-data bodies.
+#
+# Differently from cyclone.httputil.parse_multipart_form_data, that needs
+# the whole body in memory, the parser is fed with the chunks of data as
+# they arrive from the socket and writes the content of the file parts into
+# the file objects returned by the given file_factory so that the memory
+# used is bounded by the size of the buffers and not by the size of the files.
+
+from cyclone.httputil import HTTPHeaders, _parse_header
+
+# limits of the size of the headers of a part and of the value of a field
+MAX_HEADERS_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class MultipartError(Exception):
+    pass
+
+
+class MultipartParser(object):
+    """
+    Parse a multipart/form-data body filling the arguments and files dicts
+    as cyclone does; the body of the file parts is written to the file object
+    returned by file_factory() and it is recorded in files[name] as:
+
+        {'filename': ..., 'content_type': ..., 'body': fileobj, 'body_len': ...}
+    """
+    def __init__(self, boundary, arguments, files, file_factory):
+        if boundary.startswith('"') and boundary.endswith('"'):
+            boundary = boundary[1:-1]
+
+        self.delimiter = '--' + boundary
+        self.separator = '\r\n' + self.delimiter
+        self.arguments = arguments
+        self.files = files
+        self.file_factory = file_factory
+
+        self.state = 'preamble'
+        self.buffer = ''
+        self.part = None
+        self.name = None
+        self.value = None
+        self.value_len = 0
+
+    def feed(self, data):
+        self.buffer += data
+
+        while True:
+            if self.state == 'preamble':
+                i = self.buffer.find(self.delimiter)
+                if i == -1:
+                    # keep only what could be the beginning of the delimiter
+                    self.buffer = self.buffer[-len(self.delimiter):]
+                    return
+
+                self.buffer = self.buffer[i:]
+                self.state = 'delimiter'
+
+            elif self.state == 'delimiter':
+                # the buffer starts with the delimiter followed by
+                # '\r\n' for a new part or by '--' at the end of the body
+                if len(self.buffer) < len(self.delimiter) + 2:
+                    return
+
+                trailer = self.buffer[len(self.delimiter):len(self.delimiter) + 2]
+                if trailer == '--':
+                    self.buffer = ''
+                    self.state = 'end'
+                elif trailer == '\r\n':
+                    self.buffer = self.buffer[len(self.delimiter) + 2:]
+                    self.state = 'headers'
+                else:
+                    raise MultipartError("Invalid multipart/form-data delimiter")
+
+            elif self.state == 'headers':
+                i = self.buffer.find('\r\n\r\n')
+                if i == -1:
+                    if len(self.buffer) > MAX_HEADERS_SIZE:
+                        raise MultipartError("multipart/form-data headers too long")
+                    return
+
+                self.start_part(self.buffer[:i])
+                self.buffer = self.buffer[i + 4:]
+                self.state = 'body'
+
+            elif self.state == 'body':
+                i = self.buffer.find(self.separator)
+                if i == -1:
+                    # write all the data except what could be the beginning of the separator
+                    n = len(self.buffer) - len(self.separator) + 1
+                    if n > 0:
+                        self.write_part(self.buffer[:n])
+                        self.buffer = self.buffer[n:]
+                    return
+
+                self.write_part(self.buffer[:i])
+                self.end_part()
+                self.buffer = self.buffer[i + 2:]
+                self.state = 'delimiter'
+
+            else:  # self.state == 'end'
+                # the epilogue is ignored
+                self.buffer = ''
+                return
+
+    def start_part(self, data):
+        headers = HTTPHeaders.parse(data.decode('utf-8'))
+        disposition, params = _parse_header(headers.get('Content-Disposition', ''))
+
+        if disposition != 'form-data' or not params.get('name'):
+            raise MultipartError("Invalid multipart/form-data part")
+
+        if params.get('filename'):
+            self.part = {
+                'filename': params['filename'],
+                'content_type': headers.get('Content-Type', 'application/unknown'),
+                'body': self.file_factory(),
+                'body_len': 0
+            }
+
+            self.files.setdefault(params['name'], []).append(self.part)
+        else:
+            self.part = None
+            self.name = params['name']
+            self.value = []
+            self.value_len = 0
+
+    def write_part(self, data):
+        if not data:
+            return
+
+        if self.part is not None:
+            self.part['body'].write(data)
+            self.part['body_len'] += len(data)
+        else:
+            self.value.append(data)
+            self.value_len += len(data)
+            if self.value_len > MAX_FIELD_SIZE:
+                raise MultipartError("multipart/form-data field too long")
+
+    def end_part(self):
+        if self.part is None:
+            self.arguments.setdefault(self.name, []).append(''.join(self.value))
+
+        self.part = self.name = self.value = None
+
+    def close(self):
+        """
+        Verify that the whole body has been parsed
+        """
+        if self.state != 'end':
+            raise MultipartError("Invalid multipart/form-data: no final boundary")
+
+    def abort(self):
+        """
+        Close the files created while parsing an incomplete or invalid body
+        """
+        for parts in self.files.itervalues():
+            for part in parts:
+                part['body'].close()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#
+#  signals
+#  *******
+#
+# Signals waking up the scheduled jobs as soon as there is work for them
+# instead of letting them poll the database:
+#   - DELIVERY: new files have been registered;
+#   - NOTIFICATION: new tips, comments, messages, receiver files or mails.
+#
+# The signals are emitted once the transactions storing the new work are
+# committed. The jobs listen to the signals listed in GLJob.signals once
+# scheduled; their periodic run is kept as a safety net.
+import collections
+
+from twisted.internet import reactor
+from twisted.python import threadable
+
+DELIVERY = 'delivery'
+NOTIFICATION = 'notification'
+
+
+class JobSignals(object):
+    def __init__(self):
+        self.callbacks = collections.defaultdict(list)
+
+    def connect(self, signal, callback):
+        self.callbacks[signal].append(callback)
+
+    def disconnect(self, signal, callback):
+        if callback in self.callbacks[signal]:
+            self.callbacks[signal].remove(callback)
+
+    def emit(self, signal):
+        """
+        Call the callbacks connected to the signal; it may be called by any
+        thread, the callbacks are always called by the reactor thread once
+        it is registered.
+        """
+        if not self.callbacks[signal]:
+            return
+
+        if threadable.ioThread is not None and not threadable.isInIOThread():
+            reactor.callFromThread(self.emit, signal)
+            return
+
+        for callback in list(self.callbacks[signal]):
+            callback()
+
+
+job_signals = JobSignals()
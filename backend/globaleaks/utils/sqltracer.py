@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+#  sqltracer
+#  *********
+#
+# Storm tracer accounting the number and the cumulative time of the SQL
+# statements executed by each transaction and by each HTTP request, and
+# logging the statements slower than GLSettings.orm_slow_query_threshold.
+#
+# The statements are accounted to the QueryStats objects registered by
+# start() for the thread executing the transaction; the QueryStats of the
+# HTTP request is looked up in the twisted.python.context of the caller
+# of the transaction (see globaleaks.orm.transact).
+import threading
+import time
+
+from storm import tracer
+from twisted.internet.defer import Deferred
+from twisted.python import context
+from twisted.python.failure import Failure
+
+from globaleaks.settings import GLSettings
+from globaleaks.utils.utility import log
+
+
+class QueryStats(object):
+    """
+    Number and cumulative time of the statements executed on behalf of a
+    transaction or of an HTTP request.
+
+    The same object may be updated by many ORM threads concurrently.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.count = 0
+        self.time = 0.0
+
+    def add(self, run_time):
+        with self.lock:
+            self.count += 1
+            self.time += run_time
+
+
+def get_context_query_stats():
+    """
+    Return the QueryStats of the current context (i.e. the HTTP request
+    being served) if any
+    """
+    return context.get(QueryStats)
+
+
+def call_with_query_stats(query_stats, function, *args, **kwargs):
+    """
+    Call function accounting the statements of the transactions it executes
+    to query_stats.
+    """
+    return context.call({QueryStats: query_stats}, function, *args, **kwargs)
+
+
+def resume_with_query_stats(query_stats, d):
+    """
+    Return a deferred firing with the result of d within the context of
+    query_stats so that the caller waiting for d continues to account its
+    transactions to the same object.
+    """
+    ret = Deferred()
+
+    def fire(result):
+        if isinstance(result, Failure):
+            ret.errback(result)
+        else:
+            ret.callback(result)
+
+    d.addBoth(lambda result: call_with_query_stats(query_stats, fire, result))
+
+    return ret
+
+
+class QueryTracer(object):
+    def __init__(self):
+        self.local = threading.local()
+
+    def start(self, name, query_stats_list):
+        """
+        Account the statements executed by the current thread to the
+        QueryStats given until stop() is called; name is the label
+        used in the slow query log
+        """
+        self.local.name = name
+        self.local.query_stats_list = query_stats_list
+
+    def stop(self):
+        self.local.name = None
+        self.local.query_stats_list = ()
+
+    def connection_raw_execute(self, connection, raw_cursor, statement, params):
+        self.local.start_time = time.time()
+
+    def connection_raw_execute_success(self, connection, raw_cursor, statement, params):
+        self.account(statement)
+
+    def connection_raw_execute_error(self, connection, raw_cursor, statement, params, error):
+        self.account(statement)
+
+    def account(self, statement):
+        start_time = getattr(self.local, 'start_time', None)
+        if start_time is None:
+            return
+
+        self.local.start_time = None
+
+        run_time = time.time() - start_time
+
+        for query_stats in getattr(self.local, 'query_stats_list', ()):
+            query_stats.add(run_time)
+
+        if run_time > GLSettings.orm_slow_query_threshold:
+            log.info("Slow query (%.3fs) in %s: %s" %
+                     (run_time, getattr(self.local, 'name', None) or 'unknown transaction', statement))
+
+
+query_tracer = QueryTracer()
+
+tracer.install_tracer(query_tracer)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+#  staticfiles
+#  ***********
+#
+# In memory index of the static files served by BaseStaticFileHandler.
+#
+# For each file the index keeps its size, mtime and a strong ETag computed
+# on its content together with the same information for its precompressed
+# .gz sibling, when present; the content of the small files is kept in
+# memory so that serving them does not require any access to the disk.
+#
+# Entries are created at the first request of each file, validated with
+# a stat() at every access and rebuilt in a thread when the file is changed.
+import hashlib
+import mimetypes
+import os
+import re
+
+from twisted.internet import defer, threads
+
+from globaleaks.settings import GLSettings
+
+# assets whose name contains a content hash (e.g. scripts.3f2a1b9c.js) never
+# change and thus can be cached by the browsers for a long time
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.[a-z0-9]+$')
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        data = f.read(GLSettings.file_chunk_size)
+        while data:
+            h.update(data)
+            data = f.read(GLSettings.file_chunk_size)
+
+    return h.hexdigest()
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class StaticFileEntry(object):
+    def __init__(self, path, stat, gzip_stat):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime
+        self.mime_type, _ = mimetypes.guess_type(path)
+        self.fingerprinted = FINGERPRINT_RE.search(os.path.basename(path)) is not None
+
+        self.etag = '"%s"' % file_digest(path)
+        self.data = read_file(path) if self.size <= GLSettings.static_file_memory_limit else None
+
+        self.gzip_path = None
+        self.gzip_mtime = None
+        self.gzip_data = None
+
+        if gzip_stat is not None:
+            self.gzip_path = path + '.gz'
+            self.gzip_size = gzip_stat.st_size
+            self.gzip_mtime = gzip_stat.st_mtime
+            self.gzip_etag = '"%s-gzip"' % self.etag[1:-1]
+            if self.gzip_size <= GLSettings.static_file_memory_limit:
+                self.gzip_data = read_file(self.gzip_path)
+
+    def is_valid(self, stat, gzip_stat):
+        return (self.size, self.mtime) == (stat.st_size, stat.st_mtime) and \
+               self.gzip_mtime == (gzip_stat.st_mtime if gzip_stat is not None else None)
+
+
+class StaticFileIndex(object):
+    def __init__(self):
+        self.entries = {}
+
+    @staticmethod
+    def stat(path):
+        stat = os.stat(path)
+
+        try:
+            gzip_stat = os.stat(path + '.gz')
+        except OSError:
+            gzip_stat = None
+
+        # a .gz sibling older than the file is stale and is ignored
+        if gzip_stat is not None and gzip_stat.st_mtime < stat.st_mtime:
+            gzip_stat = None
+
+        return stat, gzip_stat
+
+    def build(self, path):
+        stat, gzip_stat = self.stat(path)
+        entry = StaticFileEntry(path, stat, gzip_stat)
+        self.entries[path] = entry
+        return entry
+
+    def get(self, path):
+        """
+        Return a Deferred firing the entry of the file, rebuilding it
+        in a thread if the file has been changed since it was indexed.
+        """
+        entry = self.entries.get(path)
+        if entry is not None and entry.is_valid(*self.stat(path)):
+            return defer.succeed(entry)
+
+        return threads.deferToThread(self.build, path)
+
+    def clear(self):
+        self.entries.clear()
+
+
+static_file_index = StaticFileIndex()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#
+#  timingstats
+#  ***********
+#
+# Latency histograms of the requests served by the handlers, by route
+# pattern, method and status, and of the runs of the scheduled jobs.
+#
+# Every histogram uses a fixed number of logarithmic buckets, each one
+# 2^(1/4) times larger than the previous, so that the memory used does not
+# depend on the number of the samples and the percentiles are estimated
+# with an error lower than 20%.
+import math
+
+from globaleaks.utils.utility import datetime_now, datetime_to_ISO8601
+
+# upper bound of the first bucket (100us) and growth factor of the buckets
+BUCKETS_BASE = 0.0001
+BUCKETS_GROWTH = 2 ** 0.25
+# 96 buckets cover the latencies up to 0.0001 * 2^24 seconds (~28 minutes)
+BUCKETS_COUNT = 96
+
+# limit of the number of the histograms; the samples exceeding it
+# are accounted together under the route OVERFLOW_ROUTE
+MAX_HISTOGRAMS = 1024
+OVERFLOW_ROUTE = '*'
+
+
+def bucket_index(value):
+    if value <= BUCKETS_BASE:
+        return 0
+
+    index = int(math.ceil(math.log(value / BUCKETS_BASE, BUCKETS_GROWTH)))
+
+    return min(index, BUCKETS_COUNT - 1)
+
+
+def bucket_upper_bound(index):
+    return BUCKETS_BASE * BUCKETS_GROWTH ** index
+
+
+class LatencyHistogram(object):
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """
+        Return the upper bound of the bucket containing the p-th percentile
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = max(1, int(math.ceil(self.count * p / 100.0)))
+
+        cumulative = 0
+        for index, count in enumerate(self.buckets):
+            cumulative += count
+            if cumulative >= rank:
+                # the last bucket has no upper bound
+                if index == BUCKETS_COUNT - 1:
+                    return self.max
+
+                return min(bucket_upper_bound(index), self.max)
+
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        """
+        Return the count of the samples and their stats in milliseconds
+        """
+        return {
+            'count': self.count,
+            'mean': self.mean() * 1000,
+            'p50': self.percentile(50) * 1000,
+            'p90': self.percentile(90) * 1000,
+            'p99': self.percentile(99) * 1000,
+            'max': self.max * 1000
+        }
+
+
+class TimingStats(object):
+    def __init__(self):
+        self.histograms = {}
+        self.start_date = datetime_now()
+
+    def record(self, route, method, status, run_time):
+        key = (route, method, status)
+
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            if len(self.histograms) >= MAX_HISTOGRAMS:
+                key = (OVERFLOW_ROUTE, method, status)
+                histogram = self.histograms.get(key)
+
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+
+        histogram.add(run_time)
+
+    def get_histogram(self, route, method, status):
+        return self.histograms.get((route, method, status))
+
+    def stats(self):
+        """
+        Return the stats of every histogram; the times are in milliseconds
+        """
+        timings = []
+
+        for (route, method, status), histogram in sorted(self.histograms.iteritems()):
+            timing = histogram.summary()
+            timing.update({
+                'route': route,
+                'method': method,
+                'status': status
+            })
+
+            timings.append(timing)
+
+        return {
+            'since': datetime_to_ISO8601(self.start_date),
+            'timings': timings
+        }
+
+    def reset(self):
+        self.histograms.clear()
+        self.start_date = datetime_now()
+
+
+timing_stats = TimingStats()